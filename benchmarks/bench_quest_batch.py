@@ -0,0 +1,68 @@
+"""
+COMP 163 - Project 3: Quest Chronicles
+Quest Batch Benchmark
+
+Times accepting and completing one quest for many fresh characters,
+first with accept_quest/complete_quest in a loop and then with
+accept_quest_batch/complete_quest_batch. Character creation is not
+timed. Each mode gets its own characters and keeps the best of several
+runs.
+
+Run from the repository root:
+    python benchmarks/bench_quest_batch.py [characters] [repeats]
+"""
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import character_manager
+import game_data
+import quest_handler
+
+QUEST_ID = 'first_steps'
+
+def make_characters(count):
+    """Create count fresh level 1 characters"""
+    return [character_manager.create_character(f"Bench{i}", "Warrior") for i in range(count)]
+
+def run_loop(characters, quests):
+    """Accept and complete the quest one character at a time"""
+    for character in characters:
+        quest_handler.accept_quest(character, QUEST_ID, quests)
+    for character in characters:
+        quest_handler.complete_quest(character, QUEST_ID, quests)
+
+def run_batch(characters, quests):
+    """Accept and complete the quest for all characters at once"""
+    quest_handler.accept_quest_batch(characters, QUEST_ID, quests)
+    quest_handler.complete_quest_batch(characters, QUEST_ID, quests)
+
+def best_time(run, count, quests, repeats):
+    """Get the fastest of repeats timed runs on fresh characters"""
+    best = None
+    for _ in range(repeats):
+        characters = make_characters(count)
+        start = time.perf_counter()
+        run(characters, quests)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    quests = game_data.load_quests(os.path.join(ROOT, "data", "quests.txt"))
+
+    loop = best_time(run_loop, count, quests, repeats)
+    batch = best_time(run_batch, count, quests, repeats)
+    print(f"{count} characters, accept + complete '{QUEST_ID}' (best of {repeats})")
+    print(f"  per-character loop: {loop:.3f}s")
+    print(f"  batch:              {batch:.3f}s")
+    print(f"  speedup:            {loop / batch:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+COMP 163 - Project 3: Quest Chronicles
+Search Index Benchmark
+
+Builds a SearchIndex over synthetic quest records and times queries of
+each shape: an exact word, 3- and 2-letter prefixes, two words, and two
+or three 2-letter prefixes. Each query keeps the best of a few runs so
+that scheduler noise does not count against it. On the 26-letter
+vocabulary every query should finish in under a millisecond on 100k
+records.
+
+Words are random strings, so prefixes are spread evenly. The dense
+vocabulary uses 10 letters; each 2-letter prefix then covers about 2000
+words, which is far more than real text and is the worst case for
+prefix queries. Its times are reported but not held to the target.
+
+Run from the repository root:
+    python benchmarks/bench_search.py [records] [queries] [repeats]
+"""
+
+import gc
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import game_data
+
+TARGET_MS = 1.0
+REPEATS = 3
+
+def make_records(count, alphabet, rng):
+    """Create count quest-like records over a 20k-word random vocabulary"""
+    words = [''.join(rng.choice(alphabet) for _ in range(rng.randint(3, 7))) for _ in range(20000)]
+    records = {}
+    for i in range(count):
+        records[f"q{i}"] = {'title': ' '.join(rng.choices(words, k=3)),
+                            'description': ' '.join(rng.choices(words, k=10))}
+    return records, words
+
+def make_queries(words, count, rng):
+    """Get a list of queries for each query shape"""
+    def pick():
+        return rng.choice(words)
+    return {
+        'exact word': [pick() for _ in range(count)],
+        '3-letter prefix': [pick()[:3] for _ in range(count)],
+        '2-letter prefix': [pick()[:2] for _ in range(count)],
+        'two words': [f"{pick()} {pick()}" for _ in range(count)],
+        'two 2-letter prefixes': [f"{pick()[:2]} {pick()[:2]}" for _ in range(count)],
+        'three 2-letter prefixes': [f"{pick()[:2]} {pick()[:2]} {pick()[:2]}" for _ in range(count)]
+    }
+
+def run(label, alphabet, count, query_count, repeats):
+    """Build one index and time every query shape; return True if all meet the target"""
+    rng = random.Random(42)
+    records, words = make_records(count, alphabet, rng)
+    start = time.perf_counter()
+    index = game_data.SearchIndex.build(records, game_data.QUEST_SEARCH_FIELDS)
+    print(f"{label}: {count} records, index built in {time.perf_counter() - start:.1f}s")
+
+    # the index is long-lived; keep the collector from rescanning it mid-query
+    gc.collect()
+    gc.freeze()
+
+    ok = True
+    for shape, queries in make_queries(words, query_count, rng).items():
+        times = []
+        for query in queries:
+            best = None
+            for _ in range(repeats):
+                start = time.perf_counter()
+                index.search(query)
+                elapsed = (time.perf_counter() - start) * 1000
+                best = elapsed if best is None else min(best, elapsed)
+            times.append(best)
+        mean = sum(times) / len(times)
+        worst = max(times)
+        ok = ok and worst < TARGET_MS
+        print(f"  {shape:24} mean {mean:.3f} ms   max {worst:.3f} ms")
+
+    gc.unfreeze()
+    return ok
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else REPEATS
+    ok = run("26-letter vocabulary", "abcdefghijklmnopqrstuvwxyz", count, query_count, repeats)
+    run("dense 10-letter vocabulary", "abcdefghij", count, query_count, repeats)
+    print(f"every 26-letter vocabulary query under {TARGET_MS} ms: {'yes' if ok else 'NO'}")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
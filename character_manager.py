@@ -10,6 +10,7 @@ This module handles character creation, loading, and saving.
 """
 
 import os
+from inventory_system import Inventory
 from custom_exceptions import (
     InvalidCharacterClassError,
     CharacterNotFoundError,
@@ -18,6 +19,208 @@ from custom_exceptions import (
     CharacterDeadError
 )
 
+# ============================================================================
+# QUEST LOG
+# ============================================================================
+
+class QuestLog:
+    """
+    Ordered collection of quest IDs with O(1) membership, add and remove
+    
+    Used for a character's 'active_quests' and 'completed_quests'. It
+    supports the list operations the game uses (in, len, iteration,
+    indexing, append, remove), so code written for plain lists keeps
+    working. Iteration follows the order quests were added, and the save
+    file format is unchanged.
+    """
+    __slots__ = ('ids',)
+    
+    def __init__(self, quest_ids=()):
+        """Initialize from any iterable of quest IDs (duplicates are dropped)"""
+        self.ids = dict.fromkeys(quest_ids)
+    
+    def __contains__(self, quest_id):
+        return quest_id in self.ids
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    def __iter__(self):
+        return iter(self.ids)
+    
+    def __getitem__(self, index):
+        return list(self.ids)[index]
+    
+    def __eq__(self, other):
+        if isinstance(other, QuestLog):
+            return list(self.ids) == list(other.ids)
+        if isinstance(other, list):
+            return list(self.ids) == other
+        return NotImplemented
+    
+    def __repr__(self):
+        return f"QuestLog({list(self.ids)!r})"
+    
+    def append(self, quest_id):
+        """Add a quest ID (no effect if already present)"""
+        self.ids[quest_id] = None
+    
+    def remove(self, quest_id):
+        """
+        Remove a quest ID
+        
+        Raises: ValueError if the quest ID is not present (like list.remove)
+        """
+        try:
+            del self.ids[quest_id]
+        except KeyError:
+            raise ValueError(f"{quest_id} not in quest log")
+    
+    def discard(self, quest_id):
+        """Remove a quest ID if present"""
+        self.ids.pop(quest_id, None)
+    
+    def to_save_string(self):
+        """
+        Serialize for a save file
+        
+        Returns: Comma-separated quest IDs
+        """
+        return ",".join(self.ids)
+    
+    @classmethod
+    def from_save_string(cls, value):
+        """
+        Parse a comma-separated save field
+        
+        Returns: QuestLog
+        """
+        return cls(value.split(",") if value else ())
+
+# ============================================================================
+# DERIVED STATS
+# ============================================================================
+
+# Stats that equipment and effects can modify
+DERIVED_STATS = ('max_health', 'strength', 'magic')
+
+class CharacterStats:
+    """
+    Base stats plus named modifiers, with cached effective values
+    
+    Each modifier is keyed by its source (e.g. "equipment:weapon" or
+    "effect:weaken") and adds an amount to one stat. Per-stat modifier
+    totals are kept up to date, so changing a modifier recomputes just
+    that stat, and nothing is recomputed otherwise. Effective values are
+    written back to the character's own keys (character['strength'] and
+    so on), so everything that reads stats (combat damage, the UI) reads
+    the cached value with a plain lookup.
+    
+    Code that edits a stat key directly (level-ups, elixirs) is changing
+    the base stat: the difference is folded into the base value the next
+    time a modifier changes.
+    """
+    __slots__ = ('character', 'base', 'modifiers', 'totals', 'effective')
+    
+    def __init__(self, character, modifiers=None):
+        """
+        Attach to a character whose stat keys already include modifiers
+        
+        Args:
+            character: Character dictionary
+            modifiers: Optional {source: (stat, amount)} already applied
+        """
+        self.character = character
+        self.modifiers = {}
+        self.totals = {}
+        self.effective = {}
+        self.base = {}
+        for stat in DERIVED_STATS:
+            self._track(stat)
+        for source, (stat, amount) in (modifiers or {}).items():
+            self._track(stat)
+            self.modifiers[source] = (stat, amount)
+            self.totals[stat] += amount
+            self.base[stat] -= amount
+    
+    def get_base(self, stat):
+        """Get a stat without modifiers"""
+        self.sync()
+        return self.base.get(stat, self.character.get(stat, 0))
+    
+    def get_effective(self, stat):
+        """Get a stat with modifiers (the value stored on the character)"""
+        return self.character.get(stat, 0)
+    
+    def set_modifier(self, source, stat, amount):
+        """Add or replace the modifier from a source"""
+        self.sync()
+        self._track(stat)
+        changed = {stat}
+        old = self.modifiers.get(source)
+        if old is not None:
+            self.totals[old[0]] -= old[1]
+            changed.add(old[0])
+        self.modifiers[source] = (stat, amount)
+        self.totals[stat] += amount
+        self._refresh(changed)
+    
+    def remove_modifier(self, source):
+        """
+        Remove the modifier from a source
+        
+        Returns: True if there was one
+        """
+        old = self.modifiers.pop(source, None)
+        if old is None:
+            return False
+        self.sync()
+        self.totals[old[0]] -= old[1]
+        self._refresh((old[0],))
+        return True
+    
+    def sync(self):
+        """Fold direct edits of the stat keys into the base stats"""
+        character = self.character
+        for stat, value in self.effective.items():
+            current = character.get(stat, 0)
+            if current != value:
+                self.base[stat] += current - value
+                self.effective[stat] = current
+    
+    def _track(self, stat):
+        """Start tracking a stat at its current value"""
+        if stat not in self.effective:
+            value = self.character.get(stat, 0)
+            self.effective[stat] = value
+            self.base[stat] = value
+            self.totals[stat] = 0
+    
+    def _refresh(self, stats):
+        """Recompute and write back the effective value of the given stats"""
+        character = self.character
+        for stat in stats:
+            value = self.base[stat] + self.totals[stat]
+            self.effective[stat] = value
+            character[stat] = value
+            if stat == 'max_health' and character.get('health', 0) > value:
+                character['health'] = value
+
+def get_character_stats(character):
+    """
+    Get the character's derived-stat block, creating it if needed
+    
+    Stored under 'stats'; equipment modifiers are saved separately (see
+    save_character), so the block itself is never written to disk.
+    
+    Returns: CharacterStats
+    """
+    stats = character.get('stats')
+    if stats is None:
+        stats = CharacterStats(character)
+        character['stats'] = stats
+    return stats
+
 # ============================================================================
 # CHARACTER MANAGEMENT FUNCTIONS
 # ============================================================================
@@ -31,6 +234,7 @@ def create_character(name, character_class):
     Returns: Dictionary with character data including:
             - name, class, level, health, max_health, strength, magic
             - experience, gold, inventory, active_quests, completed_quests
+            - quest_totals (running quest reward totals)
     
     Raises: InvalidCharacterClassError if class is not valid
     """
@@ -56,9 +260,10 @@ def create_character(name, character_class):
         "magic": base["magic"],
         "experience": 0,
         "gold": 100, 
-        "inventory": [],
-        "active_quests": [],
-        "completed_quests": []
+        "inventory": Inventory(),
+        "active_quests": QuestLog(),
+        "completed_quests": QuestLog(),
+        "quest_totals": {"completed": 0, "xp": 0, "gold": 0}
     }
 
 def save_character(character, save_directory="data/save_games"):
@@ -80,6 +285,16 @@ def save_character(character, save_directory="data/save_games"):
     INVENTORY: item1,item2,item3
     ACTIVE_QUESTS: quest1,quest2
     COMPLETED_QUESTS: quest1,quest2
+    QUEST_XP: 150
+    QUEST_GOLD: 100
+    QUEST_PROGRESS: goblin_hunter=2,orc_menace=1/0
+    EQUIPMENT: weapon=iron_sword:strength:5,armor=leather_armor:max_health:10
+    
+    QUEST_XP/QUEST_GOLD are the running quest reward totals and are only
+    written when the character has them. QUEST_PROGRESS holds objective
+    counters (one per objective, separated by "/") and is only written
+    when some active quest has them. EQUIPMENT lists each equipped slot
+    with its item and stat modifier; the stats above include them.
     
     Returns: True if successful
     Raises: PermissionError, IOError (let them propagate or handle)
@@ -102,9 +317,41 @@ def save_character(character, save_directory="data/save_games"):
         f.write("INVENTORY: " + ",".join(character["inventory"]) + "\n")
         f.write("ACTIVE_QUESTS: " + ",".join(character["active_quests"]) + "\n")
         f.write("COMPLETED_QUESTS: " + ",".join(character["completed_quests"]) + "\n")
+        totals = character.get("quest_totals")
+        if totals is not None:
+            f.write(f"QUEST_XP: {totals['xp']}\n")
+            f.write(f"QUEST_GOLD: {totals['gold']}\n")
+        progress = character.get("quest_progress")
+        if progress:
+            f.write("QUEST_PROGRESS: " + ",".join(
+                f"{qid}=" + "/".join(str(count) for count in counts)
+                for qid, counts in progress.items()) + "\n")
+        equipment = get_equipment_modifiers(character)
+        if equipment:
+            f.write("EQUIPMENT: " + ",".join(
+                f"{slot}={item_id}:{stat}:{amount}"
+                for slot, (item_id, stat, amount) in equipment.items()) + "\n")
 
     return True
 
+def get_equipment_modifiers(character):
+    """
+    Get each equipped slot with its item and stat modifier
+    
+    Returns: {slot: (item_id, stat, amount)}
+    """
+    stats = character.get("stats")
+    if stats is None:
+        return {}
+    equipment = {}
+    for source, (stat, amount) in stats.modifiers.items():
+        if source.startswith("equipment:"):
+            slot = source[len("equipment:"):]
+            item_id = character.get(f"equipped_{slot}")
+            if item_id:
+                equipment[slot] = (item_id, stat, amount)
+    return equipment
+
 def load_character(character_name, save_directory="data/save_games"):
     """
     Load character from save file
@@ -113,6 +360,9 @@ def load_character(character_name, save_directory="data/save_games"):
         character_name: Name of character to load
         save_directory: Directory containing save files
     
+    Saves without QUEST_XP/QUEST_GOLD (older saves) load without
+    'quest_totals'; quest_handler recomputes them on first use.
+    
     Returns: Character dictionary
     Raises: 
         CharacterNotFoundError if save file doesn't exist
@@ -157,10 +407,29 @@ def load_character(character_name, save_directory="data/save_games"):
             "magic": int(data["MAGIC"]),
             "experience": int(data["EXPERIENCE"]),
             "gold": int(data["GOLD"]),
-            "inventory": data["INVENTORY"].split(",") if data["INVENTORY"] else [],
-            "active_quests": data["ACTIVE_QUESTS"].split(",") if data["ACTIVE_QUESTS"] else [],
-            "completed_quests": data["COMPLETED_QUESTS"].split(",") if data["COMPLETED_QUESTS"] else []
+            "inventory": Inventory.from_save_string(data["INVENTORY"]),
+            "active_quests": QuestLog.from_save_string(data["ACTIVE_QUESTS"]),
+            "completed_quests": QuestLog.from_save_string(data["COMPLETED_QUESTS"])
         }
+        if "QUEST_XP" in data and "QUEST_GOLD" in data:
+            character["quest_totals"] = {
+                "completed": len(character["completed_quests"]),
+                "xp": int(data["QUEST_XP"]),
+                "gold": int(data["QUEST_GOLD"])
+            }
+        if data.get("QUEST_PROGRESS"):
+            character["quest_progress"] = {}
+            for entry in data["QUEST_PROGRESS"].split(","):
+                qid, counts = entry.split("=")
+                character["quest_progress"][qid] = [int(count) for count in counts.split("/")]
+        if data.get("EQUIPMENT"):
+            modifiers = {}
+            for entry in data["EQUIPMENT"].split(","):
+                slot, equipped = entry.split("=")
+                item_id, stat, amount = equipped.split(":")
+                character[f"equipped_{slot}"] = item_id
+                modifiers[f"equipment:{slot}"] = (stat, int(amount))
+            character["stats"] = CharacterStats(character, modifiers)
     except:
         raise InvalidSaveDataError()
 
@@ -221,14 +490,28 @@ def gain_experience(character, xp_amount):
 
     character["experience"] += xp_amount
 
-    while character["experience"] >= character["level"] * 100:
-        character["experience"] -= character["level"] * 100
+    while character["experience"] >= get_level_up_xp(character["level"]):
+        character["experience"] -= get_level_up_xp(character["level"])
         character["level"] += 1
         character["max_health"] += 10
         character["strength"] += 2
         character["magic"] += 2
         character["health"] = character["max_health"]
 
+    # let the quest availability index release newly reached level buckets
+    quest_index = character.get("quest_index")
+    if quest_index is not None and quest_index.character is character \
+            and quest_index.level != character["level"]:
+        quest_index.level_changed(character["level"])
+
+def get_level_up_xp(level):
+    """
+    Experience needed to go from level to level + 1
+    
+    Returns: Integer XP amount
+    """
+    return level * 100
+
 def add_gold(character, amount):
     """
     Add gold to character's inventory
@@ -304,11 +587,11 @@ def validate_character_data(character):
         if key not in character:
             raise InvalidSaveDataError()
 
-    if not isinstance(character["inventory"], list):
+    if not isinstance(character["inventory"], (list, Inventory)):
         raise InvalidSaveDataError()
-    if not isinstance(character["active_quests"], list):
+    if not isinstance(character["active_quests"], (list, QuestLog)):
         raise InvalidSaveDataError()
-    if not isinstance(character["completed_quests"], list):
+    if not isinstance(character["completed_quests"], (list, QuestLog)):
         raise InvalidSaveDataError()
 
     return True
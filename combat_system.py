@@ -9,17 +9,35 @@ AI Usage: [Document any AI assistance used]
 Handles combat mechanics
 """
 
+import asyncio
+import heapq
+import json
+import math
+import os
+import random
+import struct
+import weakref
 from custom_exceptions import (
+    CombatError,
     InvalidTargetError,
     CombatNotActiveError,
     CharacterDeadError,
-    AbilityOnCooldownError
+    AbilityOnCooldownError,
+    ItemNotFoundError,
+    CorruptedDataError
 )
 
 # ============================================================================
 # ENEMY DEFINITIONS
 # ============================================================================
 
+# Base stats for every enemy type, shared by create_enemy and EnemyPool
+ENEMY_TEMPLATES = {
+    'goblin': {'name': 'Goblin', 'health': 50, 'strength': 8, 'magic': 2, 'xp_reward': 25, 'gold_reward': 10},
+    'orc': {'name': 'Orc', 'health': 80, 'strength': 12, 'magic': 5, 'xp_reward': 50, 'gold_reward': 25},
+    'dragon': {'name': 'Dragon', 'health': 200, 'strength': 25, 'magic': 15, 'xp_reward': 200, 'gold_reward': 100}
+}
+
 def create_enemy(enemy_type):
     """
     Create an enemy based on type
@@ -34,16 +52,10 @@ def create_enemy(enemy_type):
     """
     enemy_type = enemy_type.lower()
 
-    templates = {
-        'goblin': {'name': 'Goblin', 'health': 50, 'strength': 8, 'magic': 2, 'xp_reward': 25, 'gold_reward': 10},
-        'orc': {'name': 'Orc', 'health': 80, 'strength': 12, 'magic': 5, 'xp_reward': 50, 'gold_reward': 25},
-        'dragon': {'name': 'Dragon', 'health': 200, 'strength': 25, 'magic': 15, 'xp_reward': 200, 'gold_reward': 100}
-    }
-
-    if enemy_type not in templates:
+    if enemy_type not in ENEMY_TEMPLATES:
         raise InvalidTargetError(f"Unknown enemy type: {enemy_type}")
 
-    tpl = templates[enemy_type]
+    tpl = ENEMY_TEMPLATES[enemy_type]
     return {
         'name': tpl['name'],
         'type': enemy_type,
@@ -55,7 +67,20 @@ def create_enemy(enemy_type):
         'gold_reward': tpl['gold_reward']
     }
 
-def get_random_enemy_for_level(character_level):
+def get_enemy_type_for_level(character_level):
+    """
+    Get the enemy type appropriate for a character level
+    
+    Returns: Enemy type string ('goblin', 'orc' or 'dragon')
+    """
+    if character_level <= 2:
+        return 'goblin'
+    elif 3 <= character_level <= 5:
+        return 'orc'
+    else:
+        return 'dragon'
+
+def get_random_enemy_for_level(character_level, pool=None):
     """
     Get an appropriate enemy for character's level
     
@@ -63,19 +88,164 @@ def get_random_enemy_for_level(character_level):
     Level 3-5: Orcs
     Level 6+: Dragons
     
+    Args:
+        character_level: Level of the character
+        pool: Optional EnemyPool to take a recycled enemy from
+    
     Returns: Enemy dictionary
     """
-    if character_level <= 2:
-        return create_enemy('goblin')
-    elif 3 <= character_level <= 5:
-        return create_enemy('orc')
-    else:
-        return create_enemy('dragon')
+    enemy_type = get_enemy_type_for_level(character_level)
+    if pool is not None:
+        return pool.acquire(enemy_type)
+    return create_enemy(enemy_type)
+
+# ============================================================================
+# ENEMY POOL
+# ============================================================================
+
+class PooledEnemy(dict):
+    """
+    Enemy dictionary handed out by an EnemyPool
+    
+    Behaves exactly like the dictionary from create_enemy, but remembers
+    which battle is using it so the pool knows when it is safe to reuse.
+    """
+    __slots__ = ('holder',)
+
+class EnemyPool:
+    """
+    Pool of reusable enemy dictionaries
+    
+    acquire() resets a released enemy to its template stats instead of
+    allocating a new one. An enemy is only reused once the battle that
+    last used it is gone or has moved on to another enemy, so a finished
+    battle that still holds battle.enemy never sees it change underneath it.
+    """
+    
+    def __init__(self, max_size=64):
+        """Initialize an empty pool holding at most max_size free enemies per type"""
+        self.max_size = max_size
+        self.free = {}
+        # ids of the enemies currently parked in self.free
+        self.free_ids = set()
+        self.acquired = 0
+        self.hits = 0
+        self.misses = 0
+        self.released = 0
+        self.skipped_in_use = 0
+    
+    def acquire(self, enemy_type):
+        """
+        Get an enemy of the given type, reusing a released one if possible
+        
+        Returns: Enemy dictionary reset to template stats
+        Raises: InvalidTargetError if enemy_type not recognized
+        """
+        enemy_type = enemy_type.lower()
+        if enemy_type not in ENEMY_TEMPLATES:
+            raise InvalidTargetError(f"Unknown enemy type: {enemy_type}")
+
+        self.acquired += 1
+        free = self.free.get(enemy_type)
+        if free:
+            # scan from the oldest release; battles still holding an enemy stay parked
+            for i in range(len(free)):
+                enemy = free[i]
+                if not self._in_use(enemy):
+                    del free[i]
+                    self.free_ids.discard(id(enemy))
+                    self.hits += 1
+                    self._reset(enemy, enemy_type)
+                    return enemy
+                self.skipped_in_use += 1
+
+        self.misses += 1
+        enemy = PooledEnemy()
+        enemy.holder = None
+        self._reset(enemy, enemy_type)
+        return enemy
+    
+    def release(self, enemy):
+        """
+        Return an enemy to the pool
+        
+        Enemies not created by a pool are ignored.
+        
+        Returns: True if the enemy was added to the pool
+        """
+        if not isinstance(enemy, PooledEnemy):
+            return False
+
+        if id(enemy) in self.free_ids:
+            return False
+        free = self.free.setdefault(enemy['type'], [])
+        if len(free) >= self.max_size:
+            return False
+
+        free.append(enemy)
+        self.free_ids.add(id(enemy))
+        self.released += 1
+        return True
+    
+    def get_stats(self):
+        """
+        Get pool instrumentation
+        
+        Returns: Dictionary with acquired, hits, misses, released,
+                 skipped_in_use and hit_rate (hits are allocations saved)
+        """
+        return {
+            'acquired': self.acquired,
+            'hits': self.hits,
+            'misses': self.misses,
+            'released': self.released,
+            'skipped_in_use': self.skipped_in_use,
+            'hit_rate': self.hits / self.acquired if self.acquired else 0.0
+        }
+    
+    def _in_use(self, enemy):
+        """Check whether a live battle still references this enemy"""
+        if enemy.holder is None:
+            return False
+        battle = enemy.holder()
+        if battle is None:
+            return False
+        if isinstance(battle, GroupBattle):
+            return any(e is enemy for e in battle.enemies)
+        return battle.enemy is enemy
+    
+    def _reset(self, enemy, enemy_type):
+        """Restore template stats on a pooled enemy"""
+        tpl = ENEMY_TEMPLATES[enemy_type]
+        enemy.holder = None
+        enemy['name'] = tpl['name']
+        enemy['type'] = enemy_type
+        enemy['health'] = tpl['health']
+        enemy['max_health'] = tpl['health']
+        enemy['strength'] = tpl['strength']
+        enemy['magic'] = tpl['magic']
+        enemy['xp_reward'] = tpl['xp_reward']
+        enemy['gold_reward'] = tpl['gold_reward']
 
 # ============================================================================
 # COMBAT SYSTEM
 # ============================================================================
 
+# Player actions understood by SimpleBattle.player_turn
+# (items are used with an (ACTION_ITEM, item_id) pair)
+ACTION_ATTACK = 'attack'
+ACTION_ABILITY = 'ability'
+ACTION_ITEM = 'item'
+ACTION_FLEE = 'flee'
+
+# Special ability and cooldown (in turns) for each class
+CLASS_ABILITIES = {
+    'warrior': ('power_strike', 2),
+    'mage': ('fireball', 2),
+    'rogue': ('critical_strike', 1),
+    'cleric': ('heal', 3)
+}
+
 class SimpleBattle:
     """
     Simple turn-based combat system
@@ -83,14 +253,49 @@ class SimpleBattle:
     Manages combat between character and enemy
     """
     
-    def __init__(self, character, enemy):
-        """Initialize battle with character and enemy"""
+    def __init__(self, character, enemy, pool=None, strategy=None, item_data_dict=None, verbose=True,
+                 rng=None, seed=None, record=False):
+        """
+        Initialize battle with character and enemy
+        
+        Args:
+            character: Character dictionary
+            enemy: Enemy dictionary
+            pool: Optional EnemyPool the enemy is released to when the battle ends
+            strategy: Optional BattleStrategy choosing the player's actions
+                      (defaults to basic attacks)
+            item_data_dict: Item data, needed for ACTION_ITEM
+            verbose: Print the battle log (turn off for simulations)
+            rng: Random number generator (anything with a random() method,
+                 e.g. random.Random); every random roll in the battle uses it
+            seed: Seed for a new random.Random when rng is not given; the
+                  same seed and starting dictionaries replay the same battle
+            record: Record every action into self.recorder (a BattleRecorder);
+                    off by default so bulk simulations stay allocation-free
+        """
         self.character = character
         self.enemy = enemy
+        self.pool = pool
+        if isinstance(enemy, PooledEnemy):
+            enemy.holder = weakref.ref(self)
+        self.strategy = strategy
+        self.item_data_dict = item_data_dict
+        self.verbose = verbose
+        self.seed = seed
+        if rng is None:
+            rng = random.Random(seed) if seed is not None else random
+        self.rng = rng
+        self.recorder = BattleRecorder(character, enemy, seed) if record else None
+        self.effects = StatusEffectManager()
+        # damage tables for the current strength pair, see get_damage_tables
+        self.table_strengths = (None, None)
+        self.player_damage = None
+        self.enemy_damage = None
         self.combat_active = True
+        # number of completed rounds
         self.turn = 0
-        # simple cooldown tracking for special ability usage
-        self.ability_used = False
+        # turn each ability was last used, for cooldown tracking
+        self.ability_turns = {}
     
     def start_battle(self):
         """
@@ -98,70 +303,288 @@ class SimpleBattle:
         
         Returns: Dictionary with battle results:
                 {'winner': 'player'|'enemy', 'xp_gained': int, 'gold_gained': int}
+                Victories also list 'quests_completed' (quest IDs whose
+                objectives the win finished)
+        
+        Raises: CharacterDeadError if character is already dead
+        """
+        try:
+            self.begin_battle()
+
+            # simple loop: player then enemy until one dies or escape
+            while self.combat_active:
+                self.play_round()
+        except BaseException:
+            self.abort_battle()
+            raise
+
+        return self.finish_battle()
+    
+    async def start_battle_async(self, get_action=None, turn_timeout=None):
+        """
+        Run the combat loop as a coroutine
+        
+        Yields to the event loop between rounds so many battles can share
+        one loop. Each round's state changes happen without awaiting, so
+        cancelling the task between rounds leaves the character consistent
+        (no half-applied turns, no rewards granted).
+        
+        Args:
+            get_action: Optional coroutine function called with the battle,
+                        returning the player's action for the round
+                        (defaults to the battle's strategy)
+            turn_timeout: Seconds to wait for get_action before falling
+                          back to a basic attack (None waits forever)
         
+        Returns: Same dictionary as start_battle
         Raises: CharacterDeadError if character is already dead
         """
-        from character_manager import is_character_dead, gain_experience, add_gold
+        try:
+            self.begin_battle()
+            while self.combat_active:
+                action = None
+                if get_action is not None:
+                    try:
+                        action = await asyncio.wait_for(get_action(self), turn_timeout)
+                    except asyncio.TimeoutError:
+                        if self.verbose:
+                            display_battle_log(f"{self.character['name']} hesitates and attacks.")
+                        action = ACTION_ATTACK
+
+                self.play_round(action)
+                await asyncio.sleep(0)
+        except BaseException:
+            self.abort_battle()
+            raise
+
+        return self.finish_battle()
+    
+    def abort_battle(self):
+        """
+        Stop a battle that ended with an exception
+        
+        Effects are cleared and the enemy goes back to the pool; no
+        rewards are granted.
+        """
+        self.combat_active = False
+        self.effects.clear()
+        self.release_enemy()
+    
+    def begin_battle(self):
+        """
+        Check that the battle can start
+        
+        Raises: CharacterDeadError if character is already dead
+        """
+        from character_manager import is_character_dead
 
         if is_character_dead(self.character):
             raise CharacterDeadError()
 
-        # simple loop: player then enemy until one dies or escape
-        while self.combat_active:
-            self.turn += 1
-            # player acts
-            self.player_turn()
+        self.get_damage_tables()
+    
+    def play_round(self, action=None):
+        """
+        Play one round: the player's action, then the enemy's attack
+        
+        Status effects tick first. If action is None it is taken from
+        choose_action.
+        
+        Returns: Result of check_battle_end after the round
+        Raises: CombatNotActiveError if called outside of battle
+        """
+        if not self.combat_active:
+            raise CombatNotActiveError()
 
-            # check end
+        # effects applied this round count their duration from this turn,
+        # even if the manager has not ticked yet
+        self.effects.turn = self.turn
+        if self.effects.active:
+            self.tick_effects()
             result = self.check_battle_end()
             if result is not None:
-                break
+                self.turn += 1
+                return result
 
-            # enemy acts
-            self.enemy_turn()
+        if action is None:
+            action = self.choose_action()
+        self.player_turn(action)
 
+        result = self.check_battle_end()
+        if result is None and self.combat_active:
+            self.enemy_turn()
             result = self.check_battle_end()
-            if result is not None:
-                break
+
+        self.turn += 1
+        return result
+    
+    def tick_effects(self):
+        """
+        Apply this turn's status effect ticks and expire finished effects
+        
+        Returns: Number of effect ticks applied
+        """
+        character = self.character
+        enemy = self.enemy
+        player_before = character.get('health', 0)
+        enemy_before = enemy.get('health', 0)
+
+        ticks = self.effects.tick(self.turn, display_battle_log if self.verbose else None)
+
+        if self.recorder is not None:
+            player_after = character.get('health', 0)
+            enemy_after = enemy.get('health', 0)
+            if player_after != player_before:
+                self.recorder.record(self.turn, ACTOR_PLAYER, EVENT_EFFECT,
+                                     player_after - player_before, player_after, enemy_after)
+            if enemy_after != enemy_before:
+                self.recorder.record(self.turn, ACTOR_ENEMY, EVENT_EFFECT,
+                                     enemy_after - enemy_before, player_after, enemy_after)
+        return ticks
+    
+    def choose_action(self):
+        """
+        Ask the battle's strategy for the player's next action
+        
+        Returns: Action (ACTION_ATTACK if the battle has no strategy)
+        """
+        if self.strategy is None:
+            return ACTION_ATTACK
+        return self.strategy.choose_action(self)
+    
+    def finish_battle(self):
+        """
+        Release the enemy and grant rewards once the battle is over
+        
+        Returns: Dictionary with battle results (see start_battle)
+        """
+        from character_manager import gain_experience, add_gold
 
         winner = self.check_battle_end()
+        # effects end with the battle; stat modifiers are reverted
+        self.effects.clear()
+        self.release_enemy()
 
         if winner == 'player':
             rewards = get_victory_rewards(self.enemy)
             # grant rewards
             gain_experience(self.character, rewards['xp'])
             add_gold(self.character, rewards['gold'])
+            quests = publish_defeats(self.character, [self.enemy])
 
-            return {'winner': 'player', 'xp_gained': rewards['xp'], 'gold_gained': rewards['gold']}
+            return {'winner': 'player', 'xp_gained': rewards['xp'], 'gold_gained': rewards['gold'],
+                    'quests_completed': quests}
         elif winner == 'enemy':
             return {'winner': 'enemy', 'xp_gained': 0, 'gold_gained': 0}
 
         # If combat ended without clear winner (escape)
         return {'winner': 'none', 'xp_gained': 0, 'gold_gained': 0}
     
-    def player_turn(self):
+    def player_turn(self, action=ACTION_ATTACK):
         """
         Handle player's turn
         
-        Displays options:
-        1. Basic Attack
-        2. Special Ability (if available)
-        3. Try to Run
+        Actions:
+        - ACTION_ATTACK: Basic Attack (default)
+        - ACTION_ABILITY: Special Ability (if off cooldown)
+        - (ACTION_ITEM, item_id): Use a consumable
+        - ACTION_FLEE: Try to Run
         
-        Raises: CombatNotActiveError if called outside of battle
+        Raises:
+            CombatNotActiveError if called outside of battle
+            AbilityOnCooldownError if the special ability is on cooldown
+            CombatError if action is not recognized
         """
         if not self.combat_active:
             raise CombatNotActiveError()
 
-        # For automated tests and non-interactive use, default to basic attack
-        # If running interactively, we could prompt; here we perform basic attack
-        # Basic attack
-        damage = self.calculate_damage(self.character, self.enemy)
-        self.apply_damage(self.enemy, damage)
-        display_battle_log(f"{self.character['name']} attacks {self.enemy['name']} for {damage} damage.")
+        character = self.character
+        enemy = self.enemy
+        player_before = character.get('health', 0)
+        enemy_before = enemy.get('health', 0)
+
+        if action == ACTION_ATTACK:
+            event = EVENT_ATTACK
+            damage = self.calculate_damage(character, enemy)
+            self.apply_damage(enemy, damage)
+            if self.verbose:
+                display_battle_log(f"{character['name']} attacks {enemy['name']} for {damage} damage.")
+        elif action == ACTION_ABILITY:
+            event = EVENT_ABILITY
+            self.use_ability()
+        elif action == ACTION_FLEE:
+            event = EVENT_ESCAPE if self.attempt_escape() else EVENT_ESCAPE_FAILED
+        elif type(action) is tuple and action[0] == ACTION_ITEM:
+            event = EVENT_ITEM
+            self.use_item(action[1])
+        else:
+            raise CombatError(f"Unknown action: {action}")
 
-        # Reset ability flag per-turn (simple model)
-        self.ability_used = False
+        if self.recorder is not None:
+            player_after = character.get('health', 0)
+            enemy_after = enemy.get('health', 0)
+            # net swing in the player's favour: damage dealt plus health restored
+            amount = (enemy_before - enemy_after) + (player_after - player_before)
+            self.recorder.record(self.turn, ACTOR_PLAYER, event, amount, player_after, enemy_after)
+    
+    def use_ability(self):
+        """
+        Use the character's special ability and start its cooldown
+        
+        Returns: String describing what happened (None if not verbose)
+        Raises: AbilityOnCooldownError if the ability was used too recently
+        """
+        name, cooldown = get_class_ability(self.character)
+        remaining = self.get_cooldown_remaining(name)
+        if remaining:
+            raise AbilityOnCooldownError(f"{name} is ready in {remaining} turn(s)")
+
+        message = use_special_ability(self.character, self.enemy, self.rng,
+                                      self.get_damage_tables()[0], self.effects,
+                                      describe=self.verbose)
+        self.ability_turns[name] = self.turn
+        if self.verbose:
+            display_battle_log(message)
+        return message
+    
+    def get_cooldown_remaining(self, ability_name):
+        """
+        Get how many more turns an ability is blocked for
+        
+        Returns: Integer number of turns (0 if ready)
+        """
+        used = self.ability_turns.get(ability_name)
+        if used is None:
+            return 0
+        cooldown = ABILITY_COOLDOWNS.get(ability_name, 0)
+        return max(0, used + cooldown + 1 - self.turn)
+    
+    def is_ability_ready(self):
+        """
+        Check if the character's special ability can be used this turn
+        
+        Returns: True if ready, False if on cooldown or class has no ability
+        """
+        ability = CLASS_ABILITIES.get(self.character.get('class', '').lower())
+        return ability is not None and self.get_cooldown_remaining(ability[0]) == 0
+    
+    def use_item(self, item_id):
+        """
+        Use a consumable from the character's inventory
+        
+        Returns: String describing what happened
+        Raises: ItemNotFoundError if the item has no data in item_data_dict
+                (plus any error from inventory_system.use_item)
+        """
+        from inventory_system import use_item
+
+        if not self.item_data_dict or item_id not in self.item_data_dict:
+            raise ItemNotFoundError(f"No item data for {item_id}")
+
+        message = use_item(self.character, item_id, self.item_data_dict[item_id])
+        if self.verbose:
+            display_battle_log(message)
+        return message
     
     def enemy_turn(self):
         """
@@ -176,7 +599,11 @@ class SimpleBattle:
 
         damage = self.calculate_damage(self.enemy, self.character)
         self.apply_damage(self.character, damage)
-        display_battle_log(f"{self.enemy['name']} attacks {self.character['name']} for {damage} damage.")
+        if self.verbose:
+            display_battle_log(f"{self.enemy['name']} attacks {self.character['name']} for {damage} damage.")
+        if self.recorder is not None:
+            self.recorder.record(self.turn, ACTOR_ENEMY, EVENT_ATTACK, damage,
+                                 self.character.get('health', 0), self.enemy.get('health', 0))
     
     def calculate_damage(self, attacker, defender):
         """
@@ -185,14 +612,34 @@ class SimpleBattle:
         Damage formula: attacker['strength'] - (defender['strength'] // 4)
         Minimum damage: 1
         
+        Uses the battle's precomputed damage tables for the two combatants
+        and the shared DAMAGE_TABLES cache for anyone else.
+        
         Returns: Integer damage amount
         """
-        base = attacker.get('strength', 0)
-        reduced = defender.get('strength', 0) // 4
-        dmg = base - reduced
-        if dmg < 1:
-            dmg = 1
-        return dmg
+        if attacker is self.character and defender is self.enemy:
+            return self.get_damage_tables()[0][DAMAGE_BASIC]
+        if attacker is self.enemy and defender is self.character:
+            return self.get_damage_tables()[1][DAMAGE_BASIC]
+        return calculate_attack_damage(attacker, defender)
+    
+    def get_damage_tables(self):
+        """
+        Get the damage tables for player -> enemy and enemy -> player
+        
+        Tables are fetched from DAMAGE_TABLES when the battle starts and
+        fetched again only if either side's strength has changed since.
+        
+        Returns: Tuple of (player_table, enemy_table)
+        """
+        player_strength = self.character.get('strength', 0)
+        enemy_strength = self.enemy.get('strength', 0)
+        strengths = self.table_strengths
+        if player_strength != strengths[0] or enemy_strength != strengths[1]:
+            self.table_strengths = (player_strength, enemy_strength)
+            self.player_damage = DAMAGE_TABLES.get(player_strength, enemy_strength)
+            self.enemy_damage = DAMAGE_TABLES.get(enemy_strength, player_strength)
+        return self.player_damage, self.enemy_damage
     
     def apply_damage(self, target, damage):
         """
@@ -219,88 +666,1286 @@ class SimpleBattle:
 
         return None
     
+    def release_enemy(self):
+        """
+        Hand the enemy back to the battle's pool, if it has one
+        
+        The battle keeps its enemy reference; the pool will not reuse the
+        enemy while this battle is still alive and pointing at it.
+        
+        Returns: True if the enemy was returned to the pool
+        """
+        if self.pool is None:
+            return False
+        return self.pool.release(self.enemy)
+    
     def attempt_escape(self):
         """
         Try to escape from battle
         
-        50% success chance
+        50% success chance, rolled on the battle's rng
         
         Returns: True if escaped, False if failed
         """
-        import random
-
-        success = random.random() < 0.5
+        success = self.rng.random() < 0.5
         if success:
             self.combat_active = False
-            display_battle_log(f"{self.character['name']} successfully escaped from {self.enemy['name']}!")
+            if self.verbose:
+                display_battle_log(f"{self.character['name']} successfully escaped from {self.enemy['name']}!")
             return True
 
-        display_battle_log(f"{self.character['name']} failed to escape.")
+        if self.verbose:
+            display_battle_log(f"{self.character['name']} failed to escape.")
         return False
 
+# Cooldown in turns for each ability name
+ABILITY_COOLDOWNS = {name: cooldown for name, cooldown in CLASS_ABILITIES.values()}
+
+def get_class_ability(character):
+    """
+    Get the special ability for a character's class
+    
+    Returns: Tuple of (ability_name, cooldown_turns)
+    Raises: AbilityOnCooldownError if the class has no special ability
+    """
+    ability = CLASS_ABILITIES.get(character.get('class', '').lower())
+    if ability is None:
+        raise AbilityOnCooldownError("Unknown class or ability not available")
+    return ability
+
+# ============================================================================
+# BATTLE REPLAYS
+# ============================================================================
+
+# Who acted in a replay event
+ACTOR_PLAYER = 0
+ACTOR_ENEMY = 1
+
+# What they did
+EVENT_ATTACK = 0
+EVENT_ABILITY = 1
+EVENT_ITEM = 2
+EVENT_ESCAPE = 3
+EVENT_ESCAPE_FAILED = 4
+# health change on the actor from status effect ticks
+EVENT_EFFECT = 5
+
+EVENT_NAMES = {
+    EVENT_ATTACK: 'attack',
+    EVENT_ABILITY: 'ability',
+    EVENT_ITEM: 'item',
+    EVENT_ESCAPE: 'escape',
+    EVENT_ESCAPE_FAILED: 'escape_failed',
+    EVENT_EFFECT: 'effect'
+}
+
+# Enemy types stored as one byte in the replay header (0 = unknown)
+ENEMY_TYPE_CODES = {'goblin': 1, 'orc': 2, 'dragon': 3}
+
+REPLAY_MAGIC = b'QCR'
+REPLAY_VERSION = 2
+# magic, version, has_seed, seed, enemy type, player health/max, enemy health/max
+REPLAY_HEADER = struct.Struct('<3sBBqBiiii')
+# turn, actor, event, amount, player health after, enemy health after
+REPLAY_EVENT = struct.Struct('<IBBiii')
+
+def unpack_replay_header(data):
+    """
+    Check a battle recording's framing and read its header
+    
+    Returns: Header tuple (see REPLAY_HEADER)
+    Raises: CorruptedDataError if data is not a recording of this version
+    """
+    if len(data) < REPLAY_HEADER.size:
+        raise CorruptedDataError("Battle recording has the wrong size")
+    header = REPLAY_HEADER.unpack_from(data)
+    if header[0] != REPLAY_MAGIC:
+        raise CorruptedDataError("Not a battle recording")
+    # version 1 stored the turn in 16 bits and is no longer readable
+    if header[1] != REPLAY_VERSION:
+        raise CorruptedDataError(f"Unsupported battle recording version {header[1]}")
+    if (len(data) - REPLAY_HEADER.size) % REPLAY_EVENT.size:
+        raise CorruptedDataError("Battle recording has the wrong size")
+    return header
+
+class BattleRecorder:
+    """
+    Records a battle as a compact binary event stream
+    
+    The stream is a fixed header followed by one REPLAY_EVENT.size-byte
+    (18-byte) record per action.
+    Each record stores both sides' health after the action, so a replay
+    can seek to any turn without re-rolling any random numbers.
+    """
+    
+    def __init__(self, character, enemy, seed=None):
+        """
+        Start a recording with the combatants' starting health
+        
+        Only integer seeds that fit in 64 bits are stored in the header.
+        """
+        has_seed = isinstance(seed, int) and -2 ** 63 <= seed < 2 ** 63
+        self.data = bytearray(REPLAY_HEADER.pack(
+            REPLAY_MAGIC, REPLAY_VERSION,
+            has_seed, seed if has_seed else 0,
+            ENEMY_TYPE_CODES.get(enemy.get('type'), 0),
+            character.get('health', 0), character.get('max_health', 0),
+            enemy.get('health', 0), enemy.get('max_health', 0)
+        ))
+    
+    def record(self, turn, actor, event, amount, player_health, enemy_health):
+        """Append one event to the stream"""
+        self.data += REPLAY_EVENT.pack(turn, actor, event, amount, player_health, enemy_health)
+    
+    def to_bytes(self):
+        """
+        Get the finished recording
+        
+        Returns: bytes suitable for storing and for BattleReplay
+        """
+        return bytes(self.data)
+
+class BattleReplay:
+    """
+    Reads a recording made by BattleRecorder
+    
+    Events are fixed-size records ordered by turn, so seeking to a turn is
+    a binary search and bulk scans use struct.iter_unpack directly on the
+    buffer.
+    """
+    
+    def __init__(self, data):
+        """
+        Open a recording
+        
+        Raises: CorruptedDataError if data is not a valid battle recording
+        """
+        if isinstance(data, BattleRecorder):
+            data = data.data
+        self.data = memoryview(bytes(data))
+        (magic, version, has_seed, seed, enemy_code, player_health, player_max,
+         enemy_health, enemy_max) = unpack_replay_header(self.data)
+
+        self.seed = seed if has_seed else None
+        self.enemy_type = next((t for t, c in ENEMY_TYPE_CODES.items() if c == enemy_code), None)
+        self.start = (player_health, enemy_health)
+        self.max_health = (player_max, enemy_max)
+        self.event_count = (len(self.data) - REPLAY_HEADER.size) // REPLAY_EVENT.size
+    
+    def __len__(self):
+        """Number of recorded events"""
+        return self.event_count
+    
+    def events(self):
+        """
+        Iterate over recorded events
+        
+        Yields: Tuples of (turn, actor, event, amount, player_health, enemy_health)
+        """
+        return REPLAY_EVENT.iter_unpack(self.data[REPLAY_HEADER.size:])
+    
+    def get_event(self, index):
+        """
+        Get one event by position
+        
+        Returns: Tuple of (turn, actor, event, amount, player_health, enemy_health)
+        """
+        return REPLAY_EVENT.unpack_from(self.data, REPLAY_HEADER.size + index * REPLAY_EVENT.size)
+    
+    def seek(self, turn):
+        """
+        Get both sides' health at the end of a turn
+        
+        Turns are numbered from 0; seeking before the first event returns
+        the starting health.
+        
+        Returns: Tuple of (player_health, enemy_health)
+        """
+        # find the last event whose turn is <= turn
+        lo, hi = 0, self.event_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.get_event(mid)[0] <= turn:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == 0:
+            return self.start
+        event = self.get_event(lo - 1)
+        return (event[4], event[5])
+    
+    def get_result(self):
+        """
+        Get the outcome of the recorded battle
+        
+        Returns: Dictionary with 'winner' ('player'|'enemy'|'none'),
+                 'turns', 'player_health' and 'enemy_health'
+        """
+        if self.event_count == 0:
+            player_health, enemy_health = self.start
+            turns = 0
+        else:
+            turn, _, _, _, player_health, enemy_health = self.get_event(self.event_count - 1)
+            turns = turn + 1
+
+        if enemy_health <= 0:
+            winner = 'player'
+        elif player_health <= 0:
+            winner = 'enemy'
+        else:
+            winner = 'none'
+        return {'winner': winner, 'turns': turns,
+                'player_health': player_health, 'enemy_health': enemy_health}
+    
+    def play(self, until_turn=None, log=None):
+        """
+        Re-run the battle log from the recording
+        
+        Args:
+            until_turn: Stop after this turn (None plays everything)
+            log: Function called with each message (defaults to display_battle_log)
+        
+        Returns: Tuple of (player_health, enemy_health) where playback stopped
+        """
+        if log is None:
+            log = display_battle_log
+
+        state = self.start
+        for turn, actor, event, amount, player_health, enemy_health in self.events():
+            if until_turn is not None and turn > until_turn:
+                break
+            who = 'Player' if actor == ACTOR_PLAYER else 'Enemy'
+            log(f"Turn {turn + 1}: {who} {EVENT_NAMES.get(event, '?')} ({amount:+d}) "
+                f"-> player {player_health}, enemy {enemy_health}")
+            state = (player_health, enemy_health)
+        return state
+
+def summarize_replays(recordings):
+    """
+    Scan many battle recordings for analytics
+    
+    Args:
+        recordings: Iterable of bytes produced by BattleRecorder.to_bytes
+    
+    Returns: Dictionary with 'battles', 'wins', 'losses', 'escapes',
+             'turns', 'player_damage' and 'enemy_damage' totals
+             (player_damage counts attacks and abilities; items and
+             status effect ticks are skipped)
+    Raises: CorruptedDataError if any recording is not a valid battle recording
+    """
+    summary = {'battles': 0, 'wins': 0, 'losses': 0, 'escapes': 0,
+               'turns': 0, 'player_damage': 0, 'enemy_damage': 0}
+    header_size = REPLAY_HEADER.size
+
+    for data in recordings:
+        data = memoryview(data)
+        unpack_replay_header(data)
+        summary['battles'] += 1
+        player_damage = 0
+        enemy_damage = 0
+        last = None
+        for last in REPLAY_EVENT.iter_unpack(data[header_size:]):
+            if last[2] == EVENT_EFFECT:
+                continue
+            if last[1] == ACTOR_PLAYER:
+                if last[2] != EVENT_ITEM:
+                    player_damage += last[3]
+            else:
+                enemy_damage += last[3]
+        summary['player_damage'] += player_damage
+        summary['enemy_damage'] += enemy_damage
+
+        if last is None:
+            continue
+        summary['turns'] += last[0] + 1
+        if last[5] <= 0:
+            summary['wins'] += 1
+        elif last[4] <= 0:
+            summary['losses'] += 1
+        elif last[2] == EVENT_ESCAPE:
+            summary['escapes'] += 1
+
+    return summary
+
+# ============================================================================
+# BATTLE STRATEGIES
+# ============================================================================
+
+class BattleStrategy:
+    """
+    Chooses the player's action each turn of a SimpleBattle
+    
+    Subclasses override choose_action. The base strategy always attacks.
+    """
+    
+    def choose_action(self, battle):
+        """
+        Pick the player's action for this turn
+        
+        Returns: ACTION_ATTACK, ACTION_ABILITY, ACTION_FLEE or (ACTION_ITEM, item_id)
+        """
+        return ACTION_ATTACK
+
+class AutoBattleStrategy(BattleStrategy):
+    """
+    Non-interactive strategy for auto-battle and simulations
+    
+    Drinks heal_item when health drops below heal_below of max_health,
+    uses the class ability whenever it is ready (clerics only heal once
+    they have lost 30 health), and attacks otherwise.
+    """
+    
+    def __init__(self, heal_item=None, heal_below=0.3):
+        """Initialize strategy with an optional healing consumable"""
+        self.heal_below = heal_below
+        # built once so choosing an item action allocates nothing per turn
+        self.heal_action = (ACTION_ITEM, heal_item) if heal_item else None
+    
+    def choose_action(self, battle):
+        """Pick heal, ability or attack for this turn"""
+        character = battle.character
+        health = character.get('health', 0)
+        max_health = character.get('max_health', 0)
+
+        if self.heal_action is not None and health < max_health * self.heal_below \
+                and self.heal_action[1] in character.get('inventory', ()):
+            return self.heal_action
+
+        if battle.is_ability_ready():
+            if character.get('class', '').lower() != 'cleric' or max_health - health >= 30:
+                return ACTION_ABILITY
+
+        return ACTION_ATTACK
+
+class InteractiveStrategy(BattleStrategy):
+    """Prompts the player for an action each turn"""
+    
+    def choose_action(self, battle):
+        """
+        Display options and read the player's choice
+        
+        Options:
+        1. Basic Attack
+        2. Special Ability (if available)
+        3. Use Item
+        4. Try to Run
+        
+        Choosing the ability while it is cooling down, or an item that is
+        not held or is not a consumable, is refused and the menu is shown
+        again.
+        """
+        while True:
+            display_combat_stats(battle.character, battle.enemy)
+            ability = "Special Ability" if battle.is_ability_ready() else "Special Ability (cooling down)"
+            print(f"1) Basic Attack\n2) {ability}\n3) Use Item\n4) Try to Run")
+            choice = input("Choose 1-4: ").strip()
+
+            if choice == '2':
+                if battle.is_ability_ready():
+                    return ACTION_ABILITY
+                print("Your special ability is still cooling down.")
+                continue
+            if choice == '3':
+                item_id = input("Item ID to use: ").strip()
+                item = (battle.item_data_dict or {}).get(item_id)
+                if item_id not in battle.character.get('inventory', ()):
+                    print("You don't have that item.")
+                elif item is None or item.get('type') != 'consumable':
+                    print("Only consumable items can be used in battle.")
+                else:
+                    return (ACTION_ITEM, item_id)
+                continue
+            if choice == '4':
+                return ACTION_FLEE
+            return ACTION_ATTACK
+
+async def run_battles(battles, get_action=None, turn_timeout=None):
+    """
+    Run several battles concurrently on the current event loop
+    
+    Args:
+        battles: List of SimpleBattle objects
+        get_action: Optional coroutine function shared by all battles
+        turn_timeout: Seconds to wait for each player action
+    
+    Returns: List of battle result dictionaries, in the same order as battles
+    """
+    return await asyncio.gather(*(
+        battle.start_battle_async(get_action, turn_timeout) for battle in battles
+    ))
+
+# ============================================================================
+# GROUP COMBAT
+# ============================================================================
+
+# Speed used for combatants without a 'speed' stat
+DEFAULT_SPEED = 10
+
+# Time units on the initiative clock; a combatant acts every
+# INITIATIVE_SCALE // speed units, so faster combatants act more often
+INITIATIVE_SCALE = 1000
+
+class GroupBattle:
+    """
+    Turn-based combat between a party and a group of enemies
+    
+    Turn order comes from a heap keyed on each combatant's next action
+    time, so faster combatants (higher 'speed') act more often. Each side
+    keeps a heap of living targets ordered by health, and attackers focus
+    the weakest one. Dead combatants are dropped lazily when they reach
+    the top of a heap, so a turn costs O(log n) no matter how many
+    combatants are in the fight.
+    
+    With one character and one enemy of equal speed this plays out exactly
+    like SimpleBattle: player then enemy, basic attacks, same rewards.
+    """
+    
+    PARTY = 0
+    ENEMIES = 1
+    
+    def __init__(self, party, enemies, pool=None, verbose=True):
+        """
+        Initialize battle with a list of characters and a list of enemies
+        
+        If pool is given, enemies are released back to it when the battle ends.
+        
+        Raises: InvalidTargetError if enemies is empty
+        """
+        self.party = list(party)
+        self.enemies = list(enemies)
+        if not self.enemies:
+            raise InvalidTargetError("A group battle needs at least one enemy")
+        self.pool = pool
+        for enemy in self.enemies:
+            if isinstance(enemy, PooledEnemy):
+                enemy.holder = weakref.ref(self)
+        self.verbose = verbose
+        self.combat_active = True
+        self.turn = 0
+
+        self.combatants = self.party + self.enemies
+        self.sides = [self.PARTY] * len(self.party) + [self.ENEMIES] * len(self.enemies)
+        # bumped whenever a combatant's health changes; stale heap entries carry old versions
+        self.versions = [0] * len(self.combatants)
+        self.alive = [0, 0]
+        self.schedule = []
+        self.targets = ([], [])
+
+        for idx, combatant in enumerate(self.combatants):
+            if combatant.get('health', 0) <= 0:
+                continue
+            side = self.sides[idx]
+            self.alive[side] += 1
+            self.schedule.append((get_action_delay(combatant), idx))
+            self.targets[side].append((combatant['health'], idx, 0))
+
+        heapq.heapify(self.schedule)
+        heapq.heapify(self.targets[0])
+        heapq.heapify(self.targets[1])
+    
+    def start_battle(self):
+        """
+        Run the combat loop until one side is wiped out
+        
+        Returns: Dictionary with battle results:
+                {'winner': 'player'|'enemy', 'xp_gained': int, 'gold_gained': int}
+                xp and gold are per surviving party member; victories also
+                list 'quests_completed' across the whole party
+        
+        Raises: CharacterDeadError if every party member is already dead
+        """
+        from character_manager import gain_experience, add_gold
+
+        try:
+            if self.alive[self.PARTY] == 0:
+                raise CharacterDeadError()
+
+            # enemies that start dead end the battle before anyone acts
+            self.check_battle_end()
+            while self.combat_active:
+                self.take_turn()
+        finally:
+            if self.pool is not None:
+                for enemy in self.enemies:
+                    self.pool.release(enemy)
+
+        winner = self.check_battle_end()
+
+        if winner != 'player':
+            return {'winner': 'enemy', 'xp_gained': 0, 'gold_gained': 0}
+
+        total_xp = 0
+        total_gold = 0
+        for enemy in self.enemies:
+            rewards = get_victory_rewards(enemy)
+            total_xp += rewards['xp']
+            total_gold += rewards['gold']
+
+        survivors = [c for c in self.party if c.get('health', 0) > 0]
+        xp_each = total_xp // len(survivors)
+        gold_each = total_gold // len(survivors)
+        quests = []
+        for member in survivors:
+            gain_experience(member, xp_each)
+            add_gold(member, gold_each)
+            quests.extend(publish_defeats(member, self.enemies))
+
+        return {'winner': 'player', 'xp_gained': xp_each, 'gold_gained': gold_each,
+                'quests_completed': quests}
+    
+    def take_turn(self):
+        """
+        Let the next combatant in initiative order act
+        
+        Returns: Index of the combatant that acted
+        Raises: CombatNotActiveError if the battle is over
+        """
+        if not self.combat_active:
+            raise CombatNotActiveError()
+
+        schedule = self.schedule
+        while True:
+            ready_at, idx = heapq.heappop(schedule)
+            actor = self.combatants[idx]
+            if actor.get('health', 0) > 0:
+                break
+
+        self.turn += 1
+        target_idx = self.pick_target(1 - self.sides[idx])
+        target = self.combatants[target_idx]
+        damage = calculate_attack_damage(actor, target)
+        self.apply_damage(target_idx, damage)
+        if self.verbose:
+            display_battle_log(f"{actor['name']} attacks {target['name']} for {damage} damage.")
+
+        heapq.heappush(schedule, (ready_at + get_action_delay(actor), idx))
+        self.check_battle_end()
+        return idx
+    
+    def pick_target(self, side):
+        """
+        Get the living combatant with the lowest health on a side
+        
+        An entry whose health was changed outside apply_damage and
+        apply_healing is re-keyed when it reaches the top of the heap.
+        
+        Returns: Combatant index
+        Raises: InvalidTargetError if the side has nobody left
+        """
+        heap = self.targets[side]
+        while heap:
+            health, idx, version = heap[0]
+            current = self.combatants[idx].get('health', 0)
+            if version == self.versions[idx] and current > 0:
+                if current == health:
+                    return idx
+                self.versions[idx] += 1
+                heapq.heapreplace(heap, (current, idx, self.versions[idx]))
+                continue
+            heapq.heappop(heap)
+        raise InvalidTargetError("No living targets")
+    
+    def apply_damage(self, idx, damage):
+        """
+        Apply damage to a combatant and update the target heap
+        
+        Reduces health, prevents negative health
+        """
+        target = self.combatants[idx]
+        target['health'] = max(0, target.get('health', 0) - int(damage))
+        self.versions[idx] += 1
+        side = self.sides[idx]
+        if target['health'] > 0:
+            heapq.heappush(self.targets[side], (target['health'], idx, self.versions[idx]))
+        else:
+            self.alive[side] -= 1
+    
+    def apply_healing(self, idx, amount):
+        """
+        Heal a living combatant (up to max_health) and update the target heap
+        
+        Returns: Health actually restored
+        """
+        target = self.combatants[idx]
+        before = target.get('health', 0)
+        if before <= 0:
+            return 0
+        target['health'] = min(target.get('max_health', before + amount), before + int(amount))
+        self.versions[idx] += 1
+        heapq.heappush(self.targets[self.sides[idx]], (target['health'], idx, self.versions[idx]))
+        return target['health'] - before
+    
+    def check_battle_end(self):
+        """
+        Check if battle is over
+        
+        Returns: 'player' if all enemies dead, 'enemy' if whole party dead, None if ongoing
+        """
+        if self.alive[self.ENEMIES] == 0:
+            self.combat_active = False
+            return 'player'
+
+        if self.alive[self.PARTY] == 0:
+            self.combat_active = False
+            return 'enemy'
+
+        return None
+
+def calculate_attack_damage(attacker, defender):
+    """
+    Calculate basic attack damage
+    
+    Damage formula: attacker['strength'] - (defender['strength'] // 4)
+    Minimum damage: 1
+    
+    Returns: Integer damage amount
+    """
+    return DAMAGE_TABLES.get(attacker.get('strength', 0), defender.get('strength', 0))[DAMAGE_BASIC]
+
+def get_action_delay(combatant):
+    """
+    Get how long a combatant waits between actions on the initiative clock
+    
+    Returns: Integer delay (INITIATIVE_SCALE // speed, at least 1)
+    """
+    speed = combatant.get('speed', DEFAULT_SPEED)
+    return max(1, INITIATIVE_SCALE // max(1, speed))
+
+# ============================================================================
+# DAMAGE TABLES
+# ============================================================================
+
+# Positions in a damage table
+DAMAGE_BASIC = 0
+DAMAGE_POWER_STRIKE = 1
+DAMAGE_CRITICAL = 2
+
+class DamageTableCache:
+    """
+    Shared memo of strength-based damage values
+    
+    Keyed on (attacker_strength, defender_strength). Strength only changes
+    on level-up, equipment or effects, so a handful of pairs cover every
+    battle and each hit becomes a tuple lookup instead of re-running the
+    damage formula.
+    """
+    
+    def __init__(self, max_size=4096):
+        """Initialize an empty cache holding at most max_size pairs"""
+        self.max_size = max_size
+        self.tables = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, attacker_strength, defender_strength):
+        """
+        Get the damage table for a strength pair
+        
+        Returns: Tuple of (basic, power_strike, critical) damage
+        """
+        key = (attacker_strength, defender_strength)
+        table = self.tables.get(key)
+        if table is not None:
+            self.hits += 1
+            return table
+
+        self.misses += 1
+        if len(self.tables) >= self.max_size:
+            self.tables.clear()
+        table = build_damage_table(attacker_strength, defender_strength)
+        self.tables[key] = table
+        return table
+    
+    def clear(self):
+        """Forget all cached tables and reset the counters"""
+        self.tables.clear()
+        self.hits = 0
+        self.misses = 0
+    
+    def get_stats(self):
+        """
+        Get cache instrumentation
+        
+        Returns: Dictionary with size, hits, misses and hit_rate
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.tables),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+def build_damage_table(attacker_strength, defender_strength):
+    """
+    Compute the strength-based damage values for one attacker/defender pair
+    
+    - basic: strength - defender_strength // 4
+    - power strike: 2x strength - defender_strength // 4
+    - critical: 3x strength - defender_strength // 4
+    Minimum damage for each: 1
+    
+    Returns: Tuple of (basic, power_strike, critical)
+    """
+    reduced = defender_strength // 4
+    return (
+        max(1, attacker_strength - reduced),
+        max(1, attacker_strength * 2 - reduced),
+        max(1, attacker_strength * 3 - reduced)
+    )
+
+# Cache shared by every battle
+DAMAGE_TABLES = DamageTableCache()
+
+def get_damage_table(attacker, defender):
+    """
+    Get the damage table for two combatants from the shared cache
+    
+    Returns: Tuple of (basic, power_strike, critical)
+    """
+    return DAMAGE_TABLES.get(attacker.get('strength', 0), defender.get('strength', 0))
+
+# ============================================================================
+# STATUS EFFECTS
+# ============================================================================
+
+# Effect kinds
+EFFECT_TICK = 'tick'          # changes health at the start of each turn
+EFFECT_MODIFIER = 'modifier'  # changes a stat while active
+
+# Stacking rules when an effect is applied to a target that already has it
+STACK_REFRESH = 'refresh'  # reset the duration, keep one stack
+STACK_ADD = 'stack'        # add a stack (up to max_stacks) and reset the duration
+STACK_IGNORE = 'ignore'    # keep the existing effect untouched
+
+# amount is per stack: health per tick, or stat bonus while active
+STATUS_EFFECTS = {
+    'poison': {'kind': EFFECT_TICK, 'stat': 'health', 'amount': -4, 'duration': 3,
+               'stacking': STACK_ADD, 'max_stacks': 5},
+    'bleed': {'kind': EFFECT_TICK, 'stat': 'health', 'amount': -3, 'duration': 2,
+              'stacking': STACK_ADD, 'max_stacks': 3},
+    'burn': {'kind': EFFECT_TICK, 'stat': 'health', 'amount': -6, 'duration': 2,
+             'stacking': STACK_REFRESH, 'max_stacks': 1},
+    'regen': {'kind': EFFECT_TICK, 'stat': 'health', 'amount': 8, 'duration': 3,
+              'stacking': STACK_REFRESH, 'max_stacks': 1},
+    'strength_up': {'kind': EFFECT_MODIFIER, 'stat': 'strength', 'amount': 5, 'duration': 3,
+                    'stacking': STACK_IGNORE, 'max_stacks': 1},
+    'weaken': {'kind': EFFECT_MODIFIER, 'stat': 'strength', 'amount': -4, 'duration': 2,
+               'stacking': STACK_REFRESH, 'max_stacks': 1}
+}
+
+class StatusEffectManager:
+    """
+    Tracks buffs, debuffs and damage/healing over time for one battle
+    
+    Only combatants that currently have effects are stored, so a tick
+    touches just those. Expiry times sit in a heap; refreshed effects
+    leave their old heap entry behind, and it is skipped when it
+    surfaces. Each tick costs one pass over the active effects plus
+    O(log n) per expiry, however many effects were applied over the battle.
+    """
+    
+    def __init__(self):
+        """Initialize with no active effects"""
+        self.turn = 0
+        # id(target) -> (target, {effect_name: [stacks, expires_turn]})
+        self.active = {}
+        # heap of (expires_turn, id(target), effect_name)
+        self.expiry = []
+    
+    def apply(self, target, name, duration=None, stacks=1):
+        """
+        Apply a status effect to a character or enemy
+        
+        The effect lasts duration turns from the current turn (the
+        effect's default duration if not given), following the stacking
+        rule in STATUS_EFFECTS.
+        
+        Returns: Number of stacks now active
+        Raises: CombatError if the effect name is not recognized
+        """
+        definition = STATUS_EFFECTS.get(name)
+        if definition is None:
+            raise CombatError(f"Unknown status effect: {name}")
+        if duration is None:
+            duration = definition['duration']
+
+        key = id(target)
+        entry = self.active.get(key)
+        if entry is None:
+            entry = (target, {})
+            self.active[key] = entry
+        effects = entry[1]
+
+        expires = self.turn + duration
+        state = effects.get(name)
+        if state is None:
+            added = min(stacks, definition['max_stacks'])
+            state = [added, expires]
+            effects[name] = state
+        elif definition['stacking'] == STACK_IGNORE:
+            return state[0]
+        elif definition['stacking'] == STACK_ADD:
+            added = min(state[0] + stacks, definition['max_stacks']) - state[0]
+            state[0] += added
+            state[1] = expires
+        else:
+            added = 0
+            state[1] = expires
+
+        if definition['kind'] == EFFECT_MODIFIER and added:
+            stat = definition['stat']
+            stats = target.get('stats')
+            if stats is not None:
+                stats.set_modifier(f"effect:{name}", stat, definition['amount'] * state[0])
+            else:
+                target[stat] = target.get(stat, 0) + definition['amount'] * added
+
+        heapq.heappush(self.expiry, (expires, key, name))
+        return state[0]
+    
+    def tick(self, turn, log=None):
+        """
+        Apply per-turn ticks and remove effects that have run out
+        
+        Args:
+            turn: Current battle turn
+            log: Optional function called with a message for each tick
+        
+        Returns: Number of effect ticks applied
+        """
+        self.turn = turn
+        ticks = 0
+
+        for target, effects in self.active.values():
+            for name, state in effects.items():
+                definition = STATUS_EFFECTS[name]
+                if definition['kind'] != EFFECT_TICK:
+                    continue
+                ticks += 1
+                before = target.get('health', 0)
+                after = before + definition['amount'] * state[0]
+                target['health'] = max(0, min(target.get('max_health', after), after))
+                if log is not None:
+                    log(f"{target.get('name', 'Target')} is affected by {name} ({target['health'] - before:+d} HP).")
+
+        expiry = self.expiry
+        while expiry and expiry[0][0] <= turn:
+            expires, key, name = heapq.heappop(expiry)
+            entry = self.active.get(key)
+            if entry is None:
+                continue
+            state = entry[1].get(name)
+            # refreshed effects have a later expiry; this entry is stale
+            if state is None or state[1] != expires:
+                continue
+            self._remove(key, entry, name, state)
+            if log is not None:
+                log(f"{name} wears off {entry[0].get('name', 'Target')}.")
+
+        return ticks
+    
+    def remove(self, target, name):
+        """
+        Remove an effect early (reverting any stat modifier)
+        
+        Returns: True if the effect was active
+        """
+        key = id(target)
+        entry = self.active.get(key)
+        if entry is None or name not in entry[1]:
+            return False
+        self._remove(key, entry, name, entry[1][name])
+        return True
+    
+    def clear(self):
+        """Remove every effect, reverting stat modifiers"""
+        for key, entry in list(self.active.items()):
+            for name, state in list(entry[1].items()):
+                self._remove(key, entry, name, state)
+        self.expiry.clear()
+    
+    def has_effect(self, target, name):
+        """Check if a target currently has an effect"""
+        entry = self.active.get(id(target))
+        return entry is not None and name in entry[1]
+    
+    def get_effects(self, target):
+        """
+        Get a target's active effects
+        
+        Returns: Dictionary of {effect_name: (stacks, turns_remaining)}
+        """
+        entry = self.active.get(id(target))
+        if entry is None:
+            return {}
+        return {name: (state[0], state[1] - self.turn) for name, state in entry[1].items()}
+    
+    def _remove(self, key, entry, name, state):
+        """Drop one effect from a target and undo its modifier"""
+        definition = STATUS_EFFECTS[name]
+        if definition['kind'] == EFFECT_MODIFIER:
+            target = entry[0]
+            stats = target.get('stats')
+            if stats is not None:
+                stats.remove_modifier(f"effect:{name}")
+            else:
+                stat = definition['stat']
+                target[stat] = target.get(stat, 0) - definition['amount'] * state[0]
+        del entry[1][name]
+        if not entry[1]:
+            del self.active[key]
+
 # ============================================================================
 # SPECIAL ABILITIES
 # ============================================================================
 
-def use_special_ability(character, enemy):
+def use_special_ability(character, enemy, rng=None, damage_table=None, effects=None,
+                        describe=True):
     """
     Use character's class-specific special ability
     
+    rng is used for abilities with random outcomes (defaults to the
+    global random module). damage_table is the character-vs-enemy table
+    from DAMAGE_TABLES, looked up if not given. If effects (a
+    StatusEffectManager) is given, abilities also apply their status effect.
+    With describe=False no message is built (for simulated battles).
+    
     Example abilities by class:
-    - Warrior: Power Strike (2x strength damage)
-    - Mage: Fireball (2x magic damage)
-    - Rogue: Critical Strike (3x strength damage, 50% chance)
-    - Cleric: Heal (restore 30 health)
+    - Warrior: Power Strike (2x strength damage, weakens)
+    - Mage: Fireball (2x magic damage, burns)
+    - Rogue: Critical Strike (3x strength damage, 50% chance, bleeds on crit)
+    - Cleric: Heal (restore 30 health, then regen)
     
-    Returns: String describing what happened
+    Returns: String describing what happened (None if describe is False)
     Raises: AbilityOnCooldownError if ability was used recently
     """
     cls = character.get('class', '').lower()
 
     if cls == 'warrior':
-        return warrior_power_strike(character, enemy)
+        return warrior_power_strike(character, enemy, damage_table, effects, describe)
     elif cls == 'mage':
-        return mage_fireball(character, enemy)
+        return mage_fireball(character, enemy, effects, describe)
     elif cls == 'rogue':
-        return rogue_critical_strike(character, enemy)
+        return rogue_critical_strike(character, enemy, rng, damage_table, effects, describe)
     elif cls == 'cleric':
-        return cleric_heal(character)
+        return cleric_heal(character, effects, describe)
     else:
         raise AbilityOnCooldownError("Unknown class or ability not available")
 
-def warrior_power_strike(character, enemy):
+def warrior_power_strike(character, enemy, damage_table=None, effects=None, describe=True):
     """Warrior special ability"""
-    damage = max(1, character.get('strength', 0) * 2 - (enemy.get('strength', 0) // 4))
+    if damage_table is None:
+        damage_table = get_damage_table(character, enemy)
+    damage = damage_table[DAMAGE_POWER_STRIKE]
     enemy['health'] = max(0, enemy.get('health', 0) - damage)
-    return f"{character['name']} uses Power Strike for {damage} damage!"
+    if effects is not None:
+        effects.apply(enemy, 'weaken')
+    if describe:
+        return f"{character['name']} uses Power Strike for {damage} damage!"
 
-def mage_fireball(character, enemy):
+def mage_fireball(character, enemy, effects=None, describe=True):
     """Mage special ability"""
     damage = max(1, character.get('magic', 0) * 2)
     enemy['health'] = max(0, enemy.get('health', 0) - damage)
-    return f"{character['name']} casts Fireball for {damage} damage!"
+    if effects is not None:
+        effects.apply(enemy, 'burn')
+    if describe:
+        return f"{character['name']} casts Fireball for {damage} damage!"
 
-def rogue_critical_strike(character, enemy):
-    """Rogue special ability"""
-    import random
+def rogue_critical_strike(character, enemy, rng=None, damage_table=None, effects=None,
+                          describe=True):
+    """Rogue special ability (50% crit chance, rolled on rng)"""
+    if rng is None:
+        rng = random
+    if damage_table is None:
+        damage_table = get_damage_table(character, enemy)
 
-    base = character.get('strength', 0)
-    if random.random() < 0.5:
-        damage = max(1, base * 3 - (enemy.get('strength', 0) // 4))
+    if rng.random() < 0.5:
+        damage = damage_table[DAMAGE_CRITICAL]
         enemy['health'] = max(0, enemy.get('health', 0) - damage)
-        return f"{character['name']} lands a critical strike for {damage} damage!"
+        if effects is not None:
+            effects.apply(enemy, 'bleed')
+        if describe:
+            return f"{character['name']} lands a critical strike for {damage} damage!"
     else:
-        damage = max(1, base - (enemy.get('strength', 0) // 4))
+        damage = damage_table[DAMAGE_BASIC]
         enemy['health'] = max(0, enemy.get('health', 0) - damage)
-        return f"{character['name']} performs a quick strike for {damage} damage."
+        if describe:
+            return f"{character['name']} performs a quick strike for {damage} damage."
 
-def cleric_heal(character):
+def cleric_heal(character, effects=None, describe=True):
     """Cleric special ability"""
     heal_amt = 30
     before = character.get('health', 0)
     character['health'] = min(character.get('max_health', 0), before + heal_amt)
-    actual = character['health'] - before
-    return f"{character['name']} casts Heal and restores {actual} HP."
+    if effects is not None:
+        effects.apply(character, 'regen')
+    if describe:
+        return f"{character['name']} casts Heal and restores {character['health'] - before} HP."
+
+# ============================================================================
+# OUTCOME PREDICTION
+# ============================================================================
+
+# Health is rounded down to a multiple of this for prediction keys, so a
+# prediction is made for (at most) the character's actual health
+PREDICTION_HEALTH_BUCKET = 10
+# Prediction table built by tools/build_battle_predictions.py
+PREDICTIONS_FILE = os.path.join("data", "battle_predictions.json")
+
+# A fight is trivial if the character won every simulated battle and never
+# lost more than this share of the health it started with
+TRIVIAL_MAX_HEALTH_LOST = 0.5
+
+class BattlePredictor:
+    """
+    Cache of simulated battle outcomes for auto-battle and skipping fights
+    
+    Predictions are keyed on (class, level, strength, magic, max health,
+    health bucket, enemy type), so lookups are a single dictionary
+    access. Health is rounded down to a multiple of
+    PREDICTION_HEALTH_BUCKET, so damaged characters share entries.
+    Missing keys are filled by simulating battles with
+    AutoBattleStrategy. The game ships a table built offline by
+    tools/build_battle_predictions.py in PREDICTIONS_FILE and looks it up
+    without simulating, falling back to estimate() for characters the
+    table does not cover. Without a filename the table lives in memory
+    only.
+    """
+    
+    def __init__(self, filename=None, battles=50, seed=0):
+        """
+        Initialize predictor, optionally backed by a file
+        
+        Args:
+            filename: JSON file predictions are loaded from and saved to,
+                      or None to keep them in memory only
+            battles: Number of simulated battles per prediction
+            seed: Base seed; simulation i uses seed + i
+        """
+        self.filename = filename
+        self.battles = battles
+        self.seed = seed
+        self.predictions = {}
+        self.loaded = False
+        self.dirty = False
+    
+    def get_key(self, character, enemy_type):
+        """
+        Get the prediction key for a character and enemy type
+        
+        Returns: String key
+                 "class|level|strength|magic|max_health|health_bucket|enemy_type"
+        """
+        health = character.get('health', 0)
+        bucket = health - health % PREDICTION_HEALTH_BUCKET
+        return (f"{character.get('class', '')}|{character.get('level', 1)}|"
+                f"{character.get('strength', 0)}|{character.get('magic', 0)}|"
+                f"{character.get('max_health', 0)}|{bucket}|{enemy_type}")
+    
+    def predict(self, character, enemy_type, simulate=True):
+        """
+        Get the predicted outcome of a character fighting an enemy type
+        
+        Args:
+            character: Character dictionary (not modified)
+            enemy_type: Enemy type string
+            simulate: Run simulations for a missing key (otherwise return None)
+        
+        Returns: Dictionary with 'battles', 'win_rate', 'avg_turns',
+                 'avg_health_lost' and 'max_health_lost', or None
+        """
+        if not self.loaded:
+            self.load()
+
+        key = self.get_key(character, enemy_type)
+        prediction = self.predictions.get(key)
+        if prediction is None and simulate:
+            prediction = self.simulate(character, enemy_type)
+            self.predictions[key] = prediction
+            self.dirty = True
+        return prediction
+    
+    def estimate(self, character, enemy_type):
+        """
+        Cheaply estimate a fight the table does not cover
+        
+        Assumes the character only uses basic attacks and strikes first,
+        and the enemy answers every surviving turn with its basic attack.
+        Damage is fixed, so this is a single calculation rather than a
+        simulation, and abilities and items only make the real fight
+        easier.
+        
+        Returns: Prediction dictionary (see predict) with 'battles' 0
+        """
+        enemy = ENEMY_TEMPLATES[enemy_type]
+        player_damage = DAMAGE_TABLES.get(character.get('strength', 0), enemy['strength'])[DAMAGE_BASIC]
+        enemy_damage = DAMAGE_TABLES.get(enemy['strength'], character.get('strength', 0))[DAMAGE_BASIC]
+        turns = -(-enemy['health'] // player_damage)
+        lost = (turns - 1) * enemy_damage
+        won = lost < character.get('health', 0)
+        if not won:
+            lost = character.get('health', 0)
+        return {
+            'battles': 0,
+            'win_rate': 1.0 if won else 0.0,
+            'avg_turns': turns,
+            'avg_health_lost': lost,
+            'max_health_lost': lost
+        }
+    
+    def simulate(self, character, enemy_type):
+        """
+        Simulate battles between a copy of the character and an enemy type
+        
+        The copy starts at the bottom of the character's health bucket, so
+        the prediction never assumes more health than the character has.
+        
+        Returns: Prediction dictionary (see predict)
+        """
+        health = character.get('health', 0)
+        start_health = max(1, health - health % PREDICTION_HEALTH_BUCKET)
+        strategy = AutoBattleStrategy()
+        wins = 0
+        turns = 0
+        health_lost = 0
+        max_health_lost = 0
+
+        for i in range(self.battles):
+            fighter = {
+                'name': character.get('name', 'Hero'),
+                'class': character.get('class', ''),
+                'level': character.get('level', 1),
+                'health': start_health,
+                'max_health': character.get('max_health', start_health),
+                'strength': character.get('strength', 0),
+                'magic': character.get('magic', 0),
+                'experience': 0,
+                'gold': 0
+            }
+            battle = SimpleBattle(fighter, create_enemy(enemy_type), strategy=strategy,
+                                  verbose=False, seed=self.seed + i)
+            # finish_battle is skipped so no level-up heals the copy
+            while battle.combat_active:
+                battle.play_round()
+            battle.effects.clear()
+
+            if battle.check_battle_end() == 'player':
+                wins += 1
+            turns += battle.turn
+            lost = start_health - fighter['health']
+            health_lost += lost
+            max_health_lost = max(max_health_lost, lost)
+
+        return {
+            'battles': self.battles,
+            'win_rate': wins / self.battles,
+            'avg_turns': turns / self.battles,
+            'avg_health_lost': health_lost / self.battles,
+            'max_health_lost': max_health_lost
+        }
+    
+    def is_trivial(self, character, prediction):
+        """
+        Check if a predicted fight is safe to settle without playing it
+        
+        Returns: True if every simulation was won and the worst health loss
+                 is at most TRIVIAL_MAX_HEALTH_LOST of current health
+        """
+        if prediction is None or character.get('health', 0) <= 0:
+            return False
+        return prediction['win_rate'] >= 1.0 and \
+            prediction['max_health_lost'] <= character.get('health', 0) * TRIVIAL_MAX_HEALTH_LOST
+    
+    def precompute(self, classes=("Warrior", "Mage", "Rogue", "Cleric"), max_level=10):
+        """
+        Fill the table for stock characters of each class and level
+        
+        Every health bucket from PREDICTION_HEALTH_BUCKET up to full
+        health is covered, so damaged characters hit the table too.
+        
+        Returns: Number of predictions added
+        """
+        from character_manager import create_character
+
+        added = 0
+        for character_class in classes:
+            character = create_character("Hero", character_class)
+            for level in range(1, max_level + 1):
+                if level > 1:
+                    character['level'] = level
+                    character['max_health'] += 10
+                    character['strength'] += 2
+                    character['magic'] += 2
+                enemy_type = get_enemy_type_for_level(level)
+                for health in range(character['max_health'], 0, -PREDICTION_HEALTH_BUCKET):
+                    character['health'] = health
+                    if self.get_key(character, enemy_type) not in self.predictions:
+                        self.predict(character, enemy_type)
+                        added += 1
+        return added
+    
+    def load(self):
+        """
+        Load predictions from the file, if it exists
+        
+        Returns: Number of predictions loaded
+        Raises: CorruptedDataError if the file cannot be parsed
+        """
+        self.loaded = True
+        if self.filename is None or not os.path.exists(self.filename):
+            return 0
+
+        try:
+            with open(self.filename, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            raise CorruptedDataError(f"Could not read {self.filename}")
+
+        # entries computed this session take priority over the file
+        data.update(self.predictions)
+        self.predictions = data
+        return len(data)
+    
+    def save(self):
+        """
+        Write predictions to the file
+        
+        Returns: True if successful, False if the predictor has no file
+        """
+        if self.filename is None:
+            return False
+        directory = os.path.dirname(self.filename)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with open(self.filename, "w") as f:
+            json.dump(self.predictions, f)
+        self.dirty = False
+        return True
+
+def settle_battle(character, enemy, prediction):
+    """
+    Resolve a trivial fight from its prediction instead of playing it
+    
+    The character loses the predicted average health (rounded up) and
+    receives the normal victory rewards.
+    
+    Returns: Dictionary like SimpleBattle.start_battle's, plus 'settled': True
+    """
+    from character_manager import gain_experience, add_gold
+
+    lost = math.ceil(prediction['avg_health_lost'])
+    character['health'] = max(1, character.get('health', 0) - lost)
+    enemy['health'] = 0
+
+    rewards = get_victory_rewards(enemy)
+    gain_experience(character, rewards['xp'])
+    add_gold(character, rewards['gold'])
+    quests = publish_defeats(character, [enemy])
+    return {'winner': 'player', 'xp_gained': rewards['xp'], 'gold_gained': rewards['gold'],
+            'quests_completed': quests, 'settled': True}
 
 # ============================================================================
 # COMBAT UTILITIES
@@ -322,6 +1967,21 @@ def get_victory_rewards(enemy):
     """
     return {'xp': enemy.get('xp_reward', 0), 'gold': enemy.get('gold_reward', 0)}
 
+def publish_defeats(character, enemies):
+    """
+    Report defeated enemies to the character's quest objective tracker
+    
+    Returns: List of quest IDs the defeats completed
+    """
+    if character.get('quest_tracker') is None:
+        return []
+
+    from quest_handler import publish_quest_event
+    completed = []
+    for enemy in enemies:
+        completed.extend(qid for qid, _ in publish_quest_event(character, 'defeat', enemy.get('type')))
+    return completed
+
 def display_combat_stats(character, enemy):
     """
     Display current combat status
@@ -97,6 +97,10 @@ class QuestNotActiveError(QuestError):
     """Raised when trying to complete a quest that isn't active"""
     pass
 
+class QuestDependencyCycleError(QuestError):
+    """Raised when quest prerequisites form a cycle"""
+    pass
+
 # Inventory Exceptions
 class InventoryFullError(InventoryError):
     """Raised when trying to add items to a full inventory"""
@@ -114,6 +118,10 @@ class InvalidItemTypeError(InventoryError):
     """Raised when item type is not recognized"""
     pass
 
+class OutOfStockError(InventoryError):
+    """Raised when a shop does not have enough of an item left"""
+    pass
+
 # Save/Load Exceptions
 class SaveFileCorruptedError(GameError):
     """Raised when save file cannot be loaded due to corruption"""
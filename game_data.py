@@ -9,13 +9,24 @@ AI Usage: [Document any AI assistance used]
 This module handles loading and validating game data from text files.
 """
 
+import heapq
+import json
 import os
+import re
+from bisect import bisect_left
+from itertools import chain, islice
 from custom_exceptions import (
     InvalidDataFormatError,
     MissingDataFileError,
     CorruptedDataError
 )
 
+# Event types quest objectives can count
+OBJECTIVE_EVENTS = ('defeat', 'collect')
+
+# Valid item types
+ITEM_TYPES = ('weapon', 'armor', 'consumable')
+
 # ============================================================================
 # DATA LOADING FUNCTIONS
 # ============================================================================
@@ -32,6 +43,7 @@ def load_quests(filename="data/quests.txt"):
     REWARD_GOLD: 50
     REQUIRED_LEVEL: 1
     PREREQUISITE: previous_quest_id (or NONE)
+    OBJECTIVE: defeat:goblin:3 (optional, see parse_objectives)
     
     Returns: Dictionary of quests {quest_id: quest_data_dict}
     Raises: MissingDataFileError, InvalidDataFormatError, CorruptedDataError
@@ -71,9 +83,10 @@ def load_items(filename="data/items.txt"):
     TYPE: weapon|armor|consumable
     EFFECT: stat_name:value (e.g., strength:5 or health:20)
     COST: 100
+    WEIGHT: 5 (optional, used by the weight-based inventory capacity model)
     DESCRIPTION: Item description
     
-    Returns: Dictionary of items {item_id: item_data_dict}
+    Returns: ItemCatalog of items {item_id: item_data_dict}
     Raises: MissingDataFileError, InvalidDataFormatError, CorruptedDataError
     """
     if not os.path.exists(filename):
@@ -86,7 +99,7 @@ def load_items(filename="data/items.txt"):
         raise CorruptedDataError()
 
     blocks = [b.strip() for b in content.split('\n\n') if b.strip()]
-    items = {}
+    items = ItemCatalog()
 
     try:
         for block in blocks:
@@ -124,6 +137,9 @@ def validate_quest_data(quest_dict):
     except Exception:
         raise InvalidDataFormatError("Numeric fields must be integers")
 
+    if 'objective' in quest_dict:
+        parse_objectives(quest_dict['objective'])
+
     return True
 
 def validate_item_data(item_dict):
@@ -141,14 +157,19 @@ def validate_item_data(item_dict):
         if key not in item_dict:
             raise InvalidDataFormatError(f"Missing item field: {key}")
 
-    if item_dict['type'] not in ('weapon', 'armor', 'consumable'):
+    if item_dict['type'] not in ITEM_TYPES:
         raise InvalidDataFormatError(f"Invalid item type: {item_dict['type']}")
 
-    # cost must be integer
+    # cost (and the optional weight) must be integers
     try:
         item_dict['cost'] = int(item_dict['cost'])
     except Exception:
         raise InvalidDataFormatError("Item cost must be an integer")
+    if 'weight' in item_dict:
+        try:
+            item_dict['weight'] = int(item_dict['weight'])
+        except Exception:
+            raise InvalidDataFormatError("Item weight must be an integer")
 
     return True
 
@@ -179,6 +200,428 @@ def create_default_data_files():
 
     return True
 
+# ============================================================================
+# ITEM CATALOG
+# ============================================================================
+
+class ItemCatalog(dict):
+    """
+    Item dictionary {item_id: item_data_dict} with an index by item type
+    
+    Every dict method that adds, replaces or removes items (assignment,
+    del, update, setdefault, pop, popitem, clear, |=) also updates
+    by_type, so listing the consumables (or anything else by type)
+    costs the size of the answer rather than a pass over the whole
+    catalog. copy() returns another ItemCatalog.
+    """
+    
+    def __init__(self, items=()):
+        """Initialize from a dict or (item_id, item_data) pairs"""
+        super().__init__()
+        # item type -> {item_id: None}, in the order items were added
+        self.by_type = {}
+        for item_id, item in dict(items).items():
+            self[item_id] = item
+    
+    def __setitem__(self, item_id, item):
+        if item_id in self:
+            self._unindex(item_id)
+        super().__setitem__(item_id, item)
+        self.by_type.setdefault(_item_type(item), {})[item_id] = None
+    
+    def __delitem__(self, item_id):
+        self._unindex(item_id)
+        super().__delitem__(item_id)
+    
+    def __ior__(self, other):
+        self.update(other)
+        return self
+    
+    def update(self, *args, **kwargs):
+        for item_id, item in dict(*args, **kwargs).items():
+            self[item_id] = item
+    
+    def setdefault(self, item_id, item=None):
+        if item_id not in self:
+            self[item_id] = item
+        return self[item_id]
+    
+    def pop(self, item_id, *default):
+        if item_id not in self:
+            return super().pop(item_id, *default)
+        item = self[item_id]
+        del self[item_id]
+        return item
+    
+    def popitem(self):
+        item_id, item = super().popitem()
+        super().__setitem__(item_id, item)
+        del self[item_id]
+        return item_id, item
+    
+    def clear(self):
+        super().clear()
+        self.by_type = {}
+    
+    def copy(self):
+        return ItemCatalog(self)
+    
+    def get_ids_of_type(self, item_type):
+        """
+        Get the IDs of every item of a type
+        
+        Returns: List of item IDs in catalog order
+        """
+        return list(self.by_type.get(item_type, ()))
+    
+    def _unindex(self, item_id):
+        """Drop an item from the type index"""
+        item_type = _item_type(self[item_id])
+        ids = self.by_type[item_type]
+        del ids[item_id]
+        if not ids:
+            del self.by_type[item_type]
+
+def _item_type(item):
+    """Get the type of an item dictionary (None for anything else)"""
+    return item.get('type') if isinstance(item, dict) else None
+
+# ============================================================================
+# SEARCH INDEX
+# ============================================================================
+
+# Searchable fields per record type and the weight of a match in each
+QUEST_SEARCH_FIELDS = {'title': 2, 'description': 1}
+ITEM_SEARCH_FIELDS = {'name': 2, 'description': 1}
+
+# A prefix match scores this fraction of an exact match
+PREFIX_MATCH_FACTOR = 0.5
+
+# Prefixes shorter than this only match whole words, and no prefix
+# expands to more than MAX_PREFIX_EXPANSIONS words
+MIN_PREFIX_LENGTH = 2
+MAX_PREFIX_EXPANSIONS = 64
+
+# Prefixes up to this length match so many words that their postings are
+# merged ahead of time into one list per prefix (with no expansion limit)
+PREFIX_INDEX_LENGTH = 2
+
+# Words (and short prefixes) matching at least this many records get their
+# records grouped by score when the index is built, for multi-word queries
+TIER_MIN_RECORDS = 256
+
+# Ignored in queries that also contain other words
+STOP_WORDS = frozenset(['a', 'an', 'and', 'by', 'for', 'in', 'of', 'on', 'or', 'the', 'to', 'your'])
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text):
+    """
+    Split text into lowercase search words
+    
+    Returns: List of tokens, e.g. "The Orc Menace" → ['the', 'orc', 'menace']
+    """
+    return _TOKEN_PATTERN.findall(str(text).lower())
+
+class SearchIndex:
+    """
+    Inverted index from words to the records that contain them
+    
+    Each word maps to {record_id: weight}, ordered by weight (highest
+    first), so the best matches for a single word are a slice. Short
+    prefixes (up to PREFIX_INDEX_LENGTH letters) have their own merged
+    postings, built with the index; longer prefixes bisect into a sorted
+    word list. Queries return records that match every word, ranked by
+    summed weight. Multi-word queries intersect each word's records one
+    score tier at a time, best combined score first, so they stop as soon
+    as the top results are known.
+    """
+    
+    def __init__(self, postings=None, ranked=False):
+        """
+        Initialize from existing postings
+        
+        Args:
+            postings: Dictionary {word: {record_id: weight}} or None
+            ranked: True if each word's records are already ordered by weight
+        """
+        self.postings = postings if postings is not None else {}
+        if ranked:
+            self.tokens = sorted(self.postings)
+            self.build_prefix_index()
+        else:
+            self.finalize()
+    
+    @classmethod
+    def build(cls, records, field_weights):
+        """
+        Index a dictionary of records
+        
+        Args:
+            records: Dictionary {record_id: record_dict}
+            field_weights: Dictionary {field_name: weight}
+        
+        Returns: SearchIndex
+        """
+        postings = {}
+        for record_id, record in records.items():
+            for field, weight in field_weights.items():
+                for token in tokenize(record.get(field, '')):
+                    entry = postings.setdefault(token, {})
+                    entry[record_id] = entry.get(record_id, 0) + weight
+        return cls(postings)
+    
+    def finalize(self):
+        """Sort postings by weight and rebuild the sorted word list and prefix index"""
+        for token, entry in self.postings.items():
+            self.postings[token] = _rank(entry)
+        self.tokens = sorted(self.postings)
+        self.build_prefix_index()
+    
+    def build_prefix_index(self):
+        """
+        Merge the postings of every word under each short prefix
+        
+        A record's weight under a prefix is its best weight among the
+        longer words starting with it (the word equal to the prefix is an
+        exact match and stays separate).
+        """
+        merged = {}
+        for length in range(MIN_PREFIX_LENGTH, PREFIX_INDEX_LENGTH + 1):
+            for token, entry in self.postings.items():
+                if len(token) <= length:
+                    continue
+                best = merged.setdefault(token[:length], {})
+                for record_id, weight in entry.items():
+                    if weight > best.get(record_id, 0):
+                        best[record_id] = weight
+        self.prefixes = {prefix: _rank(entry) for prefix, entry in merged.items()}
+
+        # score tiers for the query words (whole words or short prefixes)
+        # that match many records
+        self.tiers = {}
+        for term in chain(self.postings, self.prefixes):
+            matches = self.expand(term)
+            if sum(len(entry) for entry, _ in matches) >= TIER_MIN_RECORDS:
+                self.tiers[term] = _tiers(_best_scores(matches))
+    
+    def expand(self, term):
+        """
+        Get the postings a query word matches, with their score factors
+        
+        Returns: List of ({record_id: weight}, factor) pairs
+        """
+        matches = []
+        exact = self.postings.get(term)
+        if exact is not None:
+            matches.append((exact, 1.0))
+        if MIN_PREFIX_LENGTH <= len(term) <= PREFIX_INDEX_LENGTH:
+            entry = self.prefixes.get(term)
+            if entry is not None:
+                matches.append((entry, PREFIX_MATCH_FACTOR))
+        elif len(term) > PREFIX_INDEX_LENGTH:
+            start = bisect_left(self.tokens, term)
+            for token in self.tokens[start:start + MAX_PREFIX_EXPANSIONS + 1]:
+                if not token.startswith(term):
+                    break
+                if token != term:
+                    matches.append((self.postings[token], PREFIX_MATCH_FACTOR))
+        return matches
+    
+    def search(self, query, limit=10):
+        """
+        Find records matching every word of the query
+        
+        Words match whole indexed words or, if long enough, their prefixes.
+        
+        Args:
+            query: Free text query
+            limit: Maximum number of results
+        
+        Returns: List of (record_id, score) pairs, best first
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        meaningful = [t for t in terms if t not in STOP_WORDS]
+        terms = meaningful or terms
+        if not terms:
+            return []
+
+        expanded = [self.expand(term) for term in terms]
+        if not all(expanded):
+            return []
+
+        # a single matched word: its postings are already ranked
+        if len(expanded) == 1 and len(expanded[0]) == 1:
+            entry, factor = expanded[0][0]
+            return [(record_id, weight * factor)
+                    for record_id, weight in islice(entry.items(), limit)]
+
+        # a single query word with prefix matches: merge the ranked postings
+        # and stop at limit records; a record's first appearance is its best score
+        if len(expanded) == 1:
+            if limit < 1:
+                return []
+            results = []
+            seen = set()
+            ranked = [_ranked_postings(entry, factor) for entry, factor in expanded[0]]
+            for neg_score, record_id in heapq.merge(*ranked):
+                if record_id not in seen:
+                    seen.add(record_id)
+                    results.append((record_id, -neg_score))
+                    if len(results) == limit:
+                        break
+            return results
+
+        # several words: try combinations of each word's score tiers, best
+        # combined score first, and intersect their record sets; once limit
+        # records are found, only combinations with the same score remain
+        if limit < 1:
+            return []
+        tiers = []
+        for term, matches in zip(terms, expanded):
+            word_tiers = self.tiers.get(term)
+            if word_tiers is None:
+                word_tiers = _tiers(_best_scores(matches))
+            tiers.append(word_tiers)
+
+        start = tuple(0 for _ in tiers)
+        heap = [(-sum(word_tiers[0][0] for word_tiers in tiers), start)]
+        queued = {start}
+        found = []
+        while heap:
+            neg_score, positions = heapq.heappop(heap)
+            if len(found) >= limit and neg_score > found[limit - 1][0]:
+                break
+            groups = sorted((word_tiers[i][1] for word_tiers, i in zip(tiers, positions)), key=len)
+            found.extend((neg_score, record_id) for record_id in groups[0].intersection(*groups[1:]))
+            for w, i in enumerate(positions):
+                if i + 1 < len(tiers[w]):
+                    following = positions[:w] + (i + 1,) + positions[w + 1:]
+                    if following not in queued:
+                        queued.add(following)
+                        total = sum(word_tiers[j][0] for word_tiers, j in zip(tiers, following))
+                        heapq.heappush(heap, (-total, following))
+
+        found.sort()
+        return [(record_id, -neg_score) for neg_score, record_id in found[:limit]]
+    
+    def to_dict(self):
+        """
+        Get the postings in a JSON-friendly form
+        
+        Returns: Dictionary {word: [[record_id, weight], ...]}
+        """
+        return {token: [[record_id, weight] for record_id, weight in entry.items()]
+                for token, entry in self.postings.items()}
+    
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Rebuild an index saved with to_dict
+        
+        Returns: SearchIndex
+        """
+        return cls({token: {record_id: weight for record_id, weight in entry}
+                    for token, entry in data.items()}, ranked=True)
+
+def _best_scores(matches):
+    """
+    Combine a query word's matches into each record's best score
+    
+    Returns: Dictionary {record_id: weight * factor of the best match}
+    """
+    if len(matches) == 1:
+        entry, factor = matches[0]
+        if factor == 1.0:
+            return entry
+        return {record_id: weight * factor for record_id, weight in entry.items()}
+    best = {}
+    for entry, factor in matches:
+        for record_id, weight in entry.items():
+            if weight * factor > best.get(record_id, 0):
+                best[record_id] = weight * factor
+    return best
+
+def _tiers(scores):
+    """
+    Group records by score
+    
+    Returns: List of (score, set of record_ids), highest score first
+    """
+    groups = {}
+    for record_id, score in scores.items():
+        groups.setdefault(score, set()).add(record_id)
+    return sorted(groups.items(), key=lambda pair: -pair[0])
+
+def _rank(entry):
+    """Order one word's {record_id: weight} postings by weight, then record ID"""
+    return dict(sorted(entry.items(), key=lambda pair: (-pair[1], pair[0])))
+
+def _ranked_postings(entry, factor):
+    """Yield (-score, record_id) for one word's postings, best first"""
+    for record_id, weight in entry.items():
+        yield (-weight * factor, record_id)
+
+def build_search_indexes(quests, items):
+    """
+    Build the quest and item search indexes
+    
+    Returns: Tuple of (quest SearchIndex, item SearchIndex)
+    """
+    return (SearchIndex.build(quests, QUEST_SEARCH_FIELDS),
+            SearchIndex.build(items, ITEM_SEARCH_FIELDS))
+
+def load_game_data(quest_file="data/quests.txt", item_file="data/items.txt",
+                   cache_file="data/game_data_cache.json"):
+    """
+    Load quests, items and their search indexes, using a cache when possible
+    
+    The cache holds the parsed data and both indexes, and is tied to the
+    size and modification time of the two data files. A missing, stale or
+    unreadable cache is rebuilt from the text files and rewritten.
+    
+    Returns: Dictionary with 'quests', 'items', 'quest_search', 'item_search'
+    Raises: MissingDataFileError, InvalidDataFormatError, CorruptedDataError
+    """
+    for filename in (quest_file, item_file):
+        if not os.path.exists(filename):
+            raise MissingDataFileError()
+
+    sources = {}
+    for filename in (quest_file, item_file):
+        info = os.stat(filename)
+        sources[filename] = [info.st_mtime_ns, info.st_size]
+
+    if cache_file and os.path.exists(cache_file):
+        try:
+            with open(cache_file, "r") as f:
+                cached = json.load(f)
+            if cached.get('sources') == sources:
+                return {
+                    'quests': cached['quests'],
+                    'items': ItemCatalog(cached['items']),
+                    'quest_search': SearchIndex.from_dict(cached['quest_search']),
+                    'item_search': SearchIndex.from_dict(cached['item_search'])
+                }
+        except (OSError, ValueError, KeyError, TypeError):
+            pass  # fall through and rebuild
+
+    quests = load_quests(quest_file)
+    items = load_items(item_file)
+    quest_search, item_search = build_search_indexes(quests, items)
+
+    if cache_file:
+        try:
+            with open(cache_file, "w") as f:
+                json.dump({'sources': sources, 'quests': quests, 'items': items,
+                           'quest_search': quest_search.to_dict(),
+                           'item_search': item_search.to_dict()}, f)
+        except OSError:
+            pass  # the cache is only an optimization
+
+    return {'quests': quests, 'items': items,
+            'quest_search': quest_search, 'item_search': item_search}
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
@@ -222,6 +665,34 @@ def parse_quest_block(lines):
 
     return data
 
+def parse_objectives(objective_string):
+    """
+    Parse a quest OBJECTIVE field
+    
+    Format: comma-separated "event_type:target:count" entries, where
+    target "*" matches any target. Event types: defeat (target is an
+    enemy type), collect (target is an item ID).
+    
+    Args:
+        objective_string: e.g. "defeat:goblin:3,collect:health_potion:1"
+    
+    Returns: List of (event_type, target, count) tuples
+    Raises: InvalidDataFormatError if an entry is malformed
+    """
+    objectives = []
+    for entry in objective_string.split(','):
+        parts = [part.strip() for part in entry.split(':')]
+        if len(parts) != 3 or parts[0] not in OBJECTIVE_EVENTS or not parts[1]:
+            raise InvalidDataFormatError(f"Invalid objective: {entry}")
+        try:
+            count = int(parts[2])
+        except ValueError:
+            raise InvalidDataFormatError(f"Invalid objective count: {entry}")
+        if count < 1:
+            raise InvalidDataFormatError(f"Invalid objective count: {entry}")
+        objectives.append((parts[0], parts[1], count))
+    return objectives
+
 def parse_item_block(lines):
     """
     Parse a block of lines into an item dictionary
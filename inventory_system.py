@@ -9,55 +9,614 @@ AI Usage: [Document any AI assistance used]
 This module handles inventory management, item usage, and equipment.
 """
 
+from bisect import bisect_left, bisect_right
 from custom_exceptions import (
     InventoryFullError,
     ItemNotFoundError,
     InsufficientResourcesError,
-    InvalidItemTypeError
+    InvalidItemTypeError,
+    OutOfStockError
 )
 
-# Maximum inventory size
+# Default inventory size (item slots)
 MAX_INVENTORY_SIZE = 20
 
+# Inventory capacity per class as (item slots, carry weight); other
+# characters get MAX_INVENTORY_SIZE slots and DEFAULT_CARRY_WEIGHT
+CLASS_INVENTORY_CAPACITY = {
+    'Warrior': (20, 100),
+    'Rogue': (20, 70),
+    'Cleric': (18, 70),
+    'Mage': (16, 50)
+}
+DEFAULT_CARRY_WEIGHT = 80
+
+# Weight of items whose data has no WEIGHT field
+DEFAULT_ITEM_WEIGHT = 1
+
+# Equippable item types and the slot each one occupies; a slot's item is
+# stored under character['equipped_<slot>']
+EQUIPMENT_SLOTS = {'weapon': 'weapon', 'armor': 'armor'}
+
+# Undo log marker for a key that was not staged before
+_UNSET = object()
+
+# ============================================================================
+# INVENTORY CONTAINER
+# ============================================================================
+
+class Inventory:
+    """
+    Stacked inventory: item ID -> quantity, in the order items were first added
+    
+    Stores one entry per distinct item, so membership, counting, adding
+    and removing are O(1). It supports the list operations the game uses
+    (in, len, iteration, indexing, append, remove, count), so code
+    written for plain list inventories keeps working. len() is the total
+    number of items, which is what the slot capacity model limits. Iteration
+    yields each item ID once per unit, stack by stack, so the save file
+    format is unchanged.
+    
+    Per-type views ({item type: {item_id: None}}) are built from the
+    catalog passed to get_items_of_type and then kept up to date as
+    stacks appear and disappear, so listing the consumables or weapons
+    held never scans the rest of the inventory.
+    
+    An InventoryCapacity tracking the inventory is stored in capacity,
+    and append/remove keep its used total current.
+    """
+    __slots__ = ('stacks', 'size', 'catalog', 'views', 'capacity')
+    
+    def __init__(self, item_ids=()):
+        """Initialize from any iterable of item IDs (repeats stack up)"""
+        self.stacks = {}
+        self.size = 0
+        self.catalog = None
+        self.views = {}
+        self.capacity = None
+        for item_id in item_ids:
+            self.append(item_id)
+    
+    def __contains__(self, item_id):
+        return item_id in self.stacks
+    
+    def __len__(self):
+        return self.size
+    
+    def __iter__(self):
+        for item_id, quantity in self.stacks.items():
+            for _ in range(quantity):
+                yield item_id
+    
+    def __getitem__(self, index):
+        return list(self)[index]
+    
+    def __eq__(self, other):
+        """Equal to another inventory or list holding the same item quantities"""
+        if isinstance(other, Inventory):
+            return self.stacks == other.stacks
+        if isinstance(other, list):
+            return self.stacks == Inventory(other).stacks
+        return NotImplemented
+    
+    def __repr__(self):
+        return f"Inventory({self.stacks!r})"
+    
+    def append(self, item_id, quantity=1):
+        """Add quantity units of an item"""
+        held = self.stacks.get(item_id, 0)
+        self.stacks[item_id] = held + quantity
+        self.size += quantity
+        if not held and self.catalog is not None:
+            self.views.setdefault(self._item_type(item_id), {})[item_id] = None
+        capacity = self.capacity
+        if capacity is not None and capacity.inventory is self:
+            capacity.used += capacity.cost(item_id, quantity)
+    
+    def remove(self, item_id, quantity=1):
+        """
+        Remove quantity units of an item
+        
+        Raises: ValueError if fewer than quantity units are present (like list.remove)
+        """
+        held = self.stacks.get(item_id, 0)
+        if held < quantity:
+            raise ValueError(f"{item_id} not in inventory")
+        if held == quantity:
+            del self.stacks[item_id]
+            if self.catalog is not None:
+                del self.views[self._item_type(item_id)][item_id]
+        else:
+            self.stacks[item_id] = held - quantity
+        self.size -= quantity
+        capacity = self.capacity
+        if capacity is not None and capacity.inventory is self:
+            capacity.used -= capacity.cost(item_id, quantity)
+    
+    def count(self, item_id):
+        """Get the quantity of an item"""
+        return self.stacks.get(item_id, 0)
+    
+    def items(self):
+        """
+        Get the stacks
+        
+        Returns: View of (item_id, quantity) pairs
+        """
+        return self.stacks.items()
+    
+    def get_items_of_type(self, item_type, item_data_dict):
+        """
+        Get the held items of a type
+        
+        Args:
+            item_type: 'weapon', 'armor', 'consumable' (None = unknown items)
+            item_data_dict: Dictionary of all item data
+        
+        The first call with a catalog builds the views in one pass over
+        the stacks; later calls with the same catalog reuse them.
+        
+        Returns: List of item IDs, in the order they were first added
+        """
+        if self.catalog is not item_data_dict:
+            self.catalog = item_data_dict
+            self.views = {}
+            for item_id in self.stacks:
+                self.views.setdefault(self._item_type(item_id), {})[item_id] = None
+        return list(self.views.get(item_type, ()))
+    
+    def _item_type(self, item_id):
+        """Look up an item's type in the bound catalog"""
+        item = self.catalog.get(item_id)
+        return item.get('type') if item is not None else None
+    
+    def to_save_string(self):
+        """
+        Serialize for a save file
+        
+        Returns: Comma-separated item IDs, one per unit
+        """
+        return ",".join(self)
+    
+    @classmethod
+    def from_save_string(cls, value):
+        """
+        Parse a comma-separated save field
+        
+        Returns: Inventory
+        """
+        return cls(value.split(",") if value else ())
+
+# ============================================================================
+# CAPACITY
+# ============================================================================
+
+class InventoryCapacity:
+    """
+    How much a character can carry and how much they carry now
+    
+    In the slot model (weights is None) every unit takes one slot. In
+    the weight model each unit costs its item's 'weight' from the item
+    data (DEFAULT_ITEM_WEIGHT if it has none). used is a running total,
+    so checking whether something fits is O(1). A stacked Inventory
+    updates it on every append and remove, including direct calls. For
+    a plain list, transactions add their staged cost on commit, and the
+    total is recounted when the list's length no longer matches. It is
+    also recomputed when the character's inventory object is replaced
+    (for example by loading or clear_inventory).
+    """
+    __slots__ = ('limit', 'weights', 'used', 'inventory', 'size')
+    
+    def __init__(self, limit, weights=None):
+        """
+        Create a capacity rule
+        
+        Args:
+            limit: Number of slots, or total weight in the weight model
+            weights: Item data dictionary for the weight model, or None for slots
+        """
+        self.limit = limit
+        self.weights = weights
+        self.used = 0
+        self.inventory = None
+        # length of a plain list inventory when used was last counted
+        self.size = 0
+    
+    def cost(self, item_id, quantity=1):
+        """Get the capacity quantity units of an item take"""
+        if self.weights is None:
+            return quantity
+        item = self.weights.get(item_id)
+        weight = item.get('weight', DEFAULT_ITEM_WEIGHT) if item is not None else DEFAULT_ITEM_WEIGHT
+        return weight * quantity
+    
+    def track(self, inventory):
+        """Recompute used if the total does not belong to this inventory"""
+        if isinstance(inventory, Inventory):
+            if inventory is self.inventory and inventory.capacity is self:
+                return
+            inventory.capacity = self
+            pairs = inventory.items()
+        else:
+            if inventory is self.inventory and len(inventory) == self.size:
+                return
+            self.size = len(inventory)
+            pairs = ((item_id, 1) for item_id in inventory)
+        self.inventory = inventory
+        self.used = sum(self.cost(item_id, quantity) for item_id, quantity in pairs)
+    
+    def remaining(self):
+        """Get the unused capacity"""
+        return max(0, self.limit - self.used)
+
+def get_inventory_capacity(character):
+    """
+    Get the character's capacity rule, creating the class default if needed
+    
+    Stored under 'capacity'. Like the derived-stat block it is rebuilt
+    rather than saved; a custom rule must be set again after loading.
+    
+    Returns: InventoryCapacity with used up to date
+    """
+    capacity = character.get('capacity')
+    if capacity is None:
+        capacity = InventoryCapacity(_class_capacity(character)[0])
+        character['capacity'] = capacity
+    capacity.track(character.get('inventory', []))
+    return capacity
+
+def set_inventory_capacity(character, limit=None, item_data_dict=None):
+    """
+    Give a character its own capacity rule
+    
+    Args:
+        character: Character dictionary
+        limit: Slots or carry weight; None for the class default of the model
+        item_data_dict: Item data to weigh items with, or None for the slot model
+    
+    Returns: InventoryCapacity
+    """
+    if limit is None:
+        slots, weight = _class_capacity(character)
+        limit = slots if item_data_dict is None else weight
+    capacity = InventoryCapacity(limit, item_data_dict)
+    character['capacity'] = capacity
+    capacity.track(character.get('inventory', []))
+    return capacity
+
+def _class_capacity(character):
+    """Get the (item slots, carry weight) defaults for a character's class"""
+    return CLASS_INVENTORY_CAPACITY.get(character.get('class'),
+                                        (MAX_INVENTORY_SIZE, DEFAULT_CARRY_WEIGHT))
+
+# ============================================================================
+# TRANSACTIONS
+# ============================================================================
+
+class CharacterTransaction:
+    """
+    Stages character changes and applies them all at once, or not at all
+    
+    Field writes go to a write-set dictionary and inventory changes to
+    per-item quantity deltas. Reads through the transaction see the
+    staged values layered over the character, and the character itself
+    is untouched until commit. Nothing is copied up front, so a
+    transaction costs only as much as it changes.
+    
+    Used as a context manager it commits when the block finishes and
+    rolls back if the block raises:
+    
+        with CharacterTransaction(character) as txn:
+            purchase_item(character, "iron_sword", items["iron_sword"], txn=txn)
+            purchase_item(character, "health_potion", items["health_potion"], txn=txn)
+    
+    It also behaves like a read/write view of the character (get, [],
+    in), so stat helpers such as apply_stat_effect can take it in place
+    of the character dictionary.
+    
+    Each operation runs inside savepoint(), so an operation that raises
+    leaves nothing staged even if the caller catches the error and
+    commits the rest of the batch. Staged dictionary writes go through
+    an undo log, so a savepoint costs O(1) to take and restoring it
+    costs only what the failed operation staged.
+    """
+    
+    def __init__(self, character):
+        """Start a transaction on a character"""
+        self.character = character
+        self.writes = {}
+        self.item_deltas = {}
+        self.size_delta = 0
+        self.used_delta = 0
+        self.collected = []
+        self.rollback_hooks = []
+        self.modifier_changes = {}
+        # (staged dictionary, key, previous value or _UNSET) per staged write
+        self.undo = []
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+    
+    def get(self, key, default=None):
+        """Read a field, seeing staged writes"""
+        if key in self.writes:
+            return self.writes[key]
+        return self.character.get(key, default)
+    
+    def __getitem__(self, key):
+        if key in self.writes:
+            return self.writes[key]
+        return self.character[key]
+    
+    def __setitem__(self, key, value):
+        self._stage(self.writes, key, value)
+    
+    def __contains__(self, key):
+        return key in self.writes or key in self.character
+    
+    def count_item(self, item_id):
+        """Get an item's quantity including staged changes"""
+        return self.character.get('inventory', []).count(item_id) + self.item_deltas.get(item_id, 0)
+    
+    def has_item(self, item_id):
+        """Check for an item including staged changes"""
+        return self.count_item(item_id) > 0
+    
+    def inventory_size(self):
+        """Get the number of items including staged changes"""
+        return len(self.character.get('inventory', [])) + self.size_delta
+    
+    def add_item(self, item_id, collect=False, quantity=1):
+        """
+        Stage adding items
+        
+        Args:
+            item_id: Item to add
+            collect: Publish a 'collect' quest event for it on commit
+            quantity: Number of units
+        
+        Raises:
+            ValueError if quantity is less than 1
+            InventoryFullError if the units do not fit the character's capacity
+        """
+        if quantity < 1:
+            raise ValueError(f"Quantity must be at least 1, got {quantity}")
+        capacity = get_inventory_capacity(self.character)
+        cost = capacity.cost(item_id, quantity)
+        if capacity.used + self.used_delta + cost > capacity.limit:
+            raise InventoryFullError()
+        self._stage(self.item_deltas, item_id, self.item_deltas.get(item_id, 0) + quantity)
+        self.size_delta += quantity
+        self.used_delta += cost
+        if collect:
+            self.collected.append((item_id, quantity))
+    
+    def remove_item(self, item_id, quantity=1):
+        """
+        Stage removing items
+        
+        Raises:
+            ValueError if quantity is less than 1
+            ItemNotFoundError if the staged inventory has fewer than quantity units
+        """
+        if quantity < 1:
+            raise ValueError(f"Quantity must be at least 1, got {quantity}")
+        if self.count_item(item_id) < quantity:
+            raise ItemNotFoundError()
+        self._stage(self.item_deltas, item_id, self.item_deltas.get(item_id, 0) - quantity)
+        self.size_delta -= quantity
+        self.used_delta -= get_inventory_capacity(self.character).cost(item_id, quantity)
+    
+    def set_modifier(self, source, stat, amount):
+        """Stage adding or replacing a stat modifier (see CharacterStats)"""
+        self._stage(self.modifier_changes, source, (stat, amount))
+    
+    def remove_modifier(self, source):
+        """Stage removing a stat modifier"""
+        self._stage(self.modifier_changes, source, None)
+    
+    def on_rollback(self, callback):
+        """Register a function to call if the transaction is rolled back"""
+        self.rollback_hooks.append(callback)
+    
+    def savepoint(self):
+        """
+        Undo what a with-block stages if it raises
+        
+        Taking a savepoint only remembers the undo log's length and the
+        running totals; restoring pops the log back to that length, so
+        it never copies the staged dictionaries. Rollback hooks
+        registered inside the block are run and dropped, and the
+        exception is re-raised.
+        
+        Returns: Context manager
+        """
+        return TransactionSavepoint(self)
+    
+    def _stage(self, staged, key, value):
+        """Set a key in one of the staged dictionaries, logging its old value"""
+        self.undo.append((staged, key, staged.get(key, _UNSET)))
+        staged[key] = value
+    
+    def commit(self):
+        """
+        Apply every staged change to the character
+        
+        Removals are checked against the inventory before anything is
+        touched (it may have changed since they were staged), then
+        applied before additions, so applying cannot fail halfway. The
+        inventory is updated before field writes, and field writes
+        before modifier changes, so a direct stat write counts as a base
+        stat change.
+        
+        Returns: True
+        Raises: ItemNotFoundError if a staged removal no longer matches the
+                inventory (nothing is applied)
+        """
+        character = self.character
+        inv = character.get('inventory', [])
+        changes = sorted(self.item_deltas.items(), key=lambda pair: pair[1])
+        for item_id, delta in changes:
+            if delta < 0 and inv.count(item_id) < -delta:
+                raise ItemNotFoundError()
+
+        inv = character.setdefault('inventory', Inventory())
+        stacked = isinstance(inv, Inventory)
+        for item_id, delta in changes:
+            if delta < 0:
+                if stacked:
+                    inv.remove(item_id, -delta)
+                else:
+                    for _ in range(-delta):
+                        inv.remove(item_id)
+            elif delta > 0:
+                if stacked:
+                    inv.append(item_id, delta)
+                else:
+                    inv.extend([item_id] * delta)
+
+        # a stacked inventory already updated its capacity as it changed
+        capacity = character.get('capacity')
+        if not stacked and capacity is not None and capacity.inventory is inv:
+            capacity.used += self.used_delta
+            capacity.size = len(inv)
+
+        character.update(self.writes)
+
+        if self.modifier_changes:
+            from character_manager import get_character_stats
+            stats = get_character_stats(character)
+            for source, change in self.modifier_changes.items():
+                if change is None:
+                    stats.remove_modifier(source)
+                else:
+                    stats.set_modifier(source, *change)
+
+        collected = self.collected
+        self.reset()
+
+        # a dead character's pickups count toward nothing (completing a
+        # quest would fail in gain_experience after the inventory changed)
+        if collected and character.get('quest_tracker') is not None \
+                and character.get('health', 0) > 0:
+            from quest_handler import publish_quest_event
+            for item_id, quantity in collected:
+                publish_quest_event(character, 'collect', item_id, quantity)
+        return True
+    
+    def rollback(self):
+        """Discard every staged change and run the rollback hooks"""
+        hooks = self.rollback_hooks
+        self.reset()
+        for callback in reversed(hooks):
+            callback()
+    
+    def reset(self):
+        """Forget all staged changes and hooks"""
+        self.writes = {}
+        self.item_deltas = {}
+        self.size_delta = 0
+        self.used_delta = 0
+        self.collected = []
+        self.rollback_hooks = []
+        self.modifier_changes = {}
+        self.undo = []
+
+class TransactionSavepoint:
+    """
+    Point in a CharacterTransaction to return to if a block raises
+    
+    See CharacterTransaction.savepoint.
+    """
+    __slots__ = ('txn', 'undo', 'size_delta', 'used_delta', 'collected', 'hooks')
+    
+    def __init__(self, txn):
+        """Remember where the transaction's staged state is now"""
+        self.txn = txn
+        self.undo = len(txn.undo)
+        self.size_delta = txn.size_delta
+        self.used_delta = txn.used_delta
+        self.collected = len(txn.collected)
+        self.hooks = len(txn.rollback_hooks)
+    
+    def __enter__(self):
+        return self.txn
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.restore()
+        return False
+    
+    def restore(self):
+        """Discard everything staged since the savepoint and run its rollback hooks"""
+        txn = self.txn
+        undo = txn.undo
+        while len(undo) > self.undo:
+            staged, key, previous = undo.pop()
+            if previous is _UNSET:
+                del staged[key]
+            else:
+                staged[key] = previous
+        txn.size_delta = self.size_delta
+        txn.used_delta = self.used_delta
+        del txn.collected[self.collected:]
+        hooks = txn.rollback_hooks[self.hooks:]
+        del txn.rollback_hooks[self.hooks:]
+        for callback in reversed(hooks):
+            callback()
+
 # ============================================================================
 # INVENTORY MANAGEMENT
 # ============================================================================
 
-def add_item_to_inventory(character, item_id):
+def add_item_to_inventory(character, item_id, txn=None):
     """
     Add an item to character's inventory
     
     Args:
         character: Character dictionary
         item_id: Unique item identifier
+        txn: Optional CharacterTransaction to stage the change in
+    
+    Counts as a 'collect' event for quest objectives.
     
     Returns: True if added successfully
     Raises: InventoryFullError if inventory is at max capacity
     """
-    inv = character.setdefault('inventory', [])
-    if len(inv) >= MAX_INVENTORY_SIZE:
-        raise InventoryFullError()
+    if txn is None:
+        with CharacterTransaction(character) as txn:
+            return add_item_to_inventory(character, item_id, txn)
 
-    inv.append(item_id)
-    return True
+    with txn.savepoint():
+        txn.add_item(item_id, collect=True)
+        return True
 
-def remove_item_from_inventory(character, item_id):
+def remove_item_from_inventory(character, item_id, txn=None):
     """
     Remove an item from character's inventory
     
     Args:
         character: Character dictionary
         item_id: Item to remove
+        txn: Optional CharacterTransaction to stage the change in
     
     Returns: True if removed successfully
     Raises: ItemNotFoundError if item not in inventory
     """
-    inv = character.setdefault('inventory', [])
-    if item_id not in inv:
-        raise ItemNotFoundError()
+    if txn is None:
+        with CharacterTransaction(character) as txn:
+            return remove_item_from_inventory(character, item_id, txn)
 
-    inv.remove(item_id)
-    return True
+    with txn.savepoint():
+        txn.remove_item(item_id)
+        return True
 
 def has_item(character, item_id):
     """
@@ -75,14 +634,30 @@ def count_item(character, item_id):
     """
     return character.get('inventory', []).count(item_id)
 
+def get_items_of_type(character, item_type, item_data_dict):
+    """
+    Get the distinct items of one type in a character's inventory
+    
+    Args:
+        character: Character dictionary
+        item_type: 'weapon', 'armor' or 'consumable'
+        item_data_dict: Dictionary of all item data
+    
+    Returns: List of item IDs, in the order they were first added
+    """
+    inv = character.get('inventory', [])
+    if isinstance(inv, Inventory):
+        return inv.get_items_of_type(item_type, item_data_dict)
+    return list(dict.fromkeys(i for i in inv
+                              if item_data_dict.get(i, {}).get('type') == item_type))
+
 def get_inventory_space_remaining(character):
     """
-    Calculate how many more items can fit in inventory
+    Calculate how much more fits in inventory
     
-    Returns: Integer representing available slots
+    Returns: Integer representing available slots (or weight, in the weight model)
     """
-    used = len(character.get('inventory', []))
-    return max(0, MAX_INVENTORY_SIZE - used)
+    return get_inventory_capacity(character).remaining()
 
 def clear_inventory(character):
     """
@@ -90,15 +665,16 @@ def clear_inventory(character):
     
     Returns: List of removed items
     """
-    removed = list(character.get('inventory', []))
-    character['inventory'] = []
+    inv = character.get('inventory', [])
+    removed = list(inv)
+    character['inventory'] = Inventory() if isinstance(inv, Inventory) else []
     return removed
 
 # ============================================================================
 # ITEM USAGE
 # ============================================================================
 
-def use_item(character, item_id, item_data):
+def use_item(character, item_id, item_data, txn=None):
     """
     Use a consumable item from inventory
     
@@ -106,6 +682,7 @@ def use_item(character, item_id, item_data):
         character: Character dictionary
         item_id: Item to use
         item_data: Item information dictionary from game_data
+        txn: Optional CharacterTransaction to stage the change in
     
     Item types and effects:
     - consumable: Apply effect and remove from inventory
@@ -116,23 +693,281 @@ def use_item(character, item_id, item_data):
         ItemNotFoundError if item not in inventory
         InvalidItemTypeError if item type is not 'consumable'
     """
-    inv = character.setdefault('inventory', [])
-    if item_id not in inv:
-        raise ItemNotFoundError()
+    if txn is None:
+        with CharacterTransaction(character) as txn:
+            return use_item(character, item_id, item_data, txn)
+
+    with txn.savepoint():
+        if not txn.has_item(item_id):
+            raise ItemNotFoundError()
+
+        if item_data.get('type') != 'consumable':
+            raise InvalidItemTypeError()
+
+        # parse effect
+        effect = item_data.get('effect', '')
+        stat, val = parse_item_effect(effect)
+        apply_stat_effect(txn, stat, val)
+
+        # remove one instance
+        txn.remove_item(item_id)
+        return f"Used {item_id}: {stat} {'+' if val>=0 else ''}{val}"
+
+def use_items(character, item_id, item_data, count, txn=None):
+    """
+    Use several units of a consumable at once
+    
+    The effect is parsed once and applied as a single stat change of
+    count times its value (health is still capped at max_health), and
+    the units leave the inventory in one step.
+    
+    Args:
+        character: Character dictionary
+        item_id: Item to use
+        item_data: Item information dictionary from game_data
+        count: Number of units to use
+        txn: Optional CharacterTransaction to stage the change in
+    
+    Returns: String describing what happened
+    Raises:
+        ValueError if count is less than 1
+        ItemNotFoundError if fewer than count units are in inventory
+        InvalidItemTypeError if item type is not 'consumable'
+    """
+    if count < 1:
+        raise ValueError(f"Count must be at least 1, got {count}")
+    if txn is None:
+        with CharacterTransaction(character) as txn:
+            return use_items(character, item_id, item_data, count, txn)
+
+    with txn.savepoint():
+        if txn.count_item(item_id) < count:
+            raise ItemNotFoundError()
 
-    if item_data.get('type') != 'consumable':
-        raise InvalidItemTypeError()
+        if item_data.get('type') != 'consumable':
+            raise InvalidItemTypeError()
 
-    # parse effect
-    effect = item_data.get('effect', '')
-    stat, val = parse_item_effect(effect)
-    apply_stat_effect(character, stat, val)
+        stat, val = parse_item_effect(item_data.get('effect', ''))
+        apply_stat_effect(txn, stat, val * count)
+        txn.remove_item(item_id, count)
+        return f"Used {count} x {item_id}: {stat} {'+' if val>=0 else ''}{val * count}"
 
-    # remove one instance
-    inv.remove(item_id)
-    return f"Used {item_id}: {stat} {'+' if val>=0 else ''}{val}"
+def plan_heal(character, item_data_dict, target_health=None):
+    """
+    Choose the cheapest mix of held healing items that reaches a target
+    
+    Healing consumables come from get_heal_table. The plan is a bounded knapsack over the health
+    still missing: each held unit is either used or not, the units of
+    one item are grouped in powers of two, and for every amount of
+    healing (capped at the amount needed) the cheapest way to reach it
+    is kept, with fewer items breaking ties. If everything held cannot
+    reach the target, every healing item is used.
+    
+    Args:
+        character: Character dictionary (or a CharacterTransaction on one)
+        item_data_dict: Dictionary of all item data
+        target_health: Health to reach (default and maximum: max_health)
+    
+    Returns: Dictionary of {item_id: units to use} (empty if nothing is needed)
+    """
+    max_health = character.get('max_health', 0)
+    target = max_health if target_health is None else min(target_health, max_health)
+    need = target - character.get('health', 0)
+    if need <= 0:
+        return {}
+
+    if isinstance(character, CharacterTransaction):
+        count = character.count_item
+    else:
+        count = character.get('inventory', []).count
+    held = []
+    for item_id, (heal, cost) in get_heal_table(item_data_dict).items():
+        quantity = count(item_id)
+        if quantity:
+            held.append((item_id, heal, cost, quantity))
+    if sum(heal * quantity for _, heal, _, quantity in held) <= need:
+        return {item_id: quantity for item_id, _, _, quantity in held}
+
+    # split each item's units into groups of 1, 2, 4, ... so any count is a subset
+    groups = []
+    for item_id, heal, cost, quantity in held:
+        size = 1
+        while quantity:
+            size = min(size, quantity)
+            groups.append((item_id, size, heal * size, cost * size))
+            quantity -= size
+            size *= 2
+
+    # best[h] = (cost, items) to heal h (h == need means need or more)
+    unreachable = (float('inf'), 0)
+    best = [unreachable] * (need + 1)
+    best[0] = (0, 0)
+    sources = []
+    for _, size, heal, cost in groups:
+        source = {}
+        for h in range(need, -1, -1):
+            if best[h] is unreachable:
+                continue
+            t = min(need, h + heal)
+            option = (best[h][0] + cost, best[h][1] + size)
+            if option < best[t]:
+                best[t] = option
+                source[t] = h
+        sources.append(source)
+
+    plan = {}
+    h = need
+    for (item_id, size, _, _), source in zip(reversed(groups), reversed(sources)):
+        if h in source:
+            plan[item_id] = plan.get(item_id, 0) + size
+            h = source[h]
+    return plan
+
+def auto_heal(character, item_data_dict, target_health=None, txn=None):
+    """
+    Heal with the cheapest mix of held consumables (see plan_heal)
+    
+    The planned units are removed and their healing applied as one
+    health change.
+    
+    Args:
+        character: Character dictionary
+        item_data_dict: Dictionary of all item data
+        target_health: Health to reach (default: max_health)
+        txn: Optional CharacterTransaction to stage the change in
+    
+    Returns: Dictionary of {item_id: units used}
+    """
+    if txn is None:
+        with CharacterTransaction(character) as txn:
+            return auto_heal(character, item_data_dict, target_health, txn)
+
+    with txn.savepoint():
+        plan = plan_heal(txn, item_data_dict, target_health)
+        heal_table = get_heal_table(item_data_dict)
+        healed = 0
+        for item_id, quantity in plan.items():
+            txn.remove_item(item_id, quantity)
+            healed += heal_table[item_id][0] * quantity
+        if healed:
+            apply_stat_effect(txn, 'health', healed)
+        return plan
+
+# Healing tables built per item catalog, keyed by id(catalog).
+# Each entry is (catalog, size when built, heal table).
+_heal_tables = {}
+_MAX_CACHED_CATALOGS = 32
+
+def get_heal_table(item_data_dict):
+    """
+    Get the healing consumables in a catalog, building the table on first use
+    
+    Effects are parsed once per catalog. Like the quest catalog indexes,
+    the table is rebuilt if items are added or removed; after editing
+    items in place call invalidate_heal_table.
+    
+    Returns: Dictionary of {item_id: (health restored, cost)}
+    """
+    entry = _heal_tables.get(id(item_data_dict))
+    if entry is None or entry[0] is not item_data_dict or entry[1] != len(item_data_dict):
+        if len(_heal_tables) >= _MAX_CACHED_CATALOGS:
+            _heal_tables.clear()
+        entry = (item_data_dict, len(item_data_dict), _build_heal_table(item_data_dict))
+        _heal_tables[id(item_data_dict)] = entry
+    return entry[2]
+
+def invalidate_heal_table(item_data_dict):
+    """Drop the cached heal table for an item catalog"""
+    _heal_tables.pop(id(item_data_dict), None)
+
+def _build_heal_table(item_data_dict):
+    """
+    List the healing consumables in a catalog
+    
+    An ItemCatalog's type index limits the scan to its consumables.
+    
+    Returns: Dictionary of {item_id: (health restored, cost)}
+    """
+    by_type = getattr(item_data_dict, 'by_type', None)
+    item_ids = by_type.get('consumable', ()) if by_type is not None else item_data_dict
+    table = {}
+    for item_id in item_ids:
+        item = item_data_dict[item_id]
+        if item.get('type') != 'consumable':
+            continue
+        stat, val = parse_item_effect(item.get('effect', ''))
+        if stat == 'health' and val > 0:
+            table[item_id] = (val, int(item.get('cost', 0)))
+    return table
 
-def equip_weapon(character, item_id, item_data):
+def equip_item(character, item_id, item_data, txn=None, item_type=None):
+    """
+    Equip an item in the slot for its type
+    
+    Args:
+        character: Character dictionary
+        item_id: Item to equip
+        item_data: Item information dictionary
+        txn: Optional CharacterTransaction to stage the change in
+        item_type: Required item type, or None for any type in EQUIPMENT_SLOTS
+    
+    The item's effect ("stat:value") becomes the slot's stat modifier.
+    The slot's previous item goes back to inventory, into the space the
+    new one frees, and its modifier is replaced.
+    
+    Returns: String describing equipment change
+    Raises:
+        ItemNotFoundError if item not in inventory
+        InvalidItemTypeError if the item cannot be equipped (or is not item_type)
+    """
+    if txn is None:
+        with CharacterTransaction(character) as txn:
+            return equip_item(character, item_id, item_data, txn, item_type)
+
+    with txn.savepoint():
+        if not txn.has_item(item_id):
+            raise ItemNotFoundError()
+
+        slot = EQUIPMENT_SLOTS.get(item_data.get('type'))
+        if slot is None or (item_type is not None and item_data.get('type') != item_type):
+            raise InvalidItemTypeError()
+
+        txn.remove_item(item_id)
+        key = f"equipped_{slot}"
+        if txn.get(key):
+            txn.add_item(txn[key])
+
+        stat, val = parse_item_effect(item_data.get('effect', ''))
+        if stat:
+            txn.set_modifier(f"equipment:{slot}", stat, val)
+        else:
+            txn.remove_modifier(f"equipment:{slot}")
+        txn[key] = item_id
+        return f"Equipped {item_id}"
+
+def unequip_item(character, slot, txn=None):
+    """
+    Remove the item in an equipment slot and return it to inventory
+    
+    Returns: Item ID that was unequipped, or None if the slot was empty
+    Raises: InventoryFullError if inventory is full
+    """
+    if txn is None:
+        with CharacterTransaction(character) as txn:
+            return unequip_item(character, slot, txn)
+
+    with txn.savepoint():
+        key = f"equipped_{slot}"
+        item_id = txn.get(key)
+        if not item_id:
+            return None
+
+        txn.add_item(item_id)
+        txn.remove_modifier(f"equipment:{slot}")
+        txn[key] = None
+        return item_id
+
+def equip_weapon(character, item_id, item_data, txn=None):
     """
     Equip a weapon
     
@@ -140,49 +975,22 @@ def equip_weapon(character, item_id, item_data):
         character: Character dictionary
         item_id: Weapon to equip
         item_data: Item information dictionary
+        txn: Optional CharacterTransaction to stage the change in
     
     Weapon effect format: "strength:5" (adds 5 to strength)
     
     If character already has weapon equipped:
     - Unequip current weapon (remove bonus)
-    - Add old weapon back to inventory
+    - Add old weapon back to inventory (into the slot the new one frees)
     
     Returns: String describing equipment change
     Raises:
         ItemNotFoundError if item not in inventory
         InvalidItemTypeError if item type is not 'weapon'
     """
-    inv = character.setdefault('inventory', [])
-    if item_id not in inv:
-        raise ItemNotFoundError()
-
-    if item_data.get('type') != 'weapon':
-        raise InvalidItemTypeError()
-
-    # Unequip current weapon
-    if 'equipped_weapon' in character and character['equipped_weapon']:
-        # reverse old bonus
-        old_id = character['equipped_weapon']
-        old_bonus = character.get('equipped_weapon_bonus', 0)
-        character['strength'] = character.get('strength', 0) - old_bonus
-        # return old weapon to inventory
-        if len(inv) >= MAX_INVENTORY_SIZE:
-            raise InventoryFullError()
-        inv.append(old_id)
-
-    # apply new weapon bonus
-    stat, val = parse_item_effect(item_data.get('effect', ''))
-    if stat != 'strength':
-        # weapons expected to modify strength
-        pass
-    character['strength'] = character.get('strength', 0) + val
-    character['equipped_weapon'] = item_id
-    character['equipped_weapon_bonus'] = val
-    # remove from inventory
-    inv.remove(item_id)
-    return f"Equipped {item_id}" 
-
-def equip_armor(character, item_id, item_data):
+    return equip_item(character, item_id, item_data, txn, item_type='weapon')
+
+def equip_armor(character, item_id, item_data, txn=None):
     """
     Equip armor
     
@@ -190,95 +998,44 @@ def equip_armor(character, item_id, item_data):
         character: Character dictionary
         item_id: Armor to equip
         item_data: Item information dictionary
+        txn: Optional CharacterTransaction to stage the change in
     
     Armor effect format: "max_health:10" (adds 10 to max_health)
     
     If character already has armor equipped:
     - Unequip current armor (remove bonus)
-    - Add old armor back to inventory
+    - Add old armor back to inventory (into the slot the new one frees)
     
     Returns: String describing equipment change
     Raises:
         ItemNotFoundError if item not in inventory
         InvalidItemTypeError if item type is not 'armor'
     """
-    inv = character.setdefault('inventory', [])
-    if item_id not in inv:
-        raise ItemNotFoundError()
-
-    if item_data.get('type') != 'armor':
-        raise InvalidItemTypeError()
-
-    # Unequip current armor
-    if 'equipped_armor' in character and character['equipped_armor']:
-        old_id = character['equipped_armor']
-        old_bonus = character.get('equipped_armor_bonus', 0)
-        character['max_health'] = character.get('max_health', 0) - old_bonus
-        # ensure current health doesn't exceed new max
-        character['health'] = min(character.get('health', 0), character['max_health'])
-        if len(inv) >= MAX_INVENTORY_SIZE:
-            raise InventoryFullError()
-        inv.append(old_id)
-
-    stat, val = parse_item_effect(item_data.get('effect', ''))
-    if stat != 'max_health':
-        pass
-    character['max_health'] = character.get('max_health', 0) + val
-    character['equipped_armor'] = item_id
-    character['equipped_armor_bonus'] = val
-    inv.remove(item_id)
-    return f"Equipped {item_id}"
+    return equip_item(character, item_id, item_data, txn, item_type='armor')
 
-def unequip_weapon(character):
+def unequip_weapon(character, txn=None):
     """
     Remove equipped weapon and return it to inventory
     
     Returns: Item ID that was unequipped, or None if no weapon equipped
     Raises: InventoryFullError if inventory is full
     """
-    if 'equipped_weapon' not in character or not character['equipped_weapon']:
-        return None
+    return unequip_item(character, 'weapon', txn)
 
-    inv = character.setdefault('inventory', [])
-    if len(inv) >= MAX_INVENTORY_SIZE:
-        raise InventoryFullError()
-
-    item_id = character['equipped_weapon']
-    bonus = character.get('equipped_weapon_bonus', 0)
-    character['strength'] = character.get('strength', 0) - bonus
-    character['equipped_weapon'] = None
-    character['equipped_weapon_bonus'] = 0
-    inv.append(item_id)
-    return item_id
-
-def unequip_armor(character):
+def unequip_armor(character, txn=None):
     """
     Remove equipped armor and return it to inventory
     
     Returns: Item ID that was unequipped, or None if no armor equipped
     Raises: InventoryFullError if inventory is full
     """
-    if 'equipped_armor' not in character or not character['equipped_armor']:
-        return None
-
-    inv = character.setdefault('inventory', [])
-    if len(inv) >= MAX_INVENTORY_SIZE:
-        raise InventoryFullError()
-
-    item_id = character['equipped_armor']
-    bonus = character.get('equipped_armor_bonus', 0)
-    character['max_health'] = character.get('max_health', 0) - bonus
-    character['health'] = min(character.get('health', 0), character['max_health'])
-    character['equipped_armor'] = None
-    character['equipped_armor_bonus'] = 0
-    inv.append(item_id)
-    return item_id
+    return unequip_item(character, 'armor', txn)
 
 # ============================================================================
 # SHOP SYSTEM
 # ============================================================================
 
-def purchase_item(character, item_id, item_data):
+def purchase_item(character, item_id, item_data, txn=None, quantity=1):
     """
     Purchase an item from a shop
     
@@ -286,24 +1043,32 @@ def purchase_item(character, item_id, item_data):
         character: Character dictionary
         item_id: Item to purchase
         item_data: Item information with 'cost' field
+        txn: Optional CharacterTransaction to stage the change in
+             (several purchases and sales can then commit together)
+        quantity: Number of units to buy at once
     
     Returns: True if purchased successfully
     Raises:
+        ValueError if quantity is less than 1
         InsufficientResourcesError if not enough gold
         InventoryFullError if inventory is full
     """
-    cost = int(item_data.get('cost', 0))
-    if character.get('gold', 0) < cost:
-        raise InsufficientResourcesError()
+    if quantity < 1:
+        raise ValueError(f"Quantity must be at least 1, got {quantity}")
+    if txn is None:
+        with CharacterTransaction(character) as txn:
+            return purchase_item(character, item_id, item_data, txn, quantity)
 
-    if get_inventory_space_remaining(character) <= 0:
-        raise InventoryFullError()
+    with txn.savepoint():
+        cost = int(item_data.get('cost', 0)) * quantity
+        if txn.get('gold', 0) < cost:
+            raise InsufficientResourcesError()
 
-    character['gold'] = character.get('gold', 0) - cost
-    add_item_to_inventory(character, item_id)
-    return True
+        txn.add_item(item_id, collect=True, quantity=quantity)
+        txn['gold'] = txn.get('gold', 0) - cost
+        return True
 
-def sell_item(character, item_id, item_data):
+def sell_item(character, item_id, item_data, txn=None, quantity=1):
     """
     Sell an item for half its purchase cost
     
@@ -311,17 +1076,170 @@ def sell_item(character, item_id, item_data):
         character: Character dictionary
         item_id: Item to sell
         item_data: Item information with 'cost' field
+        txn: Optional CharacterTransaction to stage the change in
+        quantity: Number of units to sell at once
     
     Returns: Amount of gold received
-    Raises: ItemNotFoundError if item not in inventory
+    Raises:
+        ValueError if quantity is less than 1
+        ItemNotFoundError if item not in inventory
     """
-    if item_id not in character.get('inventory', []):
-        raise ItemNotFoundError()
+    if quantity < 1:
+        raise ValueError(f"Quantity must be at least 1, got {quantity}")
+    if txn is None:
+        with CharacterTransaction(character) as txn:
+            return sell_item(character, item_id, item_data, txn, quantity)
 
-    price = int(item_data.get('cost', 0)) // 2
-    remove_item_from_inventory(character, item_id)
-    character['gold'] = character.get('gold', 0) + price
-    return price
+    with txn.savepoint():
+        price = int(item_data.get('cost', 0)) // 2 * quantity
+        txn.remove_item(item_id, quantity)
+        txn['gold'] = txn.get('gold', 0) + price
+        return price
+
+class Shop:
+    """
+    Shop over an item catalog with indexed listings and stock limits
+    
+    Listings are built once: for each item type (and for all items) a
+    cost-sorted list of costs and a parallel list of item IDs. Price
+    range and "what can I afford" queries bisect the cost list, so they
+    cost O(log n) plus the size of the answer. Buying and selling
+    quantities is a single purchase_item/sell_item call, so gold, the
+    inventory and the stock change together or not at all.
+    
+    Stock is {item_id: units left}; items not in it are unlimited. Units
+    sold back to the shop return to a limited item's stock.
+    """
+    
+    def __init__(self, item_data_dict, stock=None):
+        """
+        Index a catalog
+        
+        Args:
+            item_data_dict: Dictionary of all item data
+            stock: Optional {item_id: units available}
+        """
+        self.item_data_dict = item_data_dict
+        self.stock = dict(stock) if stock else {}
+        # item type (None = all items) -> (costs, item IDs), sorted by cost
+        self.listings = {}
+        entries = sorted((int(item.get('cost', 0)), item_id, item.get('type'))
+                         for item_id, item in item_data_dict.items())
+        for cost, item_id, item_type in entries:
+            for key in (None, item_type):
+                costs, ids = self.listings.setdefault(key, ([], []))
+                costs.append(cost)
+                ids.append(item_id)
+    
+    def get_listing(self, item_type=None):
+        """
+        Get item IDs for sale, cheapest first
+        
+        Args:
+            item_type: 'weapon', 'armor', 'consumable' or None for everything
+        
+        Returns: List of item IDs
+        """
+        return list(self.listings.get(item_type, ((), ()))[1])
+    
+    def get_items_in_price_range(self, min_cost, max_cost, item_type=None):
+        """
+        Get item IDs whose cost is within [min_cost, max_cost], cheapest first
+        
+        Returns: List of item IDs
+        """
+        costs, ids = self.listings.get(item_type, ((), ()))
+        return ids[bisect_left(costs, min_cost):bisect_right(costs, max_cost)]
+    
+    def get_affordable(self, gold, item_type=None):
+        """
+        Get item IDs that cost at most gold, cheapest first
+        
+        Returns: List of item IDs
+        """
+        costs, ids = self.listings.get(item_type, ((), ()))
+        return ids[:bisect_right(costs, gold)]
+    
+    def count_affordable(self, gold, item_type=None):
+        """
+        Count the items that cost at most gold, in O(log n)
+        
+        Returns: Integer count
+        """
+        return bisect_right(self.listings.get(item_type, ((),))[0], gold)
+    
+    def get_stock(self, item_id):
+        """
+        Get units left of an item
+        
+        Returns: Integer, or None if unlimited
+        """
+        return self.stock.get(item_id)
+    
+    def buy(self, character, item_id, quantity=1, txn=None):
+        """
+        Buy quantity units of an item
+        
+        Args:
+            character: Character dictionary
+            item_id: Item to buy
+            quantity: Number of units
+            txn: Optional CharacterTransaction to stage the purchase in
+        
+        Returns: Total gold spent
+        Raises:
+            ValueError if quantity is less than 1
+            ItemNotFoundError if the shop does not sell the item
+            OutOfStockError if fewer than quantity units are left
+            InsufficientResourcesError if not enough gold
+            InventoryFullError if the units do not fit
+        """
+        if txn is None:
+            with CharacterTransaction(character) as txn:
+                return self.buy(character, item_id, quantity, txn)
+
+        with txn.savepoint():
+            if quantity < 1:
+                raise ValueError(f"Quantity must be at least 1, got {quantity}")
+            item = self.item_data_dict.get(item_id)
+            if item is None:
+                raise ItemNotFoundError()
+            left = self.stock.get(item_id)
+            if left is not None and left < quantity:
+                raise OutOfStockError()
+
+            purchase_item(character, item_id, item, txn, quantity)
+            if left is not None:
+                self.stock[item_id] = left - quantity
+                txn.on_rollback(lambda: self._restock(item_id, quantity))
+            return int(item.get('cost', 0)) * quantity
+    
+    def sell(self, character, item_id, quantity=1, txn=None):
+        """
+        Sell quantity units of an item back to the shop
+        
+        Returns: Total gold received
+        Raises: ItemNotFoundError if the character has fewer than quantity units
+                or the shop does not deal in the item
+        """
+        if txn is None:
+            with CharacterTransaction(character) as txn:
+                return self.sell(character, item_id, quantity, txn)
+
+        with txn.savepoint():
+            item = self.item_data_dict.get(item_id)
+            if item is None:
+                raise ItemNotFoundError()
+
+            price = sell_item(character, item_id, item, txn, quantity)
+            if item_id in self.stock:
+                self._restock(item_id, quantity)
+                txn.on_rollback(lambda: self._restock(item_id, -quantity))
+            return price
+    
+    def _restock(self, item_id, quantity):
+        """Adjust a limited item's stock"""
+        self.stock[item_id] += quantity
 
 # ============================================================================
 # HELPER FUNCTIONS
@@ -373,20 +1291,24 @@ def display_inventory(character, item_data_dict):
         character: Character dictionary
         item_data_dict: Dictionary of all item data
     
-    Shows item names, types, and quantities
+    Shows item names, types, and quantities, grouped by type
     """
     inv = character.get('inventory', [])
-    counts = {}
-    for it in inv:
-        counts[it] = counts.get(it, 0) + 1
+    if not isinstance(inv, Inventory):
+        inv = Inventory(inv)
+
+    inv.get_items_of_type(None, item_data_dict)  # binds the per-type views
 
     print(f"\nInventory for {character.get('name', 'Player')}:\n")
-    for item_id, qty in counts.items():
-        name = item_data_dict.get(item_id, {}).get('name', item_id)
-        typ = item_data_dict.get(item_id, {}).get('type', 'unknown')
-        print(f"- {name} (id:{item_id}) x{qty} [{typ}]")
-    if not counts:
+    for typ, item_ids in inv.views.items():
+        for item_id in item_ids:
+            name = item_data_dict.get(item_id, {}).get('name', item_id)
+            print(f"- {name} (id:{item_id}) x{inv.count(item_id)} [{typ or 'unknown'}]")
+    if not len(inv):
         print("(empty)")
+    capacity = get_inventory_capacity(character)
+    unit = "slots" if capacity.weights is None else "weight"
+    print(f"Capacity: {capacity.used}/{capacity.limit} {unit}")
     return True
 
 # ============================================================================
@@ -28,6 +28,19 @@ all_quests = {}
 all_items = {}
 game_running = False
 
+# Full-text search over quest titles/descriptions and item names/descriptions
+quest_search = None
+item_search = None
+
+# Shop over all_items, built when game data is loaded
+item_shop = None
+
+# Recycles enemy dictionaries between explore() battles
+enemy_pool = combat_system.EnemyPool()
+
+# Precomputed battle outcomes, used to skip trivial fights in explore()
+battle_predictor = combat_system.BattlePredictor(combat_system.PREDICTIONS_FILE)
+
 # ============================================================================
 # MAIN MENU
 # ============================================================================
@@ -116,6 +129,9 @@ def game_loop():
         print("No active character. Returning to main menu.")
         return
 
+    # count combat victories and item pickups toward quest objectives
+    quest_handler.get_quest_tracker(current_character, all_quests)
+
     game_running = True
     while game_running:
         choice = game_menu()
@@ -192,6 +208,48 @@ def view_inventory():
     import inventory_system
     inventory_system.display_inventory(current_character, all_items)
 
+    print("\n1) Use item\n2) Equip item\n3) Auto-heal\n4) Back")
+    try:
+        c = int(input("Choose: ").strip())
+    except Exception:
+        return
+
+    if c == 3:
+        used = inventory_system.auto_heal(current_character, all_items)
+        for item_id, quantity in used.items():
+            print(f"Used {quantity} x {all_items[item_id].get('name', item_id)}")
+        if not used:
+            print("Nothing to heal with")
+        print(f"Health: {current_character['health']}/{current_character['max_health']}")
+        return
+    if c == 1:
+        choices = inventory_system.get_items_of_type(current_character, 'consumable', all_items)
+    elif c == 2:
+        choices = (inventory_system.get_items_of_type(current_character, 'weapon', all_items)
+                   + inventory_system.get_items_of_type(current_character, 'armor', all_items))
+    else:
+        return
+    if not choices:
+        print("(nothing)")
+        return
+    for n, item_id in enumerate(choices, 1):
+        print(f"{n}) {all_items[item_id].get('name', item_id)}")
+    try:
+        n = int(input("Item number: ").strip())
+    except Exception:
+        return
+    if not 1 <= n <= len(choices):
+        return
+    item_id = choices[n - 1]
+
+    try:
+        if c == 1:
+            print(inventory_system.use_item(current_character, item_id, all_items[item_id]))
+        else:
+            print(inventory_system.equip_item(current_character, item_id, all_items[item_id]))
+    except Exception as e:
+        print(f"Could not use item: {e}")
+
 def quest_menu():
     """Quest management menu"""
     global current_character, all_quests
@@ -200,7 +258,7 @@ def quest_menu():
         return
 
     import quest_handler
-    print("\nQuest Menu:\n1) Active\n2) Available\n3) Completed\n4) Accept\n5) Abandon\n6) Complete\n7) Back")
+    print("\nQuest Menu:\n1) Active\n2) Available\n3) Completed\n4) Accept\n5) Abandon\n6) Complete\n7) Search\n8) Back")
     try:
         c = int(input("Choose: ").strip())
     except Exception:
@@ -209,6 +267,10 @@ def quest_menu():
     if c == 1:
         active = quest_handler.get_active_quests(current_character, all_quests)
         quest_handler.display_quest_list(active)
+        tracker = quest_handler.get_quest_tracker(current_character, all_quests)
+        for q in active:
+            for event_type, target, count, required in tracker.get_progress(q['quest_id']):
+                print(f"    {q.get('title')}: {event_type} {target} {count}/{required}")
     elif c == 2:
         avail = quest_handler.get_available_quests(current_character, all_quests)
         quest_handler.display_quest_list(avail)
@@ -216,7 +278,9 @@ def quest_menu():
         comp = quest_handler.get_completed_quests(current_character, all_quests)
         quest_handler.display_quest_list(comp)
     elif c == 4:
-        qid = input("Quest ID to accept: ").strip()
+        qid = find_quest_id(input("Quest ID or title to accept: ").strip())
+        if qid is None:
+            return
         try:
             quest_handler.accept_quest(current_character, qid, all_quests)
             print("Quest accepted")
@@ -236,12 +300,19 @@ def quest_menu():
             print("Quest completed")
         except Exception as e:
             print(f"Could not complete quest: {e}")
+    elif c == 7:
+        query = input("Search quests: ").strip()
+        results = quest_search.search(query) if quest_search else []
+        if not results:
+            print("No matching quests")
+        for qid, _ in results:
+            print(f"- {all_quests[qid].get('title', qid)} (id:{qid})")
     else:
         return
 
 def explore():
     """Find and fight random enemies"""
-    global current_character
+    global current_character, all_items
     
     global current_character
     if not current_character:
@@ -250,10 +321,28 @@ def explore():
 
     import combat_system
     try:
-        enemy = combat_system.get_random_enemy_for_level(current_character.get('level', 1))
-        battle = combat_system.SimpleBattle(current_character, enemy)
-        result = battle.start_battle()
-        print(f"Battle ended: {result}")
+        enemy = combat_system.get_random_enemy_for_level(current_character.get('level', 1), enemy_pool)
+        try:
+            prediction = battle_predictor.predict(current_character, enemy['type'], simulate=False)
+            if prediction is None:
+                prediction = battle_predictor.estimate(current_character, enemy['type'])
+            if battle_predictor.is_trivial(current_character, prediction):
+                skip = input(f"A {enemy['name']} is no match for you. Skip the fight? (y/n): ").strip().lower()
+                if skip == 'y':
+                    result = combat_system.settle_battle(current_character, enemy, prediction)
+                    print(f"Battle ended: {result}")
+                    display_completed_quests(result)
+                    return
+
+            battle = combat_system.SimpleBattle(current_character, enemy, pool=enemy_pool,
+                                                strategy=combat_system.InteractiveStrategy(),
+                                                item_data_dict=all_items)
+            result = battle.start_battle()
+            print(f"Battle ended: {result}")
+            display_completed_quests(result)
+        finally:
+            # releasing twice is a no-op, and a live battle keeps its enemy parked
+            enemy_pool.release(enemy)
     except Exception as e:
         print(f"Combat error: {e}")
 
@@ -266,8 +355,47 @@ def shop():
         print("No character loaded")
         return
 
-    print("Shop is not implemented in demo.")
-    return
+    if item_shop is None:
+        print("The shop is closed.")
+        return
+
+    while True:
+        gold = current_character.get('gold', 0)
+        print(f"\nShop (gold: {gold}):\n1) Browse\n2) What can I afford?\n3) Buy\n4) Sell\n5) Back")
+        try:
+            c = int(input("Choose: ").strip())
+        except Exception:
+            return
+
+        if c == 1:
+            item_type = input("Type (weapon/armor/consumable, blank for all): ").strip() or None
+            display_shop_items(item_shop.get_listing(item_type))
+        elif c == 2:
+            display_shop_items(item_shop.get_affordable(gold))
+        elif c in (3, 4):
+            item_id = input("Item ID: ").strip()
+            try:
+                quantity = int(input("Quantity: ").strip() or 1)
+                if c == 3:
+                    spent = item_shop.buy(current_character, item_id, quantity)
+                    print(f"Bought {quantity} x {item_id} for {spent} gold")
+                else:
+                    earned = item_shop.sell(current_character, item_id, quantity)
+                    print(f"Sold {quantity} x {item_id} for {earned} gold")
+            except Exception as e:
+                print(f"Transaction failed: {e}")
+        else:
+            return
+
+def display_shop_items(item_ids):
+    """Print shop listings with cost and remaining stock"""
+    if not item_ids:
+        print("(nothing)")
+    for item_id in item_ids:
+        item = all_items[item_id]
+        stock = item_shop.get_stock(item_id)
+        left = "" if stock is None else f", {stock} left"
+        print(f"- {item.get('name', item_id)} (id:{item_id}) [{item.get('type')}] {item.get('cost')} gold{left}")
 
 # ============================================================================
 # HELPER FUNCTIONS
@@ -285,14 +413,54 @@ def save_game():
     except Exception:
         return False
 
+def display_completed_quests(battle_result):
+    """Announce quests a battle finished through their objectives"""
+    for qid in battle_result.get('quests_completed', []):
+        print(f"Quest completed: {all_quests.get(qid, {}).get('title', qid)}")
+
+def find_quest_id(text):
+    """
+    Resolve a quest ID or search words to a single quest ID
+    
+    Prints the candidates if the search is ambiguous.
+    
+    Returns: Quest ID, or None if nothing (or more than one quest) matched
+    """
+    if text in all_quests:
+        return text
+
+    results = quest_search.search(text) if quest_search else []
+    if len(results) == 1:
+        return results[0][0]
+    if not results:
+        print("No matching quests")
+        return None
+
+    print("Several quests match:")
+    for qid, _ in results:
+        print(f"- {all_quests[qid].get('title', qid)} (id:{qid})")
+    return None
+
 def load_game_data():
     """Load all quest and item data from files"""
-    global all_quests, all_items
+    global all_quests, all_items, quest_search, item_search, item_shop
     
     global all_quests, all_items
     try:
-        all_quests = game_data.load_quests()
-        all_items = game_data.load_items()
+        # parsed data and search indexes come from a cache when it is fresh
+        data = game_data.load_game_data()
+        all_quests = data['quests']
+        all_items = data['items']
+        quest_search = data['quest_search']
+        item_search = data['item_search']
+        item_shop = inventory_system.Shop(all_items)
+        # builds the quest graph and rejects missing or cyclic prerequisites
+        quest_handler.validate_quest_prerequisites(all_quests)
+        try:
+            battle_predictor.load()
+        except CorruptedDataError as e:
+            # explore() falls back to estimates without the table
+            print(f"Battle predictions unavailable: {e}")
     except Exception:
         # Let caller handle defaults
         raise
@@ -338,7 +506,7 @@ def main():
         print("Creating default game data...")
         game_data.create_default_data_files()
         load_game_data()
-    except InvalidDataFormatError as e:
+    except (InvalidDataFormatError, QuestNotFoundError, QuestDependencyCycleError) as e:
         print(f"Error loading game data: {e}")
         print("Please check data files for errors.")
         return
@@ -9,12 +9,18 @@ AI Usage: [Document any AI assistance used]
 This module handles quest management, dependencies, and completion.
 """
 
+import heapq
+import math
+from bisect import bisect_left, bisect_right
+from collections import deque
 from custom_exceptions import (
     QuestNotFoundError,
     QuestRequirementsNotMetError,
     QuestAlreadyCompletedError,
     QuestNotActiveError,
-    InsufficientLevelError
+    QuestDependencyCycleError,
+    InsufficientLevelError,
+    CharacterDeadError
 )
 
 # ============================================================================
@@ -67,6 +73,9 @@ def accept_quest(character, quest_id, quest_data_dict):
         return True
 
     character.setdefault('active_quests', []).append(quest_id)
+    _notify_index(character, 'quest_accepted', quest_id)
+    if quest.get('objective') and _get_attached(character, 'quest_tracker') is None:
+        get_quest_tracker(character, quest_data_dict)
     return True
 
 def complete_quest(character, quest_id, quest_data_dict):
@@ -86,6 +95,7 @@ def complete_quest(character, quest_id, quest_data_dict):
     Raises:
         QuestNotFoundError if quest_id not in quest_data_dict
         QuestNotActiveError if quest not in active_quests
+        QuestRequirementsNotMetError if the quest's objectives are unfinished
     """
     if quest_id not in quest_data_dict:
         raise QuestNotFoundError()
@@ -94,12 +104,15 @@ def complete_quest(character, quest_id, quest_data_dict):
         raise QuestNotActiveError()
 
     quest = quest_data_dict[quest_id]
+    _check_objectives(character, quest_id, quest_data_dict)
     xp = int(quest.get('reward_xp', 0))
     gold = int(quest.get('reward_gold', 0))
 
     # remove from active, add to completed
     character['active_quests'].remove(quest_id)
     character.setdefault('completed_quests', []).append(quest_id)
+    _notify_index(character, 'quest_completed', quest_id)
+    _record_quest_rewards(character, xp, gold)
 
     # grant rewards
     from character_manager import gain_experience, add_gold
@@ -108,6 +121,20 @@ def complete_quest(character, quest_id, quest_data_dict):
 
     return {'xp': xp, 'gold': gold}
 
+def _check_objectives(character, quest_id, quest_data_dict):
+    """
+    Make sure an active quest with objectives has finished them
+    
+    Raises: QuestRequirementsNotMetError listing the unfinished objectives
+    """
+    if not quest_data_dict[quest_id].get('objective'):
+        return
+    remaining = get_quest_tracker(character, quest_data_dict).get_remaining(quest_id)
+    if remaining:
+        raise QuestRequirementsNotMetError(
+            "Objectives not finished: " + ", ".join(f"{event_type} {target} x{left}"
+                                                   for event_type, target, left in remaining))
+
 def abandon_quest(character, quest_id):
     """
     Remove a quest from active quests without completing it
@@ -119,6 +146,7 @@ def abandon_quest(character, quest_id):
         raise QuestNotActiveError()
 
     character['active_quests'].remove(quest_id)
+    _notify_index(character, 'quest_abandoned', quest_id)
     return True
 
 def get_active_quests(character, quest_data_dict):
@@ -151,23 +179,487 @@ def get_available_quests(character, quest_data_dict):
     
     Available = meets level req + prerequisite done + not completed + not active
     
+    Uses the character's QuestAvailabilityIndex (created on first call),
+    so after the first call this costs O(number of available quests).
+    
     Returns: List of quest dictionaries
     """
-    res = []
-    for qid, q in quest_data_dict.items():
-        if qid in character.get('completed_quests', []) or qid in character.get('active_quests', []):
+    index = get_quest_availability_index(character, quest_data_dict)
+    return [quest_data_dict[qid] for qid in index.get_available_ids()]
+
+# ============================================================================
+# BATCH QUEST OPERATIONS
+# ============================================================================
+
+def accept_quest_batch(characters, quest_id, quest_data_dict):
+    """
+    Accept one quest for many characters
+    
+    The quest is looked up and its requirements parsed once; each
+    character is then checked exactly like accept_quest.
+    
+    Args:
+        characters: List of character dictionaries
+        quest_id: Quest to accept
+        quest_data_dict: Dictionary of all quest data
+    
+    Returns: List with one entry per character: True if accepted (or already
+             active), otherwise the exception accept_quest would have raised
+    Raises: QuestNotFoundError if quest_id not in quest_data_dict
+    """
+    if quest_id not in quest_data_dict:
+        raise QuestNotFoundError()
+
+    quest = quest_data_dict[quest_id]
+    req_level = int(quest.get('required_level', 1))
+    prereq = quest.get('prerequisite', 'NONE')
+    if not prereq or prereq == 'NONE':
+        prereq = None
+
+    tracked = bool(quest.get('objective'))
+
+    results = []
+    for character in characters:
+        if character.get('level', 1) < req_level:
+            results.append(InsufficientLevelError())
             continue
 
-        # level and prereq
-        if character.get('level', 1) < int(q.get('required_level', 1)):
+        completed = character.get('completed_quests', ())
+        if quest_id in completed:
+            results.append(QuestAlreadyCompletedError())
+            continue
+        if prereq is not None and prereq not in completed:
+            results.append(QuestRequirementsNotMetError())
             continue
 
-        prereq = q.get('prerequisite', 'NONE')
-        if prereq != 'NONE' and prereq not in character.get('completed_quests', []):
+        active = character.setdefault('active_quests', [])
+        if quest_id not in active:
+            active.append(quest_id)
+            _notify_index(character, 'quest_accepted', quest_id)
+            if tracked and _get_attached(character, 'quest_tracker') is None:
+                get_quest_tracker(character, quest_data_dict)
+        results.append(True)
+
+    return results
+
+def complete_quest_batch(characters, quest_id, quest_data_dict):
+    """
+    Complete one quest for many characters and grant rewards in bulk
+    
+    Rewards are parsed once. Experience that does not reach the next
+    level is added directly; only characters that level up go through
+    gain_experience. Dead characters are skipped before their quest
+    state changes.
+    
+    Args:
+        characters: List of character dictionaries
+        quest_id: Quest to complete
+        quest_data_dict: Dictionary of all quest data
+    
+    Returns: List with one entry per character: {'xp': int, 'gold': int}
+             if completed, otherwise the exception that was raised for it
+             (QuestNotActiveError, CharacterDeadError or
+             QuestRequirementsNotMetError)
+    Raises: QuestNotFoundError if quest_id not in quest_data_dict
+    """
+    from character_manager import gain_experience, get_level_up_xp, add_gold
+
+    if quest_id not in quest_data_dict:
+        raise QuestNotFoundError()
+
+    quest = quest_data_dict[quest_id]
+    xp = int(quest.get('reward_xp', 0))
+    gold = int(quest.get('reward_gold', 0))
+
+    results = []
+    for character in characters:
+        active = character.get('active_quests', ())
+        if quest_id not in active:
+            results.append(QuestNotActiveError())
+            continue
+        if character['health'] <= 0:
+            results.append(CharacterDeadError())
+            continue
+        try:
+            _check_objectives(character, quest_id, quest_data_dict)
+        except QuestRequirementsNotMetError as e:
+            results.append(e)
             continue
 
-        res.append(q)
-    return res
+        active.remove(quest_id)
+        character.setdefault('completed_quests', []).append(quest_id)
+        _notify_index(character, 'quest_completed', quest_id)
+        _record_quest_rewards(character, xp, gold)
+
+        experience = character['experience'] + xp
+        if experience < get_level_up_xp(character['level']):
+            character['experience'] = experience
+        else:
+            gain_experience(character, xp)
+        add_gold(character, gold)
+        results.append({'xp': xp, 'gold': gold})
+
+    return results
+
+# ============================================================================
+# AVAILABILITY INDEX
+# ============================================================================
+
+class QuestAvailabilityIndex:
+    """
+    Incrementally maintained set of quests a character can accept
+    
+    Quests whose prerequisite is done but whose level is too high wait in
+    per-level buckets. Completing a quest only looks at its dependents,
+    and levelling up only empties the buckets that were reached, so the
+    index never rescans the whole catalog after it is built.
+    
+    accept_quest, complete_quest, abandon_quest and gain_experience keep
+    it up to date. If the quest lists are edited directly, the index
+    notices the changed sizes and rebuilds itself.
+    """
+    
+    def __init__(self, character, quest_data_dict):
+        """Build the index for a character against a quest catalog"""
+        self.character = character
+        self.quest_data_dict = quest_data_dict
+        self.levels, self.prerequisites, self.dependents = get_catalog_index(
+            quest_data_dict, 'availability', _build_availability_catalog)
+        self.rebuild()
+    
+    def rebuild(self):
+        """Recompute availability from scratch (O(number of quests))"""
+        character = self.character
+        completed = set(character.get('completed_quests', []))
+        active = set(character.get('active_quests', []))
+        self.level = character.get('level', 1)
+        # used as ordered sets
+        self.available = {}
+        self.waiting = {}
+
+        for qid, required in self.levels.items():
+            if qid in completed or qid in active:
+                continue
+            prereq = self.prerequisites[qid]
+            if prereq is not None and prereq not in completed:
+                continue
+            if self.level >= required:
+                self.available[qid] = True
+            else:
+                self.waiting.setdefault(required, {})[qid] = True
+
+        self.synced = self._get_sync_state()
+    
+    def get_available_ids(self):
+        """
+        Get IDs of quests the character can accept right now
+        
+        Returns: List of quest IDs
+        """
+        self.refresh()
+        return list(self.available)
+    
+    def refresh(self):
+        """Catch up with changes made without going through quest_handler"""
+        state = self._get_sync_state()
+        if state == self.synced:
+            return
+        if state[0] != self.synced[0] or state[1] != self.synced[1] or state[2] < self.level:
+            self.rebuild()
+        else:
+            self.level_changed(state[2])
+    
+    def quest_accepted(self, quest_id):
+        """Remove a newly accepted quest"""
+        if self._apply_change(0, 1):
+            self.available.pop(quest_id, None)
+    
+    def quest_abandoned(self, quest_id):
+        """Make an abandoned quest available again"""
+        if self._apply_change(0, -1) and quest_id in self.levels:
+            self.available[quest_id] = True
+    
+    def quest_completed(self, quest_id):
+        """Unlock the dependents of a completed quest"""
+        if not self._apply_change(1, -1):
+            return
+        completed = self.character.get('completed_quests', [])
+        active = self.character.get('active_quests', [])
+        for dep in self.dependents.get(quest_id, ()):
+            if dep in completed or dep in active:
+                continue
+            required = self.levels[dep]
+            if self.level >= required:
+                self.available[dep] = True
+            else:
+                self.waiting.setdefault(required, {})[dep] = True
+    
+    def level_changed(self, new_level):
+        """Release the quests in every level bucket the character has reached"""
+        if new_level < self.level:
+            self.rebuild()
+            return
+        self.level = new_level
+        for required in [lvl for lvl in self.waiting if lvl <= new_level]:
+            self.available.update(self.waiting.pop(required))
+        self.synced = self._get_sync_state()
+    
+    def _apply_change(self, completed_delta, active_delta):
+        """
+        Check that the quest lists changed only by the expected amounts
+        
+        Returns: True if the caller should apply its update, False if the
+                 lists were also edited elsewhere and the index was rebuilt
+        """
+        state = self._get_sync_state()
+        if state[0] - completed_delta != self.synced[0] \
+                or state[1] - active_delta != self.synced[1] or state[2] < self.level:
+            self.rebuild()
+            return False
+        self.synced = state
+        if state[2] != self.level:
+            self.level_changed(state[2])
+        return True
+    
+    def _get_sync_state(self):
+        """Sizes of the quest lists and the level, for spotting outside edits"""
+        character = self.character
+        return (len(character.get('completed_quests', [])),
+                len(character.get('active_quests', [])),
+                character.get('level', 1))
+
+def _build_availability_catalog(quest_data_dict):
+    """
+    Precompute per-catalog data for availability indexes
+    
+    Returns: Tuple of ({quest_id: required_level},
+                       {quest_id: prerequisite or None},
+                       {prerequisite: [dependent quest IDs]})
+    """
+    levels = {}
+    prerequisites = {}
+    dependents = {}
+    for qid, q in quest_data_dict.items():
+        levels[qid] = int(q.get('required_level', 1))
+        prereq = q.get('prerequisite', 'NONE')
+        if not prereq or prereq == 'NONE':
+            prereq = None
+        else:
+            dependents.setdefault(prereq, []).append(qid)
+        prerequisites[qid] = prereq
+    return levels, prerequisites, dependents
+
+def get_quest_availability_index(character, quest_data_dict):
+    """
+    Get the character's availability index, creating it if needed
+    
+    The index is stored on the character under 'quest_index' (it is not
+    written to save files) and rebuilt if the catalog changes or it
+    belongs to another character (a copied character dictionary).
+    
+    Returns: QuestAvailabilityIndex
+    """
+    index = _get_attached(character, 'quest_index')
+    if index is None or index.quest_data_dict is not quest_data_dict \
+            or index.levels is not get_catalog_index(quest_data_dict, 'availability',
+                                                      _build_availability_catalog)[0]:
+        index = QuestAvailabilityIndex(character, quest_data_dict)
+        character['quest_index'] = index
+    return index
+
+def _notify_index(character, event, quest_id):
+    """Forward a quest state change to the character's availability index and objective tracker"""
+    index = _get_attached(character, 'quest_index')
+    if index is not None:
+        getattr(index, event)(quest_id)
+    tracker = _get_attached(character, 'quest_tracker')
+    if tracker is not None:
+        getattr(tracker, event)(quest_id)
+
+def _get_attached(character, key):
+    """
+    Get a helper object stored on the character, if it was built for it
+    
+    Copying a character dictionary copies references to its helpers;
+    the copy must not read or update the original's.
+    
+    Returns: The object, or None if missing or owned by another character
+    """
+    helper = character.get(key)
+    if helper is None or helper.character is not character:
+        return None
+    return helper
+
+# ============================================================================
+# OBJECTIVE TRACKING
+# ============================================================================
+
+class QuestTracker:
+    """
+    Counts objective progress for a character's active quests
+    
+    Quests with an OBJECTIVE field (see game_data.parse_objectives)
+    subscribe each unfinished objective under its (event type, target)
+    key. An event only looks up its own key and the key's "*" wildcard,
+    so it touches just the quests waiting for it. A quest is completed
+    automatically (with rewards) once all of its counters are full.
+    
+    Counters are stored in character['quest_progress'] as
+    {quest_id: [count per objective]} and are saved with the character.
+    The tracker itself is stored under 'quest_tracker' and is kept up to
+    date by accept_quest, complete_quest and abandon_quest. Combat
+    victories publish 'defeat' events and inventory pickups publish
+    'collect' events.
+    """
+    
+    def __init__(self, character, quest_data_dict):
+        """Subscribe the character's active quests against a quest catalog"""
+        self.character = character
+        self.quest_data_dict = quest_data_dict
+        self.objectives = get_catalog_index(quest_data_dict, 'objectives', _build_objective_catalog)
+        self.rebuild()
+    
+    def rebuild(self):
+        """Resubscribe every active quest (use after editing quest lists directly)"""
+        self.subscriptions = {}
+        progress = self.character.setdefault('quest_progress', {})
+        active = self.character.get('active_quests', [])
+        for qid in [qid for qid in progress if qid not in active]:
+            del progress[qid]
+        for qid in active:
+            self.subscribe(qid)
+    
+    def subscribe(self, quest_id):
+        """Register the unfinished objectives of an active quest"""
+        objectives = self.objectives.get(quest_id)
+        if not objectives:
+            return
+        progress = self.character.setdefault('quest_progress', {})
+        counts = progress.get(quest_id)
+        if counts is None or len(counts) != len(objectives):
+            counts = progress[quest_id] = [0] * len(objectives)
+        for position, (event_type, target, required) in enumerate(objectives):
+            if counts[position] < required:
+                self.subscriptions.setdefault((event_type, target), {}) \
+                    .setdefault(quest_id, []).append(position)
+    
+    def unsubscribe(self, quest_id):
+        """Remove a quest's subscriptions and progress"""
+        for event_type, target, _ in self.objectives.get(quest_id, ()):
+            subscribers = self.subscriptions.get((event_type, target))
+            if subscribers is not None:
+                subscribers.pop(quest_id, None)
+                if not subscribers:
+                    del self.subscriptions[(event_type, target)]
+        self.character.get('quest_progress', {}).pop(quest_id, None)
+    
+    def quest_accepted(self, quest_id):
+        self.subscribe(quest_id)
+    
+    def quest_completed(self, quest_id):
+        self.unsubscribe(quest_id)
+    
+    def quest_abandoned(self, quest_id):
+        self.unsubscribe(quest_id)
+    
+    def publish(self, event_type, target, amount=1):
+        """
+        Count an event toward every quest subscribed to it
+        
+        Args:
+            event_type: 'defeat' or 'collect'
+            target: Enemy type or item ID
+            amount: How many times the event happened
+        
+        Returns: List of (quest_id, rewards) for quests this event completed
+        """
+        progress = self.character.get('quest_progress', {})
+        finished = []
+        for key in ((event_type, target), (event_type, '*')):
+            subscribers = self.subscriptions.get(key)
+            if not subscribers:
+                continue
+            for qid, positions in list(subscribers.items()):
+                counts = progress.get(qid)
+                if counts is None:
+                    # quest was dropped without going through quest_handler
+                    del subscribers[qid]
+                    continue
+                objectives = self.objectives[qid]
+                for position in list(positions):
+                    required = objectives[position][2]
+                    counts[position] = min(required, counts[position] + amount)
+                    if counts[position] >= required:
+                        positions.remove(position)
+                if not positions:
+                    del subscribers[qid]
+                    if all(count >= objective[2] for count, objective in zip(counts, objectives)):
+                        finished.append(qid)
+            if not subscribers:
+                del self.subscriptions[key]
+
+        completed = []
+        for qid in finished:
+            if qid in self.character.get('active_quests', []):
+                completed.append((qid, complete_quest(self.character, qid, self.quest_data_dict)))
+        return completed
+    
+    def get_remaining(self, quest_id):
+        """
+        Get a quest's unfinished objectives
+        
+        Returns: List of (event_type, target, count still needed) tuples
+        """
+        return [(event_type, target, required - count)
+                for event_type, target, count, required in self.get_progress(quest_id)
+                if count < required]
+    
+    def get_progress(self, quest_id):
+        """
+        Get a quest's objective progress
+        
+        Returns: List of (event_type, target, count, required) tuples
+        """
+        counts = self.character.get('quest_progress', {}).get(quest_id, ())
+        return [(event_type, target, count, required)
+                for (event_type, target, required), count in zip(self.objectives.get(quest_id, ()), counts)]
+
+def _build_objective_catalog(quest_data_dict):
+    """
+    Parse the objectives of every quest that has them
+    
+    Returns: {quest_id: [(event_type, target, count), ...]}
+    """
+    from game_data import parse_objectives
+
+    return {qid: parse_objectives(q['objective'])
+            for qid, q in quest_data_dict.items() if q.get('objective')}
+
+def get_quest_tracker(character, quest_data_dict):
+    """
+    Get the character's objective tracker, creating it if needed
+    
+    Like the availability index it is rebuilt if the catalog changes or
+    it belongs to another character.
+    
+    Returns: QuestTracker
+    """
+    tracker = _get_attached(character, 'quest_tracker')
+    if tracker is None or tracker.quest_data_dict is not quest_data_dict:
+        tracker = QuestTracker(character, quest_data_dict)
+        character['quest_tracker'] = tracker
+    return tracker
+
+def publish_quest_event(character, event_type, target, amount=1):
+    """
+    Report a game event to the character's objective tracker, if it has one
+    
+    Returns: List of (quest_id, rewards) for quests the event completed
+    """
+    tracker = _get_attached(character, 'quest_tracker')
+    if tracker is None:
+        return []
+    return tracker.publish(event_type, target, amount)
 
 # ============================================================================
 # QUEST TRACKING
@@ -220,23 +712,170 @@ def get_quest_prerequisite_chain(quest_id, quest_data_dict):
     Example: If Quest C requires Quest B, which requires Quest A:
              Returns ["quest_a", "quest_b", "quest_c"]
     
-    Raises: QuestNotFoundError if quest doesn't exist
+    Raises:
+        QuestNotFoundError if quest (or one of its prerequisites) doesn't exist
+        QuestDependencyCycleError if the quest data has a prerequisite cycle
     """
     if quest_id not in quest_data_dict:
         raise QuestNotFoundError()
 
-    chain = []
-    current = quest_id
-    while True:
-        if current not in quest_data_dict:
+    return get_quest_graph(quest_data_dict).get_chain(quest_id)
+
+# ============================================================================
+# QUEST GRAPH
+# ============================================================================
+
+class QuestGraph:
+    """
+    Prerequisite graph for a quest catalog
+    
+    Built once per catalog. Keeps each quest's prerequisite (forward
+    edges) and the quests that require it (reverse edges), a topological
+    order, and each quest's depth. Prerequisite cycles are rejected when
+    the graph is built, and prerequisite chains are memoized.
+    """
+    
+    def __init__(self, quest_data_dict):
+        """
+        Build the graph from a dictionary of quest data
+        
+        Raises: QuestDependencyCycleError if prerequisites form a cycle
+        """
+        self.prerequisite = {}
+        self.dependents = {}
+        # quests whose prerequisite is not in the catalog
+        self.missing = {}
+        self.chains = {}
+
+        for qid, quest in quest_data_dict.items():
+            prereq = quest.get('prerequisite', 'NONE')
+            if not prereq or prereq == 'NONE':
+                prereq = None
+            elif prereq not in quest_data_dict:
+                self.missing[qid] = prereq
+                prereq = None
+            self.prerequisite[qid] = prereq
+            self.dependents.setdefault(qid, [])
+            if prereq is not None:
+                self.dependents.setdefault(prereq, []).append(qid)
+
+        # Kahn's algorithm: every quest has at most one prerequisite, so a
+        # quest is ready as soon as its prerequisite has been ordered
+        self.order = []
+        self.depth = {}
+        ready = deque(qid for qid, prereq in self.prerequisite.items() if prereq is None)
+        while ready:
+            qid = ready.popleft()
+            prereq = self.prerequisite[qid]
+            self.depth[qid] = 0 if prereq is None else self.depth[prereq] + 1
+            self.order.append(qid)
+            ready.extend(self.dependents[qid])
+
+        if len(self.order) != len(self.prerequisite):
+            raise QuestDependencyCycleError(f"Prerequisite cycle: {' -> '.join(self.find_cycle())}")
+    
+    def find_cycle(self):
+        """
+        Find one prerequisite cycle among quests left out of the topological order
+        
+        Returns: List of quest IDs forming the cycle (first ID repeated at the end)
+        """
+        ordered = set(self.order)
+        start = next(qid for qid in self.prerequisite if qid not in ordered)
+        seen = {}
+        path = []
+        current = start
+        while current not in seen:
+            seen[current] = len(path)
+            path.append(current)
+            current = self.prerequisite[current]
+        cycle = path[seen[current]:]
+        return cycle + [cycle[0]]
+    
+    def get_chain(self, quest_id):
+        """
+        Get the prerequisite chain for a quest
+        
+        Walks up only until it reaches a quest whose chain is already
+        memoized, so a query costs O(depth) the first time and O(1) after
+        (plus copying the result).
+        
+        Returns: List of quest IDs in order [earliest_prereq, ..., quest_id]
+        Raises: QuestNotFoundError if the quest or a prerequisite doesn't exist
+        """
+        if quest_id not in self.prerequisite:
             raise QuestNotFoundError()
-        chain.insert(0, current)
-        prereq = quest_data_dict[current].get('prerequisite', 'NONE')
-        if not prereq or prereq == 'NONE':
-            break
-        current = prereq
 
-    return chain
+        path = []
+        current = quest_id
+        base = ()
+        while current is not None:
+            if current in self.chains:
+                base = self.chains[current]
+                break
+            if current in self.missing:
+                raise QuestNotFoundError()
+            path.append(current)
+            current = self.prerequisite[current]
+
+        path.reverse()
+        chain = base + tuple(path)
+        self.chains[quest_id] = chain
+        return list(chain)
+    
+    def get_dependents(self, quest_id):
+        """
+        Get the quests that list quest_id as their prerequisite
+        
+        Returns: List of quest IDs
+        """
+        return self.dependents.get(quest_id, [])
+
+# Indexes built per quest catalog, keyed by id(catalog).
+# Each entry is (catalog, size when built, {index_name: index}).
+_catalog_indexes = {}
+_MAX_CACHED_CATALOGS = 32
+
+def get_catalog_index(quest_data_dict, name, builder):
+    """
+    Get an index for a quest catalog, building it on first use
+    
+    Catalogs are treated as read-only once loaded: an index is rebuilt
+    automatically if quests are added or removed, but after editing
+    quests in place call invalidate_catalog_indexes.
+    
+    Args:
+        quest_data_dict: Dictionary of all quest data
+        name: Name of the index
+        builder: Function that builds the index from quest_data_dict
+    
+    Returns: The index
+    """
+    entry = _catalog_indexes.get(id(quest_data_dict))
+    if entry is None or entry[0] is not quest_data_dict or entry[1] != len(quest_data_dict):
+        if len(_catalog_indexes) >= _MAX_CACHED_CATALOGS:
+            _catalog_indexes.clear()
+        entry = (quest_data_dict, len(quest_data_dict), {})
+        _catalog_indexes[id(quest_data_dict)] = entry
+
+    index = entry[2].get(name)
+    if index is None:
+        index = builder(quest_data_dict)
+        entry[2][name] = index
+    return index
+
+def invalidate_catalog_indexes(quest_data_dict):
+    """Drop every cached index for a quest catalog"""
+    _catalog_indexes.pop(id(quest_data_dict), None)
+
+def get_quest_graph(quest_data_dict):
+    """
+    Get the QuestGraph for a quest catalog (built once and cached)
+    
+    Returns: QuestGraph
+    Raises: QuestDependencyCycleError if prerequisites form a cycle
+    """
+    return get_catalog_index(quest_data_dict, 'graph', QuestGraph)
 
 # ============================================================================
 # QUEST STATISTICS
@@ -256,29 +895,348 @@ def get_total_quest_rewards_earned(character, quest_data_dict):
     """
     Calculate total XP and gold earned from completed quests
     
+    Reads the running totals kept by complete_quest.
+    
     Returns: Dictionary with 'total_xp' and 'total_gold'
     """
+    totals = get_quest_totals(character, quest_data_dict)
+    return {'total_xp': totals['xp'], 'total_gold': totals['gold']}
+
+def get_quest_totals(character, quest_data_dict):
+    """
+    Get the character's running quest reward totals
+    
+    The totals are stored under 'quest_totals' as {'completed', 'xp',
+    'gold'}. They are recomputed when missing (old saves) or when the
+    completed count no longer matches 'completed_quests' (direct edits).
+    
+    Returns: Totals dictionary
+    """
+    totals = character.get('quest_totals')
+    if totals is None or totals['completed'] != len(character.get('completed_quests', [])):
+        totals = recompute_quest_totals(character, quest_data_dict)
+    return totals
+
+def recompute_quest_totals(character, quest_data_dict):
+    """
+    Rebuild the running reward totals from the completed quest list
+    
+    Quests that are no longer in the catalog count as completed but add
+    no rewards.
+    
+    Returns: The new totals dictionary (also stored on the character)
+    """
+    completed = character.get('completed_quests', [])
     total_xp = 0
     total_gold = 0
-    for qid in character.get('completed_quests', []):
+    for qid in completed:
         q = quest_data_dict.get(qid)
         if q:
             total_xp += int(q.get('reward_xp', 0))
             total_gold += int(q.get('reward_gold', 0))
-    return {'total_xp': total_xp, 'total_gold': total_gold}
+    totals = {'completed': len(completed), 'xp': total_xp, 'gold': total_gold}
+    character['quest_totals'] = totals
+    return totals
+
+def verify_quest_totals(character, quest_data_dict):
+    """
+    Check the stored totals against a full recompute and repair them
+    
+    Use when migrating or loading saves whose totals may be stale.
+    
+    Returns: True if the stored totals were correct, False if they were
+             missing or wrong (they are replaced either way)
+    """
+    stored = character.get('quest_totals')
+    return stored == recompute_quest_totals(character, quest_data_dict)
+
+def _record_quest_rewards(character, xp, gold):
+    """Add one completed quest's rewards to the running totals, if kept"""
+    totals = character.get('quest_totals')
+    if totals is not None:
+        if totals['completed'] + 1 != len(character['completed_quests']):
+            # list was edited elsewhere; get_quest_totals will recompute
+            del character['quest_totals']
+            return
+        totals['completed'] += 1
+        totals['xp'] += xp
+        totals['gold'] += gold
 
 def get_quests_by_level(quest_data_dict, min_level, max_level):
     """
     Get all quests within a level range
     
+    Uses the catalog's QuestLevelIndex: O(log n + k) per query.
+    
+    Returns: List of quest dictionaries, ordered by required level
+    """
+    index = get_catalog_index(quest_data_dict, 'levels', QuestLevelIndex)
+    return [quest_data_dict[qid] for qid in index.level_range(min_level, max_level)]
+
+def find_quests(quest_data_dict, min_level=None, max_level=None, min_xp=None, min_gold=None):
+    """
+    Find quests matching a level range and minimum rewards
+    
+    Any filter left as None is ignored.
+    
+    Args:
+        quest_data_dict: Dictionary of all quest data
+        min_level, max_level: Inclusive required level range
+        min_xp: Minimum reward_xp
+        min_gold: Minimum reward_gold
+    
     Returns: List of quest dictionaries
     """
-    res = []
-    for q in quest_data_dict.values():
-        lvl = int(q.get('required_level', 1))
-        if min_level <= lvl <= max_level:
-            res.append(q)
-    return res
+    index = get_catalog_index(quest_data_dict, 'levels', QuestLevelIndex)
+    return [quest_data_dict[qid] for qid in index.find(min_level, max_level, min_xp, min_gold)]
+
+class QuestLevelIndex:
+    """
+    Sorted views of a quest catalog for range queries
+    
+    Quests are kept in three sorted orders: by required level, by
+    reward_xp and by reward_gold, each as parallel key/ID lists for
+    bisect. A compound query bisects every filtered order, walks the
+    narrowest slice and checks the other conditions on the way, so it
+    never scans quests outside that slice. Numeric fields are converted
+    once when the index is built.
+    """
+    
+    def __init__(self, quest_data_dict):
+        """Build the sorted orders from a quest catalog"""
+        self.stats = {}
+        for qid, q in quest_data_dict.items():
+            self.stats[qid] = (int(q.get('required_level', 1)),
+                               int(q.get('reward_xp', 0)),
+                               int(q.get('reward_gold', 0)))
+
+        # one (keys, quest_ids) pair per stat, in stats tuple order
+        self.orders = []
+        for field in range(3):
+            entries = sorted((stat[field], qid) for qid, stat in self.stats.items())
+            self.orders.append(([key for key, _ in entries], [qid for _, qid in entries]))
+    
+    def level_range(self, min_level, max_level):
+        """
+        Get quest IDs whose required level is within [min_level, max_level]
+        
+        Returns: List of quest IDs, ordered by level
+        """
+        keys, ids = self.orders[0]
+        return ids[bisect_left(keys, min_level):bisect_right(keys, max_level)]
+    
+    def find(self, min_level=None, max_level=None, min_xp=None, min_gold=None):
+        """
+        Get quest IDs matching every given filter
+        
+        Returns: List of quest IDs, in the order of the narrowest filter
+        """
+        bounds = [(min_level, max_level), (min_xp, None), (min_gold, None)]
+        best = None
+        for field, (low, high) in enumerate(bounds):
+            if low is None and high is None:
+                continue
+            keys = self.orders[field][0]
+            start = 0 if low is None else bisect_left(keys, low)
+            stop = len(keys) if high is None else bisect_right(keys, high)
+            if best is None or stop - start < best[2] - best[1]:
+                best = (field, start, stop)
+
+        if best is None:
+            return list(self.orders[0][1])
+
+        field, start, stop = best
+        result = []
+        for qid in self.orders[field][1][start:stop]:
+            stat = self.stats[qid]
+            if all((low is None or stat[f] >= low) and (high is None or stat[f] <= high)
+                   for f, (low, high) in enumerate(bounds) if f != field):
+                result.append(qid)
+        return result
+
+# ============================================================================
+# ROUTE PLANNING
+# ============================================================================
+
+def plan_quest_route(character, quest_data_dict, target_level, max_nodes=5000, branch_limit=8):
+    """
+    Find a quest order that reaches target_level in as few quests as possible
+    
+    Runs A* over sets of completed quests. Each step completes one quest
+    whose prerequisite is done and whose required level has been reached;
+    XP is applied with the same level-up curve as gain_experience. The
+    heuristic (remaining XP / largest quest reward) never overestimates,
+    so an unpruned search returns a shortest route.
+    
+    To keep large catalogs bounded, each expansion only tries the
+    branch_limit most promising quests, and the search stops after
+    max_nodes expansions. If the search is cut short, the route is
+    finished greedily from the closest state found. 'optimal' in the
+    result is False whenever either limit was hit.
+    
+    Args:
+        character: Character dictionary (not modified)
+        quest_data_dict: Dictionary of all quest data
+        target_level: Level to reach
+        max_nodes: Maximum number of states to expand
+        branch_limit: Maximum quests tried per state
+    
+    Returns: Dictionary with 'route' (list of quest IDs in order),
+             'level', 'xp', 'gold' (after the route), 'reached' and 'optimal'
+    """
+    from character_manager import get_level_up_xp
+
+    levels, prerequisites, dependents = get_catalog_index(
+        quest_data_dict, 'availability', _build_availability_catalog)
+    stats = get_catalog_index(quest_data_dict, 'levels', QuestLevelIndex).stats
+    scores = get_catalog_index(quest_data_dict, 'route_scores', _build_route_scores)
+
+    completed = set(character.get('completed_quests', []))
+    start_level = character.get('level', 1)
+    start_exp = character.get('experience', 0)
+
+    # quests unlocked from the start, bucketed by required level and
+    # sorted best-first, so a state's top choices come from a short merge
+    start_buckets = {}
+    for qid, prereq in prerequisites.items():
+        if qid not in completed and (prereq is None or prereq in completed):
+            start_buckets.setdefault(levels[qid], []).append((-scores[qid], qid))
+    for bucket in start_buckets.values():
+        bucket.sort()
+    bucket_levels = sorted(start_buckets)
+
+    def get_choices(route, level):
+        """Unlocked quests a state can take next, best first (capped)"""
+        taken = set(route)
+        choices = []
+        for qid in route:
+            for dep in dependents.get(qid, ()):
+                if dep not in completed and dep not in taken and levels[dep] <= level:
+                    choices.append((-scores[dep], dep))
+        choices.sort()
+        reachable = [start_buckets[lvl] for lvl in bucket_levels if lvl <= level]
+        merged = heapq.merge(choices, *reachable)
+        picked = []
+        for _, qid in merged:
+            if qid in taken:
+                continue
+            if len(picked) == branch_limit:
+                return picked, True
+            picked.append(qid)
+        return picked, False
+
+    def xp_needed(level, exp):
+        return sum(get_level_up_xp(lvl) for lvl in range(level, target_level)) - exp
+
+    max_xp = max((stats[qid][1] for qid in levels if qid not in completed), default=0)
+
+    def estimate(level, exp):
+        if level >= target_level:
+            return 0
+        if max_xp <= 0:
+            return math.inf
+        return math.ceil(xp_needed(level, exp) / max_xp)
+
+    # (f, -gained xp, tie, route, level, exp, gold)
+    start = (estimate(start_level, start_exp), 0, 0, (), start_level, start_exp, 0)
+    frontier = [start]
+    seen = {frozenset()}
+    closest = start
+    optimal = True
+    expanded = 0
+    tie = 0
+
+    while frontier:
+        node = heapq.heappop(frontier)
+        f, neg_xp, _, route, level, exp, gold = node
+        if level >= target_level:
+            return _route_result(route, level, -neg_xp, gold, True, optimal)
+        if f - len(route) < closest[0] - len(closest[3]) \
+                or (f - len(route) == closest[0] - len(closest[3]) and neg_xp < closest[1]):
+            closest = node
+        if expanded >= max_nodes:
+            optimal = False
+            break
+        expanded += 1
+
+        choices, pruned = get_choices(route, level)
+        if pruned:
+            optimal = False
+
+        for qid in choices:
+            next_route = route + (qid,)
+            key = frozenset(next_route)
+            if key in seen:
+                continue
+            seen.add(key)
+            _, xp, reward_gold = stats[qid]
+            next_level, next_exp = _simulate_level_up(level, exp, xp, get_level_up_xp)
+            tie += 1
+            heapq.heappush(frontier, (len(next_route) + estimate(next_level, next_exp),
+                                      neg_xp - xp, tie, next_route, next_level, next_exp,
+                                      gold + reward_gold))
+
+    # unreachable, or out of budget: finish greedily from the closest state
+    _, neg_xp, _, route, level, exp, gold = closest
+    route = list(route)
+    gained = -neg_xp
+    done = completed.union(route)
+    waiting = {}
+    ready = []
+    unlocked = [qid for bucket in start_buckets.values() for _, qid in bucket if qid not in done]
+    unlocked += [dep for qid in route for dep in dependents.get(qid, ()) if dep not in done]
+    for qid in unlocked:
+        if levels[qid] <= level:
+            ready.append((-scores[qid], qid))
+        else:
+            waiting.setdefault(levels[qid], []).append(qid)
+    heapq.heapify(ready)
+
+    while level < target_level and ready:
+        _, qid = heapq.heappop(ready)
+        _, xp, reward_gold = stats[qid]
+        route.append(qid)
+        done.add(qid)
+        gained += xp
+        gold += reward_gold
+        new_level, exp = _simulate_level_up(level, exp, xp, get_level_up_xp)
+        for lvl in range(level + 1, new_level + 1):
+            for waiting_qid in waiting.pop(lvl, ()):
+                heapq.heappush(ready, (-scores[waiting_qid], waiting_qid))
+        level = new_level
+        for dep in dependents.get(qid, ()):
+            if dep in done:
+                continue
+            if levels[dep] <= level:
+                heapq.heappush(ready, (-scores[dep], dep))
+            else:
+                waiting.setdefault(levels[dep], []).append(dep)
+
+    return _route_result(tuple(route), level, gained, gold, level >= target_level, False)
+
+def _simulate_level_up(level, exp, xp, get_level_up_xp):
+    """Apply xp like gain_experience without touching a character"""
+    exp += xp
+    while exp >= get_level_up_xp(level):
+        exp -= get_level_up_xp(level)
+        level += 1
+    return level, exp
+
+def _build_route_scores(quest_data_dict):
+    """
+    Rank quests for route planning: own XP plus the best XP it unlocks
+    
+    Returns: {quest_id: score}
+    """
+    stats = get_catalog_index(quest_data_dict, 'levels', QuestLevelIndex).stats
+    dependents = get_catalog_index(quest_data_dict, 'availability', _build_availability_catalog)[2]
+    return {qid: stat[1] + max((stats[dep][1] for dep in dependents.get(qid, ())), default=0)
+            for qid, stat in stats.items()}
+
+def _route_result(route, level, xp, gold, reached, optimal):
+    """Package a planned route"""
+    return {'route': list(route), 'level': level, 'xp': xp, 'gold': gold,
+            'reached': reached, 'optimal': optimal and reached}
 
 # ============================================================================
 # DISPLAY FUNCTIONS
@@ -335,14 +1293,16 @@ def validate_quest_prerequisites(quest_data_dict):
     Validate that all quest prerequisites exist
     
     Checks that every prerequisite (that's not "NONE") refers to a real quest
+    and that prerequisites never form a cycle
     
     Returns: True if all valid
-    Raises: QuestNotFoundError if invalid prerequisite found
+    Raises:
+        QuestNotFoundError if invalid prerequisite found
+        QuestDependencyCycleError if prerequisites form a cycle
     """
-    for q in quest_data_dict.values():
-        prereq = q.get('prerequisite', 'NONE')
-        if prereq and prereq != 'NONE' and prereq not in quest_data_dict:
-            raise QuestNotFoundError()
+    graph = get_quest_graph(quest_data_dict)
+    if graph.missing:
+        raise QuestNotFoundError()
     return True
 
 
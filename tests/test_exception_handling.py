@@ -63,6 +63,27 @@ def test_insufficient_resources_exception():
     with pytest.raises(InsufficientResourcesError):
         inventory_system.purchase_item(char, "expensive_item", item_data)
 
+def test_non_positive_quantity_rejected():
+    """Test that zero or negative trade quantities raise ValueError and change nothing"""
+    items = game_data.load_items("data/items.txt")
+    char = character_manager.create_character("Test", "Rogue")
+    inventory_system.add_item_to_inventory(char, 'health_potion')
+    
+    for quantity in (0, -2):
+        with pytest.raises(ValueError):
+            inventory_system.purchase_item(char, 'iron_sword', items['iron_sword'], quantity=quantity)
+        with pytest.raises(ValueError):
+            inventory_system.sell_item(char, 'health_potion', items['health_potion'], quantity=quantity)
+        with pytest.raises(ValueError):
+            inventory_system.use_items(char, 'health_potion', items['health_potion'], quantity)
+        with inventory_system.CharacterTransaction(char) as txn:
+            with pytest.raises(ValueError):
+                txn.add_item('iron_sword', quantity=quantity)
+            with pytest.raises(ValueError):
+                txn.remove_item('health_potion', quantity=quantity)
+    assert char['gold'] == 100
+    assert char['inventory'] == ['health_potion']
+
 def test_invalid_item_type_exception():
     """Test that InvalidItemTypeError is raised for wrong item types"""
     char = {'inventory': ['weapon1'], 'health': 80, 'max_health': 100}
@@ -84,6 +105,21 @@ def test_quest_not_found_exception():
     with pytest.raises(QuestNotFoundError):
         quest_handler.accept_quest(char, "fake_quest", quests)
 
+def test_unfinished_objectives_exception():
+    """Test that a quest cannot be completed by hand before its objectives are done"""
+    quests = game_data.load_quests("data/quests.txt")
+    char = character_manager.create_character("Test", "Warrior")
+    char['completed_quests'].append('first_steps')
+    char['level'] = 2
+    quest_handler.accept_quest(char, 'goblin_hunter', quests)
+    quest_handler.publish_quest_event(char, 'defeat', 'goblin', amount=2)
+    
+    with pytest.raises(QuestRequirementsNotMetError):
+        quest_handler.complete_quest(char, 'goblin_hunter', quests)
+    assert 'goblin_hunter' in char['active_quests']
+    result = quest_handler.complete_quest_batch([char], 'goblin_hunter', quests)
+    assert isinstance(result[0], QuestRequirementsNotMetError)
+
 def test_insufficient_level_exception():
     """Test that InsufficientLevelError is raised for level requirements"""
     char = {'level': 1, 'active_quests': [], 'completed_quests': []}
@@ -139,6 +175,20 @@ def test_quest_not_active_exception():
     with pytest.raises(QuestNotActiveError):
         quest_handler.complete_quest(char, "test_quest", quests)
 
+def test_quest_dependency_cycle_exception():
+    """Test that QuestDependencyCycleError is raised for circular prerequisites"""
+    quests = {
+        'quest_a': {'quest_id': 'quest_a', 'required_level': 1, 'prerequisite': 'quest_c'},
+        'quest_b': {'quest_id': 'quest_b', 'required_level': 1, 'prerequisite': 'quest_a'},
+        'quest_c': {'quest_id': 'quest_c', 'required_level': 1, 'prerequisite': 'quest_b'}
+    }
+    
+    with pytest.raises(QuestDependencyCycleError):
+        quest_handler.validate_quest_prerequisites(quests)
+    
+    with pytest.raises(QuestDependencyCycleError):
+        quest_handler.get_quest_prerequisite_chain('quest_a', quests)
+
 # ============================================================================
 # GAME DATA EXCEPTION TESTS
 # ============================================================================
@@ -184,6 +234,54 @@ def test_combat_not_active_exception():
     with pytest.raises(CombatNotActiveError):
         battle.player_turn()
 
+def test_ability_on_cooldown_exception():
+    """Test that AbilityOnCooldownError is raised when reusing an ability too soon"""
+    import combat_system
+    
+    char = character_manager.create_character("Test", "Warrior")
+    enemy = combat_system.create_enemy("dragon")
+    battle = combat_system.SimpleBattle(char, enemy, verbose=False)
+    
+    battle.play_round(combat_system.ACTION_ABILITY)
+    
+    with pytest.raises(AbilityOnCooldownError):
+        battle.play_round(combat_system.ACTION_ABILITY)
+
+def test_corrupted_battle_recording_exception():
+    """Test that CorruptedDataError is raised for bytes that are not a battle recording"""
+    import combat_system
+    
+    with pytest.raises(CorruptedDataError):
+        combat_system.BattleReplay(b"not a replay")
+    
+    # summaries check every stream's header too, including old versions
+    header = combat_system.REPLAY_HEADER
+    old = header.pack(combat_system.REPLAY_MAGIC, 1, 0, 0, 1, 10, 10, 10, 10) + bytes(16)
+    with pytest.raises(CorruptedDataError):
+        combat_system.summarize_replays([old])
+    with pytest.raises(CorruptedDataError):
+        combat_system.summarize_replays([bytes(header.size + combat_system.REPLAY_EVENT.size)])
+
+def test_invalid_quest_objective_exception():
+    """Test that InvalidDataFormatError is raised for malformed quest objectives"""
+    quest = {
+        'quest_id': 'test', 'title': 'Test', 'description': 'Test',
+        'reward_xp': 50, 'reward_gold': 25, 'required_level': 1,
+        'prerequisite': 'NONE', 'objective': 'defeat:goblin'
+    }
+    
+    with pytest.raises(InvalidDataFormatError):
+        game_data.validate_quest_data(quest)
+
+def test_out_of_stock_exception():
+    """Test that OutOfStockError is raised when buying more than a shop has"""
+    items = game_data.load_items("data/items.txt")
+    shop = inventory_system.Shop(items, stock={'health_potion': 1})
+    char = character_manager.create_character("Test", "Rogue")
+    
+    with pytest.raises(OutOfStockError):
+        shop.buy(char, 'health_potion', 2)
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
 
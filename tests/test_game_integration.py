@@ -6,6 +6,7 @@ Tests that modules work together correctly
 import pytest
 import sys
 import os
+import asyncio
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -40,6 +41,26 @@ def test_character_creation_and_saving():
     # Cleanup
     character_manager.delete_character("IntegrationTest")
 
+def test_quest_log_round_trips_through_save():
+    """Test that quest logs keep order and membership across save and load"""
+    char = character_manager.create_character("QuestLogTest", "Cleric")
+    for qid in ['first_steps', 'goblin_hunter', 'orc_menace']:
+        char['completed_quests'].append(qid)
+    char['active_quests'].append('dragon_slayer')
+    char['completed_quests'].remove('goblin_hunter')
+    
+    assert 'first_steps' in char['completed_quests']
+    assert 'goblin_hunter' not in char['completed_quests']
+    assert char['completed_quests'] == ['first_steps', 'orc_menace']
+    
+    character_manager.save_character(char)
+    loaded = character_manager.load_character("QuestLogTest")
+    assert loaded['completed_quests'] == ['first_steps', 'orc_menace']
+    assert loaded['active_quests'] == ['dragon_slayer']
+    assert character_manager.validate_character_data(loaded) == True
+    
+    character_manager.delete_character("QuestLogTest")
+
 def test_character_leveling_system():
     """Test that character leveling works correctly"""
     char = character_manager.create_character("LevelTest", "Mage")
@@ -89,6 +110,38 @@ def test_inventory_item_management():
     assert "health_potion" not in char['inventory']  # Consumed
     assert char['health'] == 70  # Healed
 
+def test_stacked_inventory_counts_and_round_trips():
+    """Test stack counts, capacity and save round-trip of the stacked inventory"""
+    from custom_exceptions import InventoryFullError
+    
+    char = character_manager.create_character("StackTest", "Rogue")
+    for item_id in ['health_potion', 'iron_sword', 'health_potion', 'health_potion']:
+        inventory_system.add_item_to_inventory(char, item_id)
+    
+    inv = char['inventory']
+    assert len(inv) == 4
+    assert inventory_system.count_item(char, 'health_potion') == 3
+    assert list(inv.items()) == [('health_potion', 3), ('iron_sword', 1)]
+    assert inv == ['iron_sword', 'health_potion', 'health_potion', 'health_potion']
+    assert inventory_system.get_inventory_space_remaining(char) == inventory_system.MAX_INVENTORY_SIZE - 4
+    
+    inventory_system.remove_item_from_inventory(char, 'iron_sword')
+    assert not inventory_system.has_item(char, 'iron_sword')
+    with pytest.raises(ValueError):
+        inv.remove('health_potion', 4)
+    
+    character_manager.save_character(char)
+    loaded = character_manager.load_character("StackTest")
+    assert isinstance(loaded['inventory'], inventory_system.Inventory)
+    assert loaded['inventory'] == inv
+    assert character_manager.validate_character_data(loaded) == True
+    character_manager.delete_character("StackTest")
+    
+    while len(inv) < inventory_system.MAX_INVENTORY_SIZE:
+        inventory_system.add_item_to_inventory(char, 'health_potion')
+    with pytest.raises(InventoryFullError):
+        inventory_system.add_item_to_inventory(char, 'iron_sword')
+
 def test_equipment_system():
     """Test equipping weapons and armor"""
     char = character_manager.create_character("EquipTest", "Warrior")
@@ -104,6 +157,226 @@ def test_equipment_system():
     assert 'equipped_weapon' in char
     assert char['equipped_weapon'] == "iron_sword"
 
+def test_typed_inventory_views_follow_catalog_and_inventory():
+    """Test the item catalog's type index and the per-type inventory views"""
+    items = game_data.load_items("data/items.txt")
+    assert isinstance(items, game_data.ItemCatalog)
+    assert items.get_ids_of_type('armor') == [i for i, item in items.items() if item['type'] == 'armor']
+    items['test_blade'] = {'type': 'weapon', 'name': 'Test Blade'}
+    assert items.get_ids_of_type('weapon')[-1] == 'test_blade'
+    del items['test_blade']
+    assert 'test_blade' not in items.get_ids_of_type('weapon')
+    
+    # every mutating dict method keeps the index in step
+    items.update({'test_blade': {'type': 'weapon'}}, test_shield={'type': 'armor'})
+    assert 'test_blade' in items.get_ids_of_type('weapon')
+    assert 'test_shield' in items.get_ids_of_type('armor')
+    assert items.pop('test_blade')['type'] == 'weapon'
+    assert 'test_blade' not in items.get_ids_of_type('weapon')
+    assert items.pop('test_blade', None) is None
+    items.setdefault('test_tonic', {'type': 'consumable'})
+    assert items.get_ids_of_type('consumable')[-1] == 'test_tonic'
+    assert items.popitem()[0] == 'test_tonic'
+    assert 'test_tonic' not in items.get_ids_of_type('consumable')
+    copied = items.copy()
+    assert isinstance(copied, game_data.ItemCatalog)
+    assert copied.get_ids_of_type('armor') == items.get_ids_of_type('armor')
+    copied.clear()
+    assert copied.get_ids_of_type('armor') == [] and items.get_ids_of_type('armor')
+    del items['test_shield']
+    
+    char = character_manager.create_character("ViewTest", "Warrior")
+    for item_id in ['health_potion', 'iron_sword', 'health_potion', 'leather_armor']:
+        inventory_system.add_item_to_inventory(char, item_id)
+    assert inventory_system.get_items_of_type(char, 'consumable', items) == ['health_potion']
+    assert inventory_system.get_items_of_type(char, 'weapon', items) == ['iron_sword']
+    
+    # the views follow later changes, including committed transactions
+    inventory_system.equip_weapon(char, 'iron_sword', items['iron_sword'])
+    assert inventory_system.get_items_of_type(char, 'weapon', items) == []
+    inventory_system.use_item(char, 'health_potion', items['health_potion'])
+    assert inventory_system.get_items_of_type(char, 'consumable', items) == ['health_potion']
+    inventory_system.use_item(char, 'health_potion', items['health_potion'])
+    assert inventory_system.get_items_of_type(char, 'consumable', items) == []
+    inventory_system.unequip_weapon(char)
+    assert inventory_system.get_items_of_type(char, 'weapon', items) == ['iron_sword']
+    
+    # plain list inventories give the same answer
+    assert inventory_system.get_items_of_type({'inventory': list(char['inventory'])}, 'armor', items) == ['leather_armor']
+
+def test_bulk_use_and_auto_heal_pick_cheapest_potions():
+    """Test using several consumables at once and the auto-heal planner"""
+    from custom_exceptions import ItemNotFoundError
+    
+    items = game_data.load_items("data/items.txt")
+    char = character_manager.create_character("HealTest", "Cleric")
+    for _ in range(3):
+        inventory_system.add_item_to_inventory(char, 'health_potion')
+    inventory_system.add_item_to_inventory(char, 'super_health_potion')
+    
+    char['health'] = 10
+    inventory_system.use_items(char, 'health_potion', items['health_potion'], 2)
+    assert char['health'] == 50
+    assert inventory_system.count_item(char, 'health_potion') == 1
+    with pytest.raises(ItemNotFoundError):
+        inventory_system.use_items(char, 'health_potion', items['health_potion'], 2)
+    
+    # 30 missing: the one health_potion (+20) falls short, so the super
+    # potion is needed; with a second potion, two (50 gold) beat it (75 gold)
+    char['health'] = 70
+    assert inventory_system.plan_heal(char, items) == {'super_health_potion': 1}
+    inventory_system.add_item_to_inventory(char, 'health_potion')
+    assert inventory_system.plan_heal(char, items) == {'health_potion': 2}
+    inventory_system.remove_item_from_inventory(char, 'health_potion')
+    assert inventory_system.plan_heal(char, items, target_health=85) == {'health_potion': 1}
+    assert inventory_system.auto_heal(char, items) == {'super_health_potion': 1}
+    assert char['health'] == char['max_health']
+    assert inventory_system.plan_heal(char, items) == {}
+    
+    # not enough healing held: everything is used
+    char['health'] = 1
+    assert inventory_system.auto_heal(char, items) == {'health_potion': 1}
+    assert char['health'] == 21 and not inventory_system.has_item(char, 'health_potion')
+
+def test_transactions_commit_or_roll_back_as_a_unit():
+    """Test that staged changes apply atomically and failed equips leave stats intact"""
+    from custom_exceptions import InsufficientResourcesError, InventoryFullError
+    
+    char = character_manager.create_character("TxnTest", "Warrior")
+    items = game_data.load_items("data/items.txt")
+    strength = char['strength']
+    
+    # swapping weapons in a full inventory uses the slot the new weapon frees
+    inventory_system.add_item_to_inventory(char, 'iron_sword')
+    inventory_system.equip_weapon(char, 'iron_sword', items['iron_sword'])
+    while len(char['inventory']) < inventory_system.MAX_INVENTORY_SIZE - 1:
+        inventory_system.add_item_to_inventory(char, 'health_potion')
+    inventory_system.add_item_to_inventory(char, 'steel_sword')
+    inventory_system.equip_weapon(char, 'steel_sword', items['steel_sword'])
+    assert char['equipped_weapon'] == 'steel_sword'
+    assert 'iron_sword' in char['inventory']
+    assert char['strength'] == strength + 10  # steel_sword bonus only
+    
+    # a failed unequip (inventory is full again) changes nothing
+    before = (char['strength'], char['equipped_weapon'], len(char['inventory']))
+    with pytest.raises(InventoryFullError):
+        inventory_system.unequip_weapon(char)
+    assert (char['strength'], char['equipped_weapon'], len(char['inventory'])) == before
+    
+    # a batch of shop operations commits together or not at all
+    shopper = character_manager.create_character("Shopper", "Rogue")
+    with pytest.raises(InsufficientResourcesError):
+        with inventory_system.CharacterTransaction(shopper) as txn:
+            inventory_system.purchase_item(shopper, 'health_potion', items['health_potion'], txn=txn)
+            inventory_system.purchase_item(shopper, 'steel_sword', items['steel_sword'], txn=txn)
+    assert shopper['gold'] == 100 and len(shopper['inventory']) == 0
+    
+    with inventory_system.CharacterTransaction(shopper) as txn:
+        inventory_system.purchase_item(shopper, 'health_potion', items['health_potion'], txn=txn)
+        inventory_system.purchase_item(shopper, 'health_potion', items['health_potion'], txn=txn)
+        inventory_system.sell_item(shopper, 'health_potion', items['health_potion'], txn=txn)
+        assert txn.count_item('health_potion') == 1
+        assert shopper['gold'] == 100  # nothing applied until commit
+    assert shopper['gold'] == 100 - 2 * items['health_potion']['cost'] + items['health_potion']['cost'] // 2
+    assert inventory_system.count_item(shopper, 'health_potion') == 1
+
+def test_failed_operation_in_batch_leaves_nothing_staged():
+    """Test that an operation caught inside a transaction does not commit its partial changes"""
+    from custom_exceptions import InventoryFullError
+    
+    items = game_data.load_items("data/items.txt")
+    char = character_manager.create_character("Savepoint", "Warrior")
+    inventory_system.set_inventory_capacity(char, limit=30, item_data_dict=items)
+    inventory_system.add_item_to_inventory(char, 'steel_armor')
+    inventory_system.equip_armor(char, 'steel_armor', items['steel_armor'])
+    inventory_system.add_item_to_inventory(char, 'leather_armor')
+    capacity = inventory_system.set_inventory_capacity(char, limit=10, item_data_dict=items)
+    max_health = char['max_health']
+    
+    with inventory_system.CharacterTransaction(char) as txn:
+        inventory_system.add_item_to_inventory(char, 'health_potion', txn)
+        # leather armor comes out, but the steel armor does not fit back in
+        with pytest.raises(InventoryFullError):
+            inventory_system.equip_armor(char, 'leather_armor', items['leather_armor'], txn)
+    
+    assert char['equipped_armor'] == 'steel_armor'
+    assert char['max_health'] == max_health
+    assert inventory_system.count_item(char, 'leather_armor') == 1
+    assert inventory_system.count_item(char, 'health_potion') == 1
+    assert capacity.used == items['leather_armor']['weight'] + items['health_potion']['weight']
+    
+    # restoring a savepoint puts back earlier staged values and drops new ones
+    with inventory_system.CharacterTransaction(char) as txn:
+        txn['gold'] = 50
+        with pytest.raises(ValueError):
+            with txn.savepoint():
+                txn['gold'] = 10
+                txn['title'] = 'Broke'
+                raise ValueError()
+        assert txn['gold'] == 50 and 'title' not in txn
+    assert char['gold'] == 50
+
+def test_inventory_capacity_per_class_and_by_weight():
+    """Test class capacities, the weight model and the running used total"""
+    from custom_exceptions import InventoryFullError
+    
+    items = game_data.load_items("data/items.txt")
+    mage = character_manager.create_character("CapacityTest", "Mage")
+    slots = inventory_system.CLASS_INVENTORY_CAPACITY['Mage'][0]
+    inventory_system.add_item_to_inventory(mage, 'health_potion')
+    assert inventory_system.get_inventory_space_remaining(mage) == slots - 1
+    
+    # weight model: the class carry weight, charged by item weight
+    capacity = inventory_system.set_inventory_capacity(mage, item_data_dict=items)
+    assert capacity.limit == inventory_system.CLASS_INVENTORY_CAPACITY['Mage'][1]
+    assert capacity.used == items['health_potion']['weight']
+    inventory_system.add_item_to_inventory(mage, 'steel_armor')
+    inventory_system.add_item_to_inventory(mage, 'steel_armor')
+    assert capacity.used == items['health_potion']['weight'] + 2 * items['steel_armor']['weight']
+    with pytest.raises(InventoryFullError):
+        inventory_system.add_item_to_inventory(mage, 'steel_armor')
+    
+    # equipped items no longer count against the carry weight
+    inventory_system.equip_armor(mage, 'steel_armor', items['steel_armor'])
+    inventory_system.remove_item_from_inventory(mage, 'steel_armor')
+    inventory_system.add_item_to_inventory(mage, 'steel_sword')
+    assert capacity.used == sum(capacity.cost(i) for i in mage['inventory'])
+    
+    # a replaced inventory is re-counted, and per-character limits override the class
+    inventory_system.clear_inventory(mage)
+    assert inventory_system.get_inventory_space_remaining(mage) == capacity.limit
+    inventory_system.set_inventory_capacity(mage, limit=2)
+    inventory_system.add_item_to_inventory(mage, 'iron_sword')
+    inventory_system.add_item_to_inventory(mage, 'iron_sword')
+    with pytest.raises(InventoryFullError):
+        inventory_system.add_item_to_inventory(mage, 'health_potion')
+
+def test_inventory_capacity_counts_direct_inventory_changes():
+    """Test that appending to or removing from the Inventory directly keeps capacity current"""
+    from custom_exceptions import InventoryFullError
+    
+    items = game_data.load_items("data/items.txt")
+    mage = character_manager.create_character("DirectAppend", "Mage")
+    slots = inventory_system.CLASS_INVENTORY_CAPACITY['Mage'][0]
+    inventory_system.add_item_to_inventory(mage, 'health_potion')
+    for _ in range(slots - 1):
+        mage['inventory'].append('health_potion')
+    assert inventory_system.get_inventory_space_remaining(mage) == 0
+    with pytest.raises(InventoryFullError):
+        inventory_system.add_item_to_inventory(mage, 'health_potion')
+    
+    mage['inventory'].remove('health_potion', 2)
+    assert inventory_system.get_inventory_space_remaining(mage) == 2
+    
+    capacity = inventory_system.set_inventory_capacity(mage, item_data_dict=items)
+    mage['inventory'].append('steel_armor')
+    assert capacity.used == sum(capacity.cost(i) for i in mage['inventory'])
+    
+    # plain list inventories are recounted when their length changes
+    mage['inventory'] = ['iron_sword']
+    mage['inventory'].append('steel_armor')
+    assert inventory_system.get_inventory_capacity(mage).used == capacity.cost('iron_sword') + capacity.cost('steel_armor')
+
 def test_shop_system():
     """Test buying and selling items"""
     char = character_manager.create_character("ShopTest", "Mage")
@@ -123,6 +396,78 @@ def test_shop_system():
     assert gold_received == 12  # Half of cost (25 // 2)
     assert "health_potion" not in char['inventory']
 
+def test_shop_listings_bulk_trades_and_stock():
+    """Test cost-sorted listings, affordability, bulk trades and stock limits"""
+    from custom_exceptions import InsufficientResourcesError
+    
+    items = game_data.load_items("data/items.txt")
+    shop = inventory_system.Shop(items, stock={'health_potion': 5})
+    
+    weapons = shop.get_listing('weapon')
+    assert sorted(weapons) == sorted(i for i, item in items.items() if item['type'] == 'weapon')
+    assert [items[i]['cost'] for i in weapons] == sorted(items[i]['cost'] for i in weapons)
+    assert shop.get_affordable(100) == [i for i in shop.get_listing() if items[i]['cost'] <= 100]
+    assert shop.count_affordable(100) == len(shop.get_affordable(100))
+    assert shop.get_affordable(0) == []
+    
+    char = character_manager.create_character("ShopTest", "Rogue")
+    spent = shop.buy(char, 'health_potion', 3)
+    assert spent == 3 * items['health_potion']['cost']
+    assert inventory_system.count_item(char, 'health_potion') == 3
+    assert shop.get_stock('health_potion') == 2
+    
+    # a failed batch gives the stock back
+    with pytest.raises(InsufficientResourcesError):
+        with inventory_system.CharacterTransaction(char) as txn:
+            shop.buy(char, 'health_potion', 2, txn=txn)
+            shop.buy(char, 'steel_armor', 1, txn=txn)
+    assert shop.get_stock('health_potion') == 2
+    assert inventory_system.count_item(char, 'health_potion') == 3
+    
+    earned = shop.sell(char, 'health_potion', 3)
+    assert earned == 3 * (items['health_potion']['cost'] // 2)
+    assert shop.get_stock('health_potion') == 5
+    assert char['gold'] == 100 - spent + earned
+
+def test_equipment_modifiers_track_base_and_effective_stats():
+    """Test that equipment bonuses stay separate from base stats"""
+    items = game_data.load_items("data/items.txt")
+    char = character_manager.create_character("GearTest", "Mage")
+    base_strength = char['strength']
+    base_magic = char['magic']
+    base_health = char['max_health']
+    
+    for item_id in ('iron_sword', 'fire_staff', 'leather_armor'):
+        inventory_system.add_item_to_inventory(char, item_id)
+    inventory_system.equip_weapon(char, 'iron_sword', items['iron_sword'])
+    inventory_system.equip_armor(char, 'leather_armor', items['leather_armor'])
+    stats = char['stats']
+    assert char['strength'] == base_strength + 5
+    assert stats.get_base('strength') == base_strength
+    assert char['health'] == base_health  # armor raises the cap, not health
+    
+    # a level-up while equipped keeps the bonus on top of the new base
+    character_manager.gain_experience(char, 100)
+    assert stats.get_base('strength') == base_strength + 2
+    inventory_system.equip_weapon(char, 'fire_staff', items['fire_staff'])
+    assert char['strength'] == base_strength + 2
+    assert char['magic'] == base_magic + 2 + 8
+    assert inventory_system.count_item(char, 'iron_sword') == 1
+    
+    # equipment survives a save/load round trip
+    character_manager.save_character(char)
+    loaded = character_manager.load_character("GearTest")
+    assert loaded['equipped_weapon'] == 'fire_staff'
+    assert loaded['magic'] == char['magic']
+    assert loaded['stats'].get_base('magic') == base_magic + 2
+    character_manager.delete_character("GearTest")
+    
+    # removing armor clamps health to the lower cap
+    char['health'] = char['max_health']
+    inventory_system.unequip_armor(char)
+    assert char['max_health'] == stats.get_base('max_health')
+    assert char['health'] == char['max_health']
+
 # ============================================================================
 # QUEST INTEGRATION TESTS
 # ============================================================================
@@ -187,6 +532,268 @@ def test_quest_prerequisite_system():
     quest_handler.accept_quest(char, 'second_quest', quests)
     assert 'second_quest' in char['active_quests']
 
+def test_quest_graph_chains_and_order():
+    """Test prerequisite chains, dependents and topological order from the quest graph"""
+    quests = game_data.load_quests("data/quests.txt")
+    
+    chain = quest_handler.get_quest_prerequisite_chain('dragon_slayer', quests)
+    assert chain == ['first_steps', 'goblin_hunter', 'orc_menace', 'dragon_slayer']
+    
+    graph = quest_handler.get_quest_graph(quests)
+    assert graph is quest_handler.get_quest_graph(quests)  # built once per catalog
+    assert sorted(graph.get_dependents('first_steps')) == ['equipment_upgrade', 'goblin_hunter']
+    assert graph.get_chain('master_adventurer')[-2:] == ['dragon_slayer', 'master_adventurer']
+    
+    position = {qid: i for i, qid in enumerate(graph.order)}
+    for qid, prereq in graph.prerequisite.items():
+        if prereq is not None:
+            assert position[prereq] < position[qid]
+
+def test_available_quests_index_updates_incrementally():
+    """Test that available quests follow accepts, completions and level-ups"""
+    quests = game_data.load_quests("data/quests.txt")
+    char = character_manager.create_character("IndexTest", "Warrior")
+    
+    def available_ids():
+        return sorted(q['quest_id'] for q in quest_handler.get_available_quests(char, quests))
+    
+    assert available_ids() == ['first_steps']
+    index = char['quest_index']
+    
+    quest_handler.accept_quest(char, 'first_steps', quests)
+    assert available_ids() == []
+    
+    # 50 XP is not enough to reach level 2, so the dependents wait in a level bucket
+    quest_handler.complete_quest(char, 'first_steps', quests)
+    assert available_ids() == []
+    assert sorted(index.waiting[2]) == ['equipment_upgrade', 'goblin_hunter']
+    
+    character_manager.gain_experience(char, 50)
+    assert available_ids() == ['equipment_upgrade', 'goblin_hunter']
+    assert char['quest_index'] is index  # same index, updated in place
+    
+    # direct edits to the quest lists are noticed and trigger a rebuild
+    char['completed_quests'].append('goblin_hunter')
+    char['level'] = 3
+    assert available_ids() == ['equipment_upgrade', 'orc_menace']
+
+def test_copied_character_gets_its_own_quest_helpers():
+    """Test that a copied character does not reuse the original's index or tracker"""
+    quests = game_data.load_quests("data/quests.txt")
+    original = character_manager.create_character("Original", "Warrior")
+    original['completed_quests'].append('first_steps')
+    original['level'] = 2
+    quest_handler.get_available_quests(original, quests)
+    quest_handler.accept_quest(original, 'goblin_hunter', quests)
+    index = original['quest_index']
+    tracker = original['quest_tracker']
+    
+    copy = dict(original)
+    copy['active_quests'] = []
+    copy['completed_quests'] = ['first_steps']
+    copy['quest_progress'] = {}
+    available = sorted(q['quest_id'] for q in quest_handler.get_available_quests(copy, quests))
+    assert available == ['equipment_upgrade', 'goblin_hunter']
+    assert copy['quest_index'].character is copy
+    
+    quest_handler.accept_quest(copy, 'goblin_hunter', quests)
+    assert copy['quest_tracker'] is not tracker
+    quest_handler.publish_quest_event(copy, 'defeat', 'goblin', amount=3)
+    assert 'goblin_hunter' in copy['completed_quests']
+    assert original['active_quests'] == ['goblin_hunter']
+    assert original['quest_progress'] == {'goblin_hunter': [0]}
+    assert original['quest_index'] is index and original['quest_tracker'] is tracker
+
+def test_quest_batch_operations_match_single_calls():
+    """Test that batch accept/complete give the same results as per-character calls"""
+    from custom_exceptions import (
+        InsufficientLevelError, QuestRequirementsNotMetError, CharacterDeadError,
+        QuestNotActiveError, QuestNotFoundError
+    )
+    
+    quests = game_data.load_quests("data/quests.txt")
+    ready = character_manager.create_character("Ready", "Warrior")
+    leveler = character_manager.create_character("Leveler", "Mage")
+    leveler['experience'] = 60
+    rookie = character_manager.create_character("Rookie", "Rogue")
+    rookie['level'] = 2
+    
+    results = quest_handler.accept_quest_batch([ready, leveler, rookie], 'goblin_hunter', quests)
+    assert isinstance(results[0], InsufficientLevelError)
+    assert isinstance(results[2], QuestRequirementsNotMetError)
+    
+    results = quest_handler.accept_quest_batch([ready, leveler], 'first_steps', quests)
+    assert results == [True, True]
+    
+    twins = [character_manager.create_character(f"Twin{i}", "Rogue") for i in range(2)]
+    quest_handler.accept_quest_batch(twins, 'first_steps', quests)
+    results = quest_handler.complete_quest_batch(twins, 'first_steps', quests)
+    results[0]['gold'] = 0
+    assert results[1] == {'xp': 50, 'gold': 25}  # each result is its own dict
+    
+    leveler['health'] = 0
+    results = quest_handler.complete_quest_batch([ready, leveler, rookie], 'first_steps', quests)
+    assert results[0] == {'xp': 50, 'gold': 25}
+    assert isinstance(results[1], CharacterDeadError)
+    assert isinstance(results[2], QuestNotActiveError)
+    assert 'first_steps' in leveler['active_quests']  # dead characters are left untouched
+    
+    leveler['health'] = leveler['max_health']
+    single = character_manager.create_character("Single", "Mage")
+    single['experience'] = 60
+    quest_handler.accept_quest(single, 'first_steps', quests)
+    quest_handler.complete_quest(single, 'first_steps', quests)
+    quest_handler.complete_quest_batch([leveler], 'first_steps', quests)
+    for key in ('level', 'experience', 'gold', 'strength', 'max_health'):
+        assert leveler[key] == single[key]
+    assert ready['experience'] == 50 and ready['level'] == 1
+    
+    with pytest.raises(QuestNotFoundError):
+        quest_handler.complete_quest_batch([ready], 'no_such_quest', quests)
+
+def test_quest_reward_totals_are_kept_and_migrated():
+    """Test running quest totals across completion, save/load and old saves"""
+    quests = game_data.load_quests("data/quests.txt")
+    char = character_manager.create_character("TotalsTest", "Warrior")
+    
+    quest_handler.accept_quest(char, 'first_steps', quests)
+    quest_handler.complete_quest(char, 'first_steps', quests)
+    assert char['quest_totals'] == {'completed': 1, 'xp': 50, 'gold': 25}
+    assert quest_handler.get_total_quest_rewards_earned(char, quests) == {'total_xp': 50, 'total_gold': 25}
+    assert quest_handler.verify_quest_totals(char, quests) == True
+    
+    character_manager.save_character(char)
+    loaded = character_manager.load_character("TotalsTest")
+    assert loaded['quest_totals'] == char['quest_totals']
+    
+    # an old save has no totals; they are rebuilt from the completed list
+    del loaded['quest_totals']
+    assert quest_handler.verify_quest_totals(loaded, quests) == False
+    assert loaded['quest_totals'] == {'completed': 1, 'xp': 50, 'gold': 25}
+    
+    # direct edits to the completed list are picked up on the next read
+    char['completed_quests'].append('goblin_hunter')
+    assert quest_handler.get_total_quest_rewards_earned(char, quests) == {'total_xp': 150, 'total_gold': 100}
+    
+    character_manager.delete_character("TotalsTest")
+
+def test_quest_level_index_range_and_compound_queries():
+    """Test level range queries and reward filters against a plain scan"""
+    quests = game_data.load_quests("data/quests.txt")
+    
+    by_level = quest_handler.get_quests_by_level(quests, 2, 3)
+    assert sorted(q['quest_id'] for q in by_level) == \
+        ['equipment_upgrade', 'goblin_hunter', 'orc_menace', 'treasure_hunter']
+    assert [q['required_level'] for q in by_level] == sorted(q['required_level'] for q in by_level)
+    assert quest_handler.get_quests_by_level(quests, 7, 9) == []
+    
+    found = quest_handler.find_quests(quests, min_level=2, max_level=6, min_xp=150, min_gold=120)
+    assert sorted(q['quest_id'] for q in found) == ['dragon_slayer', 'orc_menace']
+    
+    for filters in [{}, {'min_xp': 100}, {'min_gold': 500, 'max_level': 10}, {'min_level': 3}]:
+        expected = [q for q in quests.values()
+                    if q['required_level'] >= filters.get('min_level', 0)
+                    and q['required_level'] <= filters.get('max_level', 99)
+                    and q['reward_xp'] >= filters.get('min_xp', 0)
+                    and q['reward_gold'] >= filters.get('min_gold', 0)]
+        found = quest_handler.find_quests(quests, **filters)
+        assert sorted(q['quest_id'] for q in found) == sorted(q['quest_id'] for q in expected)
+
+def test_quest_route_planner_finds_shortest_valid_route():
+    """Test that planned routes are shortest, playable and bounded on big catalogs"""
+    quests = game_data.load_quests("data/quests.txt")
+    char = character_manager.create_character("Planner", "Warrior")
+    char['completed_quests'].append('first_steps')
+    char['level'] = 2
+    char['experience'] = 150
+    
+    plan = quest_handler.plan_quest_route(char, quests, 4)
+    assert plan['reached'] and plan['optimal']
+    assert len(plan['route']) == 3
+    assert char['level'] == 2  # planning does not touch the character
+    
+    for qid in plan['route']:
+        quest_handler.accept_quest(char, qid, quests)
+        if quests[qid].get('objective'):
+            tracker = quest_handler.get_quest_tracker(char, quests)
+            for event_type, target, count, required in tracker.get_progress(qid):
+                quest_handler.publish_quest_event(char, event_type, target, required - count)
+        else:
+            quest_handler.complete_quest(char, qid, quests)
+    assert char['level'] == plan['level'] == 4
+    
+    # the remaining quests do not give enough XP for level 11
+    assert quest_handler.plan_quest_route(char, quests, 11)['reached'] == False
+    
+    big = {}
+    for i in range(5000):
+        prereq = f"q{i // 3}" if i >= 3 else 'NONE'
+        big[f"q{i}"] = {'quest_id': f"q{i}", 'required_level': 1 + i // 1000,
+                        'reward_xp': 50 + (i * 37) % 200, 'reward_gold': 10,
+                        'prerequisite': prereq}
+    rookie = character_manager.create_character("BigPlanner", "Mage")
+    plan = quest_handler.plan_quest_route(rookie, big, 8, max_nodes=500)
+    assert plan['reached'] and plan['level'] >= 8
+    taken = set()
+    for qid in plan['route']:
+        prereq = big[qid]['prerequisite']
+        assert prereq == 'NONE' or prereq in taken
+        taken.add(qid)
+
+def test_quest_objectives_track_events_and_auto_complete():
+    """Test objective counters fed by combat victories and item pickups"""
+    quests = game_data.load_quests("data/quests.txt")
+    char = character_manager.create_character("Tracker", "Warrior")
+    char['completed_quests'].append('first_steps')
+    char['level'] = 2
+    char['strength'] = 60
+    
+    quest_handler.accept_quest(char, 'goblin_hunter', quests)
+    tracker = char['quest_tracker']
+    assert set(tracker.subscriptions) == {('defeat', 'goblin')}
+    
+    # an unrelated event touches nothing
+    assert quest_handler.publish_quest_event(char, 'defeat', 'orc') == []
+    assert char['quest_progress']['goblin_hunter'] == [0]
+    
+    result = combat_system.SimpleBattle(char, combat_system.create_enemy("goblin"), verbose=False).start_battle()
+    assert result['winner'] == 'player' and result['quests_completed'] == []
+    assert tracker.get_progress('goblin_hunter') == [('defeat', 'goblin', 1, 3)]
+    
+    character_manager.save_character(char)
+    loaded = character_manager.load_character("Tracker")
+    assert loaded['quest_progress'] == {'goblin_hunter': [1]}
+    character_manager.delete_character("Tracker")
+    
+    completed = quest_handler.publish_quest_event(char, 'defeat', 'goblin', amount=2)
+    assert completed == [('goblin_hunter', {'xp': 100, 'gold': 75})]
+    assert 'goblin_hunter' in char['completed_quests']
+    assert 'goblin_hunter' not in char['quest_progress']
+    assert tracker.subscriptions == {}
+    
+    # item pickups count for 'collect' objectives
+    catalog = {'gather': {'quest_id': 'gather', 'title': 'Gather', 'reward_xp': 10, 'reward_gold': 5,
+                          'required_level': 1, 'prerequisite': 'NONE',
+                          'objective': 'collect:health_potion:2,defeat:*:1'}}
+    gatherer = character_manager.create_character("Gatherer", "Cleric")
+    quest_handler.accept_quest(gatherer, 'gather', catalog)
+    inventory_system.add_item_to_inventory(gatherer, 'health_potion')
+    inventory_system.add_item_to_inventory(gatherer, 'health_potion')
+    assert 'gather' in gatherer['active_quests']
+    assert combat_system.publish_defeats(gatherer, [combat_system.create_enemy("orc")]) == ['gather']
+    assert gatherer['gold'] == 105
+    
+    # a dead character's pickup changes the inventory but counts for nothing
+    catalog = {'gather': dict(catalog['gather'], objective='collect:health_potion:2')}
+    fallen = character_manager.create_character("Fallen", "Cleric")
+    quest_handler.accept_quest(fallen, 'gather', catalog)
+    inventory_system.add_item_to_inventory(fallen, 'health_potion')
+    fallen['health'] = 0
+    inventory_system.add_item_to_inventory(fallen, 'health_potion')
+    assert inventory_system.count_item(fallen, 'health_potion') == 2
+    assert fallen['quest_progress']['gather'] == [1]
+    assert 'gather' in fallen['active_quests']
+
 # ============================================================================
 # COMBAT INTEGRATION TESTS
 # ============================================================================
@@ -222,6 +829,430 @@ def test_combat_victory_rewards():
     assert rewards['xp'] == expected_xp
     assert rewards['gold'] == expected_gold
 
+def test_enemy_pool_reuses_enemies():
+    """Test that the enemy pool recycles enemies and resets their stats"""
+    pool = combat_system.EnemyPool()
+    
+    first = pool.acquire("goblin")
+    first['health'] = 0
+    pool.release(first)
+    
+    second = pool.acquire("goblin")
+    assert second is first
+    assert second['health'] == second['max_health'] == 50
+    
+    stats = pool.get_stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['hit_rate'] == 0.5
+
+def test_enemy_pool_keeps_enemy_of_live_battle():
+    """Test that a finished battle's enemy is not reused while the battle holds it"""
+    pool = combat_system.EnemyPool()
+    char = character_manager.create_character("PoolTest", "Warrior")
+    
+    enemy = combat_system.get_random_enemy_for_level(1, pool)
+    battle = combat_system.SimpleBattle(char, enemy, pool=pool)
+    result = battle.start_battle()
+    assert result['winner'] == 'player'
+    
+    # battle still references its enemy, so the pool must hand out a new one
+    other = pool.acquire("goblin")
+    assert other is not battle.enemy
+    assert battle.enemy['health'] == 0
+    
+    # once the battle is gone the enemy can be recycled
+    del battle
+    pool.release(other)
+    assert pool.acquire("goblin") is enemy
+
+def test_enemy_pool_gets_enemy_back_when_battle_cannot_start():
+    """Test that enemies return to the pool when a battle raises CharacterDeadError"""
+    from custom_exceptions import CharacterDeadError
+    pool = combat_system.EnemyPool()
+    char = character_manager.create_character("PoolDead", "Warrior")
+    char['health'] = 0
+    
+    enemy = pool.acquire("goblin")
+    battle = combat_system.SimpleBattle(char, enemy, pool=pool, verbose=False)
+    with pytest.raises(CharacterDeadError):
+        battle.start_battle()
+    assert pool.get_stats()['released'] == 1
+    assert not pool.release(enemy)  # already parked
+    del battle
+    assert pool.acquire("goblin") is enemy
+    
+    goblins = [pool.acquire("goblin") for _ in range(2)]
+    with pytest.raises(CharacterDeadError):
+        combat_system.GroupBattle([char], goblins, pool=pool, verbose=False).start_battle()
+    assert pool.get_stats()['released'] == 3
+
+def test_enemy_pool_keeps_enemies_of_live_group_battle():
+    """Test that a finished group battle's enemies are not reused while it holds them"""
+    pool = combat_system.EnemyPool()
+    hero = character_manager.create_character("PoolGroup", "Warrior")
+    goblins = [pool.acquire("goblin") for _ in range(2)]
+    
+    group = combat_system.GroupBattle([hero], goblins, pool=pool, verbose=False)
+    assert group.start_battle()['winner'] == 'player'
+    
+    other = pool.acquire("goblin")
+    assert all(other is not g for g in group.enemies)
+    assert all(g['health'] == 0 for g in group.enemies)
+    
+    del group
+    assert pool.acquire("goblin") is goblins[0]
+
+def test_group_battle_one_on_one_matches_simple_battle():
+    """Test that a 1v1 group battle plays out like SimpleBattle"""
+    char_a = character_manager.create_character("GroupA", "Rogue")
+    char_b = character_manager.create_character("GroupB", "Rogue")
+    
+    simple = combat_system.SimpleBattle(char_a, combat_system.create_enemy("orc")).start_battle()
+    group = combat_system.GroupBattle([char_b], [combat_system.create_enemy("orc")]).start_battle()
+    
+    assert group == simple
+    assert char_a['health'] == char_b['health']
+    assert char_a['experience'] == char_b['experience']
+
+def test_group_battle_initiative_and_focus_fire():
+    """Test that faster combatants act more often and attackers focus the weakest target"""
+    hero = character_manager.create_character("Speedy", "Warrior")
+    hero['speed'] = 20
+    goblins = [combat_system.create_enemy("goblin") for _ in range(3)]
+    goblins[2]['health'] = 5
+    
+    battle = combat_system.GroupBattle([hero], goblins, verbose=False)
+    
+    # hero acts first and hits the weakest goblin
+    assert battle.take_turn() == 0
+    assert goblins[2]['health'] == 0
+    # twice as fast, so the hero acts again before any goblin
+    assert battle.take_turn() == 0
+    
+    result = battle.start_battle()
+    assert result['winner'] == 'player'
+    assert all(g['health'] == 0 for g in goblins)
+
+def test_group_battle_empty_enemies_and_healing():
+    """Test that group battles reject empty enemy lists and retarget after heals"""
+    from custom_exceptions import InvalidTargetError
+    hero = character_manager.create_character("Medic", "Warrior")
+    with pytest.raises(InvalidTargetError):
+        combat_system.GroupBattle([hero], [], verbose=False)
+    
+    dead = combat_system.create_enemy("goblin")
+    dead['health'] = 0
+    result = combat_system.GroupBattle([hero], [dead], verbose=False).start_battle()
+    assert result['winner'] == 'player'
+    
+    goblins = [combat_system.create_enemy("goblin") for _ in range(2)]
+    goblins[0]['health'] = 5
+    goblins[1]['health'] -= 1
+    battle = combat_system.GroupBattle([hero], goblins, verbose=False)
+    assert battle.pick_target(battle.ENEMIES) == 1
+    assert battle.apply_healing(1, 1000) == goblins[0]['max_health'] - 5
+    assert battle.pick_target(battle.ENEMIES) == 2
+    # health changed outside the battle is picked up lazily
+    goblins[1]['health'] = goblins[1]['max_health']
+    goblins[0]['health'] = 1
+    assert battle.pick_target(battle.ENEMIES) == 1
+
+def test_async_battles_run_concurrently():
+    """Test that several battles share one event loop and interleave rounds"""
+    chars = [character_manager.create_character(f"Async{i}", "Warrior") for i in range(3)]
+    battles = [combat_system.SimpleBattle(c, combat_system.create_enemy("goblin")) for c in chars]
+    order = []
+    
+    async def get_action(battle):
+        order.append(battle.character['name'])
+        return combat_system.ACTION_ATTACK
+    
+    results = asyncio.run(combat_system.run_battles(battles, get_action))
+    
+    assert [r['winner'] for r in results] == ['player'] * 3
+    # first round of every battle happens before any second round
+    assert order[:3] == ['Async0', 'Async1', 'Async2']
+
+def test_async_battle_turn_timeout_and_cancel():
+    """Test that slow input falls back to attacking and cancelling keeps state consistent"""
+    char = character_manager.create_character("SlowPlayer", "Warrior")
+    battle = combat_system.SimpleBattle(char, combat_system.create_enemy("dragon"))
+    
+    async def slow_action(battle):
+        await asyncio.sleep(10)
+    
+    async def run_then_cancel():
+        task = asyncio.ensure_future(battle.start_battle_async(slow_action, turn_timeout=0.01))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    
+    asyncio.run(run_then_cancel())
+    
+    # at least one round ran on the timeout fallback, and no rewards were granted
+    assert battle.turn >= 1
+    assert battle.combat_active == False
+    assert battle.enemy['health'] < battle.enemy['max_health']
+    assert char['experience'] == 0
+
+def test_ability_cooldown_tracking():
+    """Test that abilities become ready again after their cooldown"""
+    char = character_manager.create_character("Cooldown", "Warrior")
+    battle = combat_system.SimpleBattle(char, combat_system.create_enemy("dragon"), verbose=False)
+    cooldown = combat_system.ABILITY_COOLDOWNS['power_strike']
+    
+    battle.play_round(combat_system.ACTION_ABILITY)
+    assert battle.get_cooldown_remaining('power_strike') == cooldown
+    
+    for _ in range(cooldown):
+        assert not battle.is_ability_ready()
+        battle.play_round(combat_system.ACTION_ATTACK)
+    
+    assert battle.is_ability_ready()
+
+def test_strategy_driven_battle_uses_abilities_and_items():
+    """Test that AutoBattleStrategy drives abilities and consumables without a terminal"""
+    char = character_manager.create_character("AutoBot", "Mage")
+    char['inventory'].append("health_potion")
+    items = {'health_potion': {'type': 'consumable', 'effect': 'health:20'}}
+    enemy = combat_system.create_enemy("orc")
+    
+    strategy = combat_system.AutoBattleStrategy(heal_item="health_potion", heal_below=0.5)
+    battle = combat_system.SimpleBattle(char, enemy, strategy=strategy,
+                                        item_data_dict=items, verbose=False)
+    
+    assert battle.choose_action() == combat_system.ACTION_ABILITY
+    char['health'] = 10
+    assert battle.choose_action() == (combat_system.ACTION_ITEM, "health_potion")
+    battle.play_round()
+    assert "health_potion" not in char['inventory']
+    
+    result = battle.start_battle()
+    assert result['winner'] in ('player', 'enemy')
+
+def test_interactive_strategy_reprompts_for_unusable_items(monkeypatch):
+    """Test that the battle menu refuses missing and non-consumable items"""
+    char = character_manager.create_character("Prompted", "Warrior")
+    char['inventory'].append("iron_sword")
+    char['inventory'].append("health_potion")
+    items = game_data.load_items("data/items.txt")
+    battle = combat_system.SimpleBattle(char, combat_system.create_enemy("goblin"),
+                                        strategy=combat_system.InteractiveStrategy(),
+                                        item_data_dict=items)
+    answers = iter(['3', 'steel_sword', '3', 'iron_sword', '3', 'health_potion'])
+    monkeypatch.setattr('builtins.input', lambda prompt='': next(answers))
+    
+    assert battle.choose_action() == (combat_system.ACTION_ITEM, "health_potion")
+    assert next(answers, None) is None
+    
+    # quiet battles do not build ability messages
+    quiet = combat_system.SimpleBattle(char, combat_system.create_enemy("goblin"), verbose=False)
+    assert quiet.use_ability() is None
+    
+    # the ability on cooldown is refused instead of becoming an attack
+    assert not quiet.is_ability_ready()
+    quiet.strategy = combat_system.InteractiveStrategy()
+    answers = iter(['2', '4'])
+    assert quiet.choose_action() == combat_system.ACTION_FLEE
+    assert next(answers, None) is None
+
+def test_seeded_battles_replay_exactly():
+    """Test that a battle replays identically from the same seed and starting state"""
+    class FleeWhenHurt(combat_system.AutoBattleStrategy):
+        def choose_action(self, battle):
+            if battle.character['health'] < 40:
+                return combat_system.ACTION_FLEE
+            return super().choose_action(battle)
+    
+    start = character_manager.create_character("Replay", "Rogue")
+    outcomes = []
+    for _ in range(2):
+        char = dict(start)
+        enemy = combat_system.create_enemy("orc")
+        battle = combat_system.SimpleBattle(char, enemy, strategy=FleeWhenHurt(),
+                                            verbose=False, seed=1234)
+        result = battle.start_battle()
+        outcomes.append((result, battle.turn, char['health'], enemy['health']))
+    
+    assert outcomes[0] == outcomes[1]
+
+def test_battle_recording_replay_and_seek():
+    """Test that a recorded battle can be replayed and seeked without its RNG"""
+    char = character_manager.create_character("Recorder", "Warrior")
+    enemy = combat_system.create_enemy("orc")
+    battle = combat_system.SimpleBattle(char, enemy, verbose=False, seed=7, record=True)
+    battle.start_battle()
+    
+    data = battle.recorder.to_bytes()
+    replay = combat_system.BattleReplay(data)
+    
+    assert replay.seed == 7
+    assert replay.enemy_type == 'orc'
+    assert replay.seek(-1) == replay.start == (120, 80)
+    assert replay.get_result()['winner'] == 'player'
+    assert replay.get_result()['turns'] == battle.turn
+    assert replay.seek(battle.turn) == (char['health'], enemy['health'])
+    
+    # seeking to the middle matches playing back up to that turn
+    middle = battle.turn // 2
+    assert replay.seek(middle) == replay.play(until_turn=middle, log=lambda message: None)
+    
+    # turn numbers past 16 bits still fit in a record
+    recorder = combat_system.BattleRecorder(char, enemy)
+    recorder.record(70000, combat_system.ACTOR_PLAYER, combat_system.EVENT_ATTACK, 5, 10, 0)
+    assert combat_system.BattleReplay(recorder.to_bytes()).get_event(0)[0] == 70000
+    
+    summary = combat_system.summarize_replays([data, data])
+    assert summary['battles'] == 2
+    assert summary['wins'] == 2
+    assert summary['player_damage'] == 2 * 80
+
+def test_damage_tables_are_shared_and_refreshed():
+    """Test that damage tables are memoized across battles and rebuilt on stat changes"""
+    combat_system.DAMAGE_TABLES.clear()
+    
+    first = combat_system.SimpleBattle(character_manager.create_character("TableA", "Warrior"),
+                                       combat_system.create_enemy("goblin"), verbose=False)
+    second = combat_system.SimpleBattle(character_manager.create_character("TableB", "Warrior"),
+                                        combat_system.create_enemy("goblin"), verbose=False)
+    first.play_round()
+    second.play_round()
+    
+    stats = combat_system.DAMAGE_TABLES.get_stats()
+    assert stats['misses'] == 2  # one table per direction
+    assert stats['hits'] == 2    # reused by the second battle
+    
+    # 15 strength vs goblin (8 // 4 = 2)
+    assert first.calculate_damage(first.character, first.enemy) == 13
+    first.character['strength'] += 5
+    assert first.calculate_damage(first.character, first.enemy) == 18
+    assert first.get_damage_tables()[0] == (18, 38, 58)
+
+def test_status_effects_stack_tick_and_expire():
+    """Test stacking, per-turn ticks and expiry of status effects"""
+    effects = combat_system.StatusEffectManager()
+    goblin = combat_system.create_enemy("goblin")
+    
+    effects.apply(goblin, 'poison')
+    effects.apply(goblin, 'poison')
+    effects.apply(goblin, 'weaken')
+    assert effects.get_effects(goblin)['poison'] == (2, 3)
+    assert goblin['strength'] == 4
+    
+    effects.tick(1)
+    assert goblin['health'] == 50 - 8
+    effects.tick(2)
+    # weaken has run out and its modifier is reverted
+    assert goblin['strength'] == 8
+    assert not effects.has_effect(goblin, 'weaken')
+    effects.tick(3)
+    assert goblin['health'] == 50 - 24
+    assert effects.active == {}
+
+def test_status_effects_in_battle():
+    """Test that abilities apply effects in battle and stat changes do not outlive it"""
+    char = character_manager.create_character("Burner", "Mage")
+    enemy = combat_system.create_enemy("dragon")
+    battle = combat_system.SimpleBattle(char, enemy, verbose=False)
+    
+    battle.play_round(combat_system.ACTION_ABILITY)
+    assert battle.effects.has_effect(enemy, 'burn')
+    health = enemy['health']
+    
+    battle.play_round(combat_system.ACTION_ATTACK)
+    burn = -combat_system.STATUS_EFFECTS['burn']['amount']
+    basic = battle.calculate_damage(char, enemy)
+    assert enemy['health'] == health - burn - basic
+    
+    warrior = character_manager.create_character("Weakener", "Warrior")
+    orc = combat_system.create_enemy("orc")
+    battle = combat_system.SimpleBattle(warrior, orc, verbose=False)
+    battle.play_round(combat_system.ACTION_ABILITY)
+    assert orc['strength'] == 8
+    battle.start_battle()
+    assert orc['strength'] == 12
+
+def test_status_effect_applied_mid_battle_lasts_full_duration():
+    """Test that an effect applied after turn 0 counts its duration from that turn"""
+    char = character_manager.create_character("LateBurner", "Mage")
+    char['health'] = char['max_health'] = 10000
+    enemy = combat_system.create_enemy("dragon")
+    enemy['health'] = enemy['max_health'] = 10000
+    battle = combat_system.SimpleBattle(char, enemy, verbose=False)
+    for _ in range(4):
+        battle.play_round(combat_system.ACTION_ATTACK)
+    
+    battle.play_round(combat_system.ACTION_ABILITY)
+    burn = -combat_system.STATUS_EFFECTS['burn']['amount']
+    basic = battle.calculate_damage(char, enemy)
+    for _ in range(combat_system.STATUS_EFFECTS['burn']['duration']):
+        assert battle.effects.has_effect(enemy, 'burn')
+        health = enemy['health']
+        battle.play_round(combat_system.ACTION_ATTACK)
+        assert enemy['health'] == health - burn - basic
+    assert not battle.effects.has_effect(enemy, 'burn')
+
+def test_battle_predictor_settles_trivial_fights(tmp_path):
+    """Test that predictions are cached, persisted and used to settle trivial fights"""
+    filename = str(tmp_path / "predictions.json")
+    predictor = combat_system.BattlePredictor(filename, battles=10)
+    
+    veteran = character_manager.create_character("Veteran", "Warrior")
+    veteran['level'] = 8
+    veteran['strength'] = 40
+    
+    prediction = predictor.predict(veteran, 'goblin')
+    assert prediction['win_rate'] == 1.0
+    assert predictor.is_trivial(veteran, prediction)
+    
+    rookie = character_manager.create_character("Rookie", "Mage")
+    assert not predictor.is_trivial(rookie, predictor.predict(rookie, 'dragon'))
+    
+    predictor.save()
+    reloaded = combat_system.BattlePredictor(filename)
+    assert reloaded.predict(veteran, 'goblin', simulate=False) == prediction
+    assert reloaded.predict(veteran, 'orc', simulate=False) is None
+    
+    enemy = combat_system.create_enemy("goblin")
+    result = combat_system.settle_battle(veteran, enemy, prediction)
+    assert result['winner'] == 'player'
+    assert result['settled'] == True
+    assert veteran['gold'] == 100 + enemy['gold_reward']
+    
+    # the default predictor is in memory only and covers damaged characters
+    memory = combat_system.BattlePredictor(battles=2)
+    added = memory.precompute(classes=("Warrior",), max_level=1)
+    assert added == 120 // combat_system.PREDICTION_HEALTH_BUCKET
+    hurt = character_manager.create_character("Hurt", "Warrior")
+    hurt['health'] = 95
+    assert memory.predict(hurt, 'goblin', simulate=False) is not None
+    assert memory.save() == False
+
+def test_shipped_battle_predictions_and_estimates():
+    """Test the prebuilt prediction table and the estimate used when it has no entry"""
+    predictor = combat_system.BattlePredictor(combat_system.PREDICTIONS_FILE)
+    for character_class in ("Warrior", "Mage", "Rogue", "Cleric"):
+        fresh = character_manager.create_character("Fresh", character_class)
+        assert predictor.predict(fresh, 'goblin', simulate=False) is not None
+    
+    # magic and max health are part of the key
+    mage = character_manager.create_character("Fresh", "Mage")
+    key = predictor.get_key(mage, 'goblin')
+    mage['magic'] += 5
+    assert predictor.get_key(mage, 'goblin') != key
+    mage['magic'] -= 5
+    mage['max_health'] += 10
+    assert predictor.get_key(mage, 'goblin') != key
+    assert predictor.predict(mage, 'goblin', simulate=False) is None
+    
+    veteran = character_manager.create_character("Veteran", "Warrior")
+    veteran['strength'] = 40
+    assert predictor.is_trivial(veteran, predictor.estimate(veteran, 'goblin'))
+    rookie = character_manager.create_character("Rookie", "Mage")
+    assert predictor.estimate(rookie, 'dragon')['win_rate'] == 0.0
+
 # ============================================================================
 # DATA LOADING INTEGRATION TESTS
 # ============================================================================
@@ -274,6 +1305,86 @@ def test_data_validation():
     
     assert game_data.validate_item_data(valid_item) == True
 
+def test_search_index_ranks_prefix_and_multiword_matches():
+    """Test quest/item search ranking, prefix matching and AND semantics"""
+    quests = game_data.load_quests("data/quests.txt")
+    items = game_data.load_items("data/items.txt")
+    quest_search, item_search = game_data.build_search_indexes(quests, items)
+    
+    # title matches outrank description matches
+    assert [qid for qid, _ in quest_search.search("hunter")] == ['goblin_hunter', 'treasure_hunter']
+    assert quest_search.search("goblin")[0][0] == 'goblin_hunter'
+    assert quest_search.search("gob")[0][0] == 'goblin_hunter'
+    assert [qid for qid, _ in quest_search.search("the dragon")] == ['dragon_slayer']
+    assert quest_search.search("dragon goblin") == []
+    assert quest_search.search("") == []
+    
+    found = [iid for iid, _ in item_search.search("steel")]
+    assert sorted(found) == ['steel_armor', 'steel_sword']
+    assert item_search.search("potion", limit=1)[0][0] in ('health_potion', 'super_health_potion')
+    
+    # a prefix matching several words ranks each record once, by its best match
+    records = {'a': {'title': 'stone', 'description': 'stolen'},
+               'b': {'title': 'store', 'description': ''},
+               'c': {'title': '', 'description': 'stone'},
+               'd': {'title': 'sto store', 'description': 'stolen'}}
+    index = game_data.SearchIndex.build(records, game_data.QUEST_SEARCH_FIELDS)
+    assert index.search("sto") == [('d', 2), ('a', 1.0), ('b', 1.0), ('c', 0.5)]
+    assert index.search("sto", limit=2) == [('d', 2), ('a', 1.0)]
+    assert index.search("sto stol") == [('d', 2.5), ('a', 1.5)]
+
+def test_search_short_prefixes_and_score_tiers_match_full_scoring(monkeypatch):
+    """Test that prefix-index and tiered multi-word results equal scoring every record"""
+    import random
+    rng = random.Random(5)
+    words = [''.join(rng.choice('abcd') for _ in range(rng.randint(2, 5))) for _ in range(60)]
+    records = {f"r{i}": {'title': ' '.join(rng.choices(words, k=2)),
+                         'description': ' '.join(rng.choices(words, k=6))} for i in range(300)}
+    # small enough that some query words are tiered at build time and some are not
+    monkeypatch.setattr(game_data, 'TIER_MIN_RECORDS', 60)
+    index = game_data.SearchIndex.build(records, game_data.QUEST_SEARCH_FIELDS)
+    
+    def full_scoring(query, limit):
+        per_word = []
+        for term in dict.fromkeys(game_data.tokenize(query)):
+            best = {}
+            for entry, factor in index.expand(term):
+                for record_id, weight in entry.items():
+                    best[record_id] = max(best.get(record_id, 0), weight * factor)
+            per_word.append(best)
+        common = set(per_word[0]).intersection(*per_word[1:])
+        scores = [(record_id, sum(best[record_id] for best in per_word)) for record_id in common]
+        return sorted(scores, key=lambda pair: (-pair[1], pair[0]))[:limit]
+    
+    rare = min(words, key=lambda word: sum(len(entry) for entry, _ in index.expand(word)))
+    assert rare not in index.tiers and "ab" in index.tiers
+    queries = ["ab", "ab cd", "ab " + rare, rare + " " + words[0], words[0] + " " + words[1],
+               "ab cd ba", "da " + words[2][:3]]
+    for query in queries:
+        for limit in (1, 5, 20):
+            assert index.search(query, limit) == full_scoring(query, limit), query
+
+def test_game_data_cache_persists_parsed_data_and_indexes(tmp_path):
+    """Test that the cache is reused while fresh and rebuilt when stale or corrupt"""
+    from custom_exceptions import MissingDataFileError
+    
+    cache_file = str(tmp_path / "cache.json")
+    first = game_data.load_game_data(cache_file=cache_file)
+    assert os.path.exists(cache_file)
+    
+    cached = game_data.load_game_data(cache_file=cache_file)
+    assert cached['quests'] == first['quests']
+    assert cached['items'] == first['items']
+    assert cached['quest_search'].search("orc") == first['quest_search'].search("orc")
+    
+    with open(cache_file, "w") as f:
+        f.write("{not json")
+    rebuilt = game_data.load_game_data(cache_file=cache_file)
+    assert rebuilt['quests'] == first['quests']
+    
+    with pytest.raises(MissingDataFileError):
+        game_data.load_game_data(quest_file=str(tmp_path / "missing.txt"), cache_file=cache_file)
+
 # ============================================================================
 # FULL GAME WORKFLOW TEST
 # ============================================================================
@@ -0,0 +1,35 @@
+"""
+COMP 163 - Project 3: Quest Chronicles
+Battle Prediction Builder
+
+Simulates stock characters of every class and level against the enemy
+they meet at that level and writes the results to
+data/battle_predictions.json, which main.py loads at startup.
+
+Run from the repository root:
+    python tools/build_battle_predictions.py
+"""
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import combat_system
+
+def main():
+    """Rebuild the prediction table from scratch"""
+    filename = os.path.join(ROOT, combat_system.PREDICTIONS_FILE)
+    predictor = combat_system.BattlePredictor(filename)
+    # skip the existing file so stale entries are dropped
+    predictor.loaded = True
+
+    start = time.perf_counter()
+    added = predictor.precompute()
+    predictor.save()
+    print(f"Wrote {added} predictions to {filename} in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()